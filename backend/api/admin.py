@@ -2,7 +2,7 @@
 Admin configuration for API app.
 """
 from django.contrib import admin
-from .models import Submission
+from .models import ModelPerformance, Submission
 
 
 @admin.register(Submission)
@@ -44,3 +44,18 @@ class SubmissionAdmin(admin.ModelAdmin):
         }),
     )
 
+
+@admin.register(ModelPerformance)
+class ModelPerformanceAdmin(admin.ModelAdmin):
+    """Read-only view of the live metrics aggregates."""
+    
+    list_display = [
+        'model_version',
+        'n',
+        'true_positives',
+        'false_positives',
+        'true_negatives',
+        'false_negatives',
+        'updated_at'
+    ]
+    readonly_fields = [field.name for field in ModelPerformance._meta.fields]
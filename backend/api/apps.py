@@ -1,3 +1,7 @@
+import os
+import sys
+import threading
+
 from django.apps import AppConfig
 
 
@@ -5,3 +9,28 @@ class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
 
+    def ready(self):
+        """
+        Warm the inference stack at process start so the first request on a
+        fresh worker does not pay the model load. Warmup runs in a background
+        thread; /api/ready/ reports 503 until it has finished. With
+        EAGER_WARMUP=False the worker is reported ready straight away.
+        Also installs the write-behind drain hooks when that mode is on.
+        """
+        # Management commands other than runserver don't serve predictions
+        if (
+            sys.argv[0].endswith('manage.py')
+            and len(sys.argv) > 1
+            and sys.argv[1] != 'runserver'
+        ):
+            return
+
+        from .writebehind import install_shutdown_hooks
+        install_shutdown_hooks()
+
+        from inference.predictor import mark_ready_lazily, warmup
+        if os.getenv('EAGER_WARMUP', 'True').lower() != 'true':
+            mark_ready_lazily()
+            return
+
+        threading.Thread(target=warmup, name='inference-warmup', daemon=True).start()
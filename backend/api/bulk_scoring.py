@@ -0,0 +1,383 @@
+"""
+Offline scoring of large CSV or Parquet files in the training data layout.
+
+The input is streamed in chunks of rows and each chunk is projected onto the
+model's schema columns (plus any pass-through columns such as `id`). A chunk
+is scored and explained in one vectorized call, optionally in worker
+processes, and its results are appended to the output file before more input
+is read. At most 2 * workers chunks are in flight, so memory stays bounded by
+the chunk size, not the file size.
+
+Rows with a missing or non-numeric feature get an error instead of a score.
+Scored rows can also be stored as Submission rows, one bulk insert per chunk.
+Rows are only stored if they pass the same SchemaValidator checks as the API
+(schema bounds included); the others keep their score but get the
+validation error and no submission id.
+Results go to a `.partial` file that is renamed into place once the whole
+input has been scored.
+
+Parquet needs pyarrow, which is optional.
+"""
+
+import json
+import logging
+import os
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+
+from inference.registry import ModelBundle
+from inference.validation import SchemaValidator, error_message
+
+from .models import Submission
+from .parallel import score_chunks
+
+logger = logging.getLogger(__name__)
+
+PARQUET_SUFFIXES = (".parquet", ".pq")
+UNSCORABLE_ERROR = "missing or non-numeric features"
+# Submission rows per INSERT statement when saving
+SAVE_BATCH_SIZE = 1000
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError(
+            "Reading or writing Parquet requires pyarrow (pip install pyarrow)"
+        )
+    return pyarrow
+
+
+def is_parquet(path: Path) -> bool:
+    return Path(path).suffix.lower() in PARQUET_SUFFIXES
+
+
+def input_columns(path: Path) -> List[str]:
+    """Column names of an input file, read without loading any rows."""
+    if is_parquet(path):
+        return list(_pyarrow().parquet.ParquetFile(path).schema_arrow.names)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def iter_chunks(
+    path: Path, columns: List[str], chunk_size: int
+) -> Iterator[pd.DataFrame]:
+    """The requested columns of an input file, chunk_size rows at a time."""
+    if is_parquet(path):
+        parquet_file = _pyarrow().parquet.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_size)
+
+
+def feature_matrix(chunk: pd.DataFrame, feature_names: List[str]) -> np.ndarray:
+    """
+    The chunk's features as a schema-ordered float matrix; unparseable
+    values become NaN.
+    """
+    frame = chunk[feature_names]
+    text_columns = [
+        name for name in feature_names if not pd.api.types.is_numeric_dtype(frame[name])
+    ]
+    if text_columns:
+        frame = frame.assign(
+            **{
+                name: pd.to_numeric(frame[name], errors="coerce")
+                for name in text_columns
+            }
+        )
+    return frame.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+class FileScorer:
+    """
+    Scores and explains feature matrices with one model. Holds only the model
+    directory and version, so it can be sent to worker processes, which load
+    the bundle on first use.
+    """
+
+    def __init__(
+        self, model: Dict[str, str], fallback_schema: str, explain: bool = True
+    ):
+        self.model = model
+        self.fallback_schema = fallback_schema
+        self.explain = explain
+        self._bundle: Optional[ModelBundle] = None
+
+    def bundle(self) -> ModelBundle:
+        if self._bundle is None:
+            self._bundle = ModelBundle.from_directory(
+                Path(self.model["model_dir"]),
+                Path(self.fallback_schema),
+                version=self.model["version"],
+            )
+        return self._bundle
+
+    def load(self) -> None:
+        self.bundle().warm()
+
+    def __getstate__(self):
+        return {**self.__dict__, "_bundle": None}
+
+    def score(
+        self, X: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, List[Optional[List[Dict[str, float]]]]]:
+        """
+        (valid mask, probabilities, top contributions); invalid rows score NaN with
+        no contributions.
+        """
+        bundle = self.bundle()
+        valid = np.isfinite(X).all(axis=1)
+        probabilities = np.full(len(X), np.nan)
+        contributions: List[Optional[List[Dict[str, float]]]] = [None] * len(X)
+        if valid.any():
+            X_valid = X[valid]
+            probabilities[valid] = bundle.predict_proba(X_valid)
+            if self.explain:
+                for i, row in zip(np.flatnonzero(valid), bundle.explain(X_valid)):
+                    contributions[i] = row
+        return valid, probabilities, contributions
+
+
+class CsvResultWriter:
+    def __init__(self, path: Path):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._header = True
+
+    def write(self, frame: pd.DataFrame) -> None:
+        frame.to_csv(self._file, header=self._header, index=False)
+        self._header = False
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ParquetResultWriter:
+    """Appends each chunk as a row group; the schema is fixed by the first chunk."""
+
+    def __init__(self, path: Path):
+        self._pa = _pyarrow()
+        self._path = path
+        self._writer = None
+        self._schema = None
+
+    def _schema_for(self, frame: pd.DataFrame):
+        pa = self._pa
+        # Columns that can be all-null in a chunk need explicit types
+        known = {
+            "row": pa.int64(),
+            "prediction_label": pa.string(),
+            "probability_malignant": pa.float64(),
+            "top_contributions": pa.string(),
+            "model_version": pa.string(),
+            "submission_id": pa.int64(),
+            "error": pa.string(),
+        }
+        inferred = pa.Schema.from_pandas(frame, preserve_index=False)
+        return pa.schema(
+            [pa.field(f.name, known.get(f.name, f.type)) for f in inferred]
+        )
+
+    def write(self, frame: pd.DataFrame) -> None:
+        if self._writer is None:
+            self._schema = self._schema_for(frame)
+            self._writer = self._pa.parquet.ParquetWriter(self._path, self._schema)
+        self._writer.write_table(
+            self._pa.Table.from_pandas(frame, schema=self._schema, preserve_index=False)
+        )
+
+    def close(self) -> None:
+        if self._writer is None:
+            # Empty input: still leave a valid (empty) file
+            self._pa.parquet.write_table(
+                self._pa.table({"row": self._pa.array([], self._pa.int64())}),
+                self._path,
+            )
+        else:
+            self._writer.close()
+
+
+def save_submissions(
+    X: np.ndarray,
+    valid: np.ndarray,
+    probabilities: np.ndarray,
+    labels: np.ndarray,
+    contributions: List[Optional[List[Dict[str, float]]]],
+    feature_names: List[str],
+    validator: SchemaValidator,
+    model_version: str,
+) -> Tuple[List[Optional[int]], Dict[int, str]]:
+    """
+    Store every valid row that passes `validator` as a Submission. Returns the
+    new ids (None for rows not stored) and the validation error of each scored
+    row that was not stored.
+    """
+    ids: List[Optional[int]] = [None] * len(X)
+    indices = np.flatnonzero(valid)
+    if not len(indices):
+        return ids, {}
+    validated = validator.validate_many(
+        [dict(zip(feature_names, row)) for row in X[indices].tolist()]
+    )
+    rejected = {
+        int(indices[k]): error_message(errors) for k, errors in validated.errors.items()
+    }
+    stored = [int(indices[k]) for k in validated.indices]
+    rows = [
+        Submission(
+            input_json=record,
+            prediction_label=labels[i],
+            probability_malignant=float(probabilities[i]),
+            top_contributions=contributions[i],
+            model_version=model_version,
+        )
+        for i, record in zip(stored, validated.records)
+    ]
+    if rows:
+        with transaction.atomic():
+            created = Submission.objects.bulk_create(rows, batch_size=SAVE_BATCH_SIZE)
+        for i, submission in zip(stored, created):
+            ids[i] = submission.id
+    return ids, rejected
+
+
+def score_file(
+    bundle: ModelBundle,
+    fallback_schema: Path,
+    input_path: Path,
+    output_path: Path,
+    chunk_size: int = 10000,
+    workers: int = 0,
+    explain: bool = True,
+    save: bool = False,
+    keep: Optional[Sequence[str]] = None,
+    limit: Optional[int] = None,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Score every row of input_path with `bundle` and write one result row per
+    input row to output_path (CSV, or Parquet by suffix), in input order.
+    `keep` columns are copied from the input (default: `id` if the file has one).
+    Raises ValueError if schema or keep columns are missing from the input, and
+    RuntimeError if the model cannot be loaded or Parquet is used without pyarrow.
+    """
+    if bundle.scoring_model() is None:
+        raise RuntimeError(
+            f"Model {bundle.version} in {bundle.model_dir} could not be loaded"
+        )
+    feature_names = bundle.feature_names
+    threshold = bundle.config.threshold
+
+    available = input_columns(input_path)
+    if keep is None:
+        keep = ["id"] if "id" in available else []
+    missing = [name for name in [*feature_names, *keep] if name not in available]
+    if missing:
+        raise ValueError(f"{input_path} is missing columns: {missing}")
+    columns = list(dict.fromkeys([*feature_names, *keep]))
+
+    scorer = FileScorer(
+        {"model_dir": str(bundle.model_dir.resolve()), "version": bundle.version},
+        str(fallback_schema),
+        explain=explain,
+    )
+    partial_path = output_path.with_name(output_path.name + ".partial")
+    writer = (
+        ParquetResultWriter(partial_path)
+        if is_parquet(output_path)
+        else CsvResultWriter(partial_path)
+    )
+    summary = {
+        "rows": 0,
+        "scored": 0,
+        "unscorable": 0,
+        "malignant": 0,
+        "saved": 0,
+        "rejected": 0,
+    }
+    start = time.perf_counter()
+
+    def finish(start_row: int, chunk: pd.DataFrame, X: np.ndarray, result) -> None:
+        valid, probabilities, contributions = result
+        labels = np.where(probabilities >= threshold, "malignant", "benign")
+        frame = pd.DataFrame({"row": np.arange(start_row, start_row + len(chunk))})
+        for name in keep:
+            frame[name] = chunk[name].to_numpy()
+        frame["prediction_label"] = np.where(valid, labels, None)
+        frame["probability_malignant"] = probabilities
+        frame["top_contributions"] = [
+            None if c is None else json.dumps(c) for c in contributions
+        ]
+        frame["model_version"] = bundle.version
+        errors = np.where(valid, None, UNSCORABLE_ERROR)
+        if save:
+            ids, rejected = save_submissions(
+                X,
+                valid,
+                probabilities,
+                labels,
+                contributions,
+                feature_names,
+                bundle.validator,
+                bundle.version,
+            )
+            frame["submission_id"] = pd.array(ids, dtype="Int64")
+            for i, message in rejected.items():
+                errors[i] = message
+            summary["saved"] += int(valid.sum()) - len(rejected)
+            summary["rejected"] += len(rejected)
+        frame["error"] = errors
+        writer.write(frame)
+
+        n_valid = int(valid.sum())
+        summary["rows"] += len(chunk)
+        summary["scored"] += n_valid
+        summary["unscorable"] += len(chunk) - n_valid
+        summary["malignant"] += int((valid & (probabilities >= threshold)).sum())
+        if progress is not None:
+            progress(summary)
+
+    def chunks() -> Iterator[Tuple[Tuple[int, pd.DataFrame, np.ndarray], np.ndarray]]:
+        next_row = 0
+        for chunk in iter_chunks(input_path, columns, chunk_size):
+            if limit is not None:
+                chunk = chunk.iloc[: max(0, limit - next_row)]
+                if chunk.empty:
+                    return
+            X = feature_matrix(chunk, feature_names)
+            yield (next_row, chunk, X), X
+            next_row += len(chunk)
+
+    # Results come back in the order chunks were read, so output rows match input rows
+    completed = False
+    try:
+        with closing(score_chunks(scorer, chunks(), workers)) as results:
+            for (row, chunk, X), result in results:
+                finish(row, chunk, X, result)
+        completed = True
+    finally:
+        writer.close()
+        if completed:
+            os.replace(partial_path, output_path)
+        else:
+            partial_path.unlink(missing_ok=True)
+
+    elapsed = time.perf_counter() - start
+    return {
+        "input": str(input_path),
+        "output": str(output_path),
+        "model_version": bundle.version,
+        "threshold": threshold,
+        **summary,
+        "elapsed_s": round(elapsed, 3),
+        "rows_per_s": round(summary["rows"] / elapsed) if elapsed > 0 else None,
+    }
@@ -0,0 +1,133 @@
+"""
+Fast JSON encoding and decoding for the API.
+
+Uses orjson when it is installed and FAST_JSON is on (the default), else the
+standard library. Output matches DRF's JSONRenderer either way: compact
+UTF-8 with U+2028/U+2029 escaped, dates and times encoded by DRF's encoder
+(milliseconds, "Z" for UTC), and NaN or infinite floats refused with a
+ValueError as DRF's strict renderer does. ORJSONParser and ORJSONRenderer are
+drop-in DRF parser/renderer classes (see REST_FRAMEWORK in core/settings.py)
+that fall back to DRF's own JSON handling under the same conditions.
+"""
+
+import json
+import math
+import os
+from typing import Any
+
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson  # optional
+except ImportError:
+    orjson = None
+
+if os.getenv("FAST_JSON", "True").lower() != "true":
+    orjson = None
+
+_drf_encoder = JSONEncoder()
+_LINE_SEPARATORS = ((b"\xe2\x80\xa8", b"\\u2028"), (b"\xe2\x80\xa9", b"\\u2029"))
+
+
+def _default(obj: Any) -> Any:
+    """
+    Types orjson does not encode natively (Decimal, lazy strings, ...), as
+    DRF encodes them.
+    """
+    return _drf_encoder.default(obj)
+
+
+def _check_finite(data: Any) -> None:
+    """Raise ValueError for a NaN or infinite float anywhere in `data`."""
+    if isinstance(data, float):
+        if not math.isfinite(data):
+            raise ValueError(
+                f"Out of range float values are not JSON compliant: {data!r}"
+            )
+    elif isinstance(data, dict):
+        for value in data.values():
+            _check_finite(value)
+    elif isinstance(data, (list, tuple)):
+        for value in data:
+            _check_finite(value)
+
+
+def _escape_line_separators(body: bytes) -> bytes:
+    # Same as DRF: keep the output a strict JavaScript subset
+    for raw, escaped in _LINE_SEPARATORS:
+        if raw in body:
+            body = body.replace(raw, escaped)
+    return body
+
+
+def loads(data) -> Any:
+    """
+    Parse a JSON document (bytes or str). Raises ValueError if it is not valid JSON.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(data: Any) -> bytes:
+    """Compact UTF-8 JSON."""
+    if orjson is not None:
+        # Dates and times go through _default, so they are encoded as DRF encodes them
+        body = orjson.dumps(
+            data, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME
+        )
+        if b"null" in body:
+            # orjson writes NaN and infinities as null; only then can the
+            # input have held one
+            _check_finite(data)
+    else:
+        body = json.dumps(
+            data,
+            cls=JSONEncoder,
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+        ).encode()
+    return _escape_line_separators(body)
+
+
+def json_response(data: Any, status: int = 200) -> HttpResponse:
+    """A JSON HttpResponse; `data` may already be encoded bytes."""
+    body = data if isinstance(data, bytes) else dumps(data)
+    response = HttpResponse(body, content_type="application/json", status=status)
+    # CommonMiddleware, which would set it, is skipped on the lean path
+    response["Content-Length"] = str(len(body))
+    return response
+
+
+class ORJSONParser(JSONParser):
+    """DRF JSONParser backed by orjson when available (UTF-8 bodies only)."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as e:
+            raise ParseError(f"JSON parse error - {e}")
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    DRF JSONRenderer backed by orjson when available (indented output still uses DRF).
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
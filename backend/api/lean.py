@@ -0,0 +1,168 @@
+"""
+Lean endpoints for the stateless hot path: health, schema and predict.
+
+They are the same endpoints as /api/health/, /api/schema/ and /api/predict/.
+Here they are plain Django views that encode JSON with api.fastjson, and they
+are served under LEAN_API_PREFIX (default /api/lean/). Requests under that
+prefix are also short-circuited by LeanPathMiddleware. The middleware sits
+right after the CORS and security middleware and calls the view itself, so
+the session, CSRF, auth, messages and clickjacking middleware never run for
+these requests. Nothing under the prefix reads sessions, users or cookies.
+CommonMiddleware is skipped too, so the middleware validates the Host header
+itself (ALLOWED_HOSTS): a disallowed host gets the same 400 as anywhere else.
+When LEAN_API_PREFIX is empty, the middleware removes itself and the routes
+are not mounted.
+"""
+
+import json
+import logging
+import weakref
+
+from asgiref.sync import (
+    async_to_sync,
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import Resolver404, get_resolver
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework import status
+
+from inference.predictor import ModelNotFoundError, get_bundle, get_validator
+from inference.telemetry import telemetry
+
+from . import fastjson
+from .views import _invalid_record, _pinned_version, _score_and_save
+
+logger = logging.getLogger(__name__)
+
+LEAN_URLCONF = "api.lean_urls"
+# /api/health/ is a JsonResponse, not DRF, so its body is the standard
+# json.dumps spacing
+_HEALTH_BODY = json.dumps({"status": "ok"}).encode()
+# Encoded schema.json per loaded bundle; entries go away with the bundle
+_schema_bodies: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+class LeanPathMiddleware:
+    """
+    Serves LEAN_API_PREFIX requests directly, skipping the middleware after this one.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.prefix = settings.LEAN_API_PREFIX
+        if not self.prefix:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.resolver = get_resolver(LEAN_URLCONF)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def _match(self, request):
+        if not request.path_info.startswith(self.prefix):
+            return None
+        try:
+            match = self.resolver.resolve("/" + request.path_info[len(self.prefix) :])
+        except Resolver404:
+            return None
+        # Raises DisallowedHost (answered with 400) as CommonMiddleware would
+        request.get_host()
+        request.resolver_match = match
+        return match
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        match = self._match(request)
+        if match is None:
+            return self.get_response(request)
+        view = (
+            async_to_sync(match.func) if iscoroutinefunction(match.func) else match.func
+        )
+        return view(request, *match.args, **match.kwargs)
+
+    async def __acall__(self, request):
+        match = self._match(request)
+        if match is None:
+            return await self.get_response(request)
+        view = (
+            match.func if iscoroutinefunction(match.func) else sync_to_async(match.func)
+        )
+        return await view(request, *match.args, **match.kwargs)
+
+
+@require_GET
+def health(request):
+    """Same as /api/health/."""
+    return fastjson.json_response(_HEALTH_BODY)
+
+
+@require_GET
+def schema(request):
+    """Same as /api/schema/; the encoded schema is cached per model version."""
+    try:
+        bundle = get_bundle(_pinned_version(request))
+        body = _schema_bodies.get(bundle)
+        if body is None:
+            body = _schema_bodies[bundle] = fastjson.dumps(bundle.schema)
+        return fastjson.json_response(body)
+    except ModelNotFoundError as e:
+        return fastjson.json_response(
+            {"error": str(e)}, status=status.HTTP_404_NOT_FOUND
+        )
+    except Exception as e:
+        logger.error(f"Error loading schema: {e}")
+        return fastjson.json_response(
+            {"error": "Failed to load feature schema"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+
+
+@csrf_exempt
+@require_POST
+def predict(request):
+    """Same request and response as /api/predict/."""
+    with telemetry.timed("request.total"):
+        return _predict(request)
+
+
+def _predict(request):
+    try:
+        with telemetry.timed("request.parse"):
+            try:
+                input_data = fastjson.loads(request.body)
+            except ValueError as e:
+                return fastjson.json_response(
+                    {"error": f"JSON parse error - {e}"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        with telemetry.timed("request.validate"):
+            version = _pinned_version(request)
+            validated = get_validator(version).validate_many([input_data])
+        if validated.errors:
+            return fastjson.json_response(
+                _invalid_record(validated.errors[0]), status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return fastjson.json_response(
+            _score_and_save(validated, version), status=status.HTTP_201_CREATED
+        )
+
+    except ModelNotFoundError as e:
+        return fastjson.json_response(
+            {"error": str(e)}, status=status.HTTP_404_NOT_FOUND
+        )
+    except Exception as e:
+        logger.error(f"Error in lean prediction endpoint: {e}")
+        return fastjson.json_response(
+            {"error": "Internal server error during prediction"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
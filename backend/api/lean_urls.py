@@ -0,0 +1,14 @@
+"""
+URL configuration for the lean endpoints, mounted at LEAN_API_PREFIX (see api/lean.py).
+"""
+
+from django.urls import path
+
+from . import lean, views
+
+urlpatterns = [
+    path("health/", lean.health, name="lean_health"),
+    path("schema/", lean.schema, name="lean_schema"),
+    path("predict/", lean.predict, name="lean_predict"),
+    path("predict/async/", views.predict_cancer_risk_async, name="lean_predict_async"),
+]
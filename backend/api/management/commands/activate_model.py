@@ -0,0 +1,44 @@
+"""
+Point the model registry's ACTIVE pointer at a version.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inference.predictor import get_registry
+from inference.registry import ModelNotFoundError
+
+
+class Command(BaseCommand):
+    help = (
+        "Atomically switch the active model version in MODEL_REGISTRY_DIR "
+        "(or list versions)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("version", nargs="?", help="Version directory to activate")
+        parser.add_argument(
+            "--list", action="store_true", help="List available versions"
+        )
+
+    def handle(self, *args, **options):
+        registry = get_registry()
+        if registry.root is None:
+            raise CommandError("MODEL_REGISTRY_DIR is not configured")
+
+        if options["list"] or not options["version"]:
+            active = registry.read_pointer()
+            for version in registry.versions():
+                marker = "*" if version == active else " "
+                self.stdout.write(f"{marker} {version}")
+            return
+
+        try:
+            registry.activate(options["version"])
+        except ModelNotFoundError as e:
+            raise CommandError(str(e))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"ACTIVE -> {options['version']} (workers swap within "
+                "MODEL_REGISTRY_POLL_SECONDS)"
+            )
+        )
@@ -0,0 +1,22 @@
+"""
+Recompute the live model metrics from all confirmed submissions.
+"""
+
+from django.core.management.base import BaseCommand
+
+from api.metrics import rebuild_all
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild ModelPerformance aggregates from confirmed submissions "
+        "(e.g. after upgrading or a manual DB edit)."
+    )
+
+    def handle(self, *args, **options):
+        count = rebuild_all()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt model metrics from {count} confirmed submissions"
+            )
+        )
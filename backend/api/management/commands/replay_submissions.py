@@ -0,0 +1,133 @@
+"""
+Re-score stored submissions with a candidate model and report the differences.
+"""
+
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.replay import run_replay
+from inference.predictor import SCHEMA_PATH, get_bundle, resolve_model
+from inference.registry import ModelNotFoundError
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay stored submissions through the active (or --baseline) "
+        "model and a candidate "
+        "model, and write a diff report: label flips, probability shifts and "
+        "confirmed-case metrics."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "candidate",
+            help="Candidate model directory (e.g. ml/model_out) or registry version",
+        )
+        parser.add_argument(
+            "--baseline",
+            help="Baseline model directory or registry version (default: active model)",
+        )
+        parser.add_argument(
+            "--out",
+            default="replay_report.json",
+            help="Report file (default: %(default)s)",
+        )
+        parser.add_argument(
+            "--checkpoint", help="Checkpoint file (default: <out>.checkpoint)"
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Continue from the checkpoint of an interrupted run",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=5000,
+            help="Submissions per chunk (default: %(default)s)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=0,
+            help="Worker processes for scoring; 0 scores in this process "
+            "(default: %(default)s)",
+        )
+        parser.add_argument(
+            "--limit", type=int, help="Only replay the oldest N submissions"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            baseline = (
+                resolve_model(options["baseline"])
+                if options["baseline"]
+                else get_bundle()
+            )
+            candidate = resolve_model(options["candidate"])
+        except ModelNotFoundError as e:
+            raise CommandError(str(e))
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be at least 1")
+        if options["limit"] is not None and options["limit"] < 1:
+            raise CommandError("--limit must be at least 1")
+        out = Path(options["out"])
+        checkpoint = Path(options["checkpoint"] or f"{out}.checkpoint")
+        self.stdout.write(
+            f"Replaying submissions: {baseline.version} ({baseline.model_dir}) "
+            f"vs {candidate.version} ({candidate.model_dir})"
+        )
+
+        def progress(report, max_id):
+            flips = sum(report.flips.values())
+            self.stdout.write(
+                f"  {report.scanned} scanned (up to id {max_id}), {report.scored} "
+                f"scored, {flips} flips"
+            )
+
+        try:
+            result = run_replay(
+                baseline,
+                candidate,
+                SCHEMA_PATH,
+                checkpoint,
+                chunk_size=options["chunk_size"],
+                workers=options["workers"],
+                resume=options["resume"],
+                limit=options["limit"],
+                progress=progress,
+            )
+        except (RuntimeError, ValueError) as e:
+            raise CommandError(str(e))
+
+        out.write_text(json.dumps(result, indent=2, default=str))
+        checkpoint.unlink(missing_ok=True)
+
+        flips = result["label_flips"]
+        metrics = result["confirmed"]["metrics"]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Replayed {result['scored']} submissions "
+                f"({result['unscorable']} unscorable): "
+                f"{flips['total']} label flips "
+                f"({flips['benign_to_malignant']} to malignant, "
+                f"{flips['malignant_to_benign']} to benign), mean |shift| "
+                f"{result['probability_shift']['mean_abs'] or 0:.4f}"
+            )
+        )
+        if metrics["baseline"]["confirmed"]:
+            for name in ("baseline", "candidate"):
+                m = metrics[name]
+                self.stdout.write(
+                    f"  {name:<9} on {m['confirmed']} confirmed: accuracy "
+                    f"{m['accuracy']:.4f}, "
+                    f"recall {m['recall'] or 0:.4f}, brier {m['brier_score']:.4f}"
+                )
+            self.stdout.write(
+                "  flips on confirmed cases: "
+                f"{result['confirmed']['flips_fixed']} fixed, "
+                f"{result['confirmed']['flips_broken']} broken"
+            )
+        self.stdout.write(f"Report written to {out}")
@@ -0,0 +1,114 @@
+"""
+Score a CSV or Parquet file of cases offline and write one result row per case.
+"""
+
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.bulk_scoring import score_file
+from inference.predictor import SCHEMA_PATH, get_bundle, resolve_model
+from inference.registry import ModelNotFoundError
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream a CSV or Parquet file in the training data layout "
+        "through a model and write "
+        "labels, probabilities and top contributions to a CSV or "
+        "Parquet file, optionally "
+        "storing every scored row as a Submission."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", help="Input file (.csv, or .parquet/.pq)")
+        parser.add_argument("output", help="Results file (.csv, or .parquet/.pq)")
+        parser.add_argument(
+            "--model",
+            help="Model directory or registry version (default: active model)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=10000,
+            help="Rows per chunk (default: %(default)s)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=0,
+            help="Worker processes for scoring; 0 scores in this process "
+            "(default: %(default)s)",
+        )
+        parser.add_argument(
+            "--no-explain", action="store_true", help="Skip top contributions"
+        )
+        parser.add_argument(
+            "--save",
+            action="store_true",
+            help="Also store every scored row that passes schema validation "
+            "as a Submission",
+        )
+        parser.add_argument(
+            "--keep",
+            nargs="*",
+            help="Input columns to copy into the results "
+            "(default: id, if the file has one)",
+        )
+        parser.add_argument("--limit", type=int, help="Only score the first N rows")
+
+    def handle(self, *args, **options):
+        try:
+            bundle = (
+                resolve_model(options["model"]) if options["model"] else get_bundle()
+            )
+        except ModelNotFoundError as e:
+            raise CommandError(str(e))
+        input_path, output_path = Path(options["input"]), Path(options["output"])
+        if not input_path.is_file():
+            raise CommandError(f"Input file not found: {input_path}")
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be at least 1")
+        self.stdout.write(
+            f"Scoring {input_path} with {bundle.version} ({bundle.model_dir})"
+        )
+
+        def progress(summary):
+            self.stdout.write(
+                f"  {summary['rows']} rows, {summary['scored']} scored, "
+                f"{summary['malignant']} malignant"
+            )
+
+        try:
+            result = score_file(
+                bundle,
+                SCHEMA_PATH,
+                input_path,
+                output_path,
+                chunk_size=options["chunk_size"],
+                workers=options["workers"],
+                explain=not options["no_explain"],
+                save=options["save"],
+                keep=options["keep"],
+                limit=options["limit"],
+                progress=progress,
+            )
+        except (RuntimeError, ValueError) as e:
+            raise CommandError(str(e))
+
+        saved = (
+            f", {result['saved']} saved as submissions, {result['rejected']} rejected "
+            "by schema validation"
+            if options["save"]
+            else ""
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Scored {result['scored']} of {result['rows']} rows "
+                f"({result['unscorable']} unscorable, "
+                f"{result['malignant']} malignant{saved}) in "
+                f"{result['elapsed_s']:.2f}s "
+                f"({result['rows_per_s'] or 0} rows/s)"
+            )
+        )
+        self.stdout.write(f"Results written to {output_path}")
@@ -0,0 +1,194 @@
+"""
+Live model performance metrics from doctor confirmations.
+
+Each confirmation adds one submission's (probability, predicted label,
+confirmed label) to the ModelPerformance row of its model version; a
+re-confirmation with a different label first subtracts the old outcome.
+Everything reported by summarize() is derived from those running sums.
+"""
+
+import math
+from typing import Any, Dict, Optional
+
+from django.db import transaction
+
+from .models import ModelPerformance, Submission
+
+# Calibration bins (reliability diagram) and the finer histogram used for ROC-AUC
+CALIBRATION_BINS = 10
+HISTOGRAM_BINS = 100
+EPSILON = 1e-15
+
+
+def _bin(probability: float, n_bins: int) -> int:
+    return min(int(probability * n_bins), n_bins - 1)
+
+
+def apply_outcome(
+    perf: ModelPerformance,
+    probability: float,
+    predicted_label: str,
+    true_label: int,
+    weight: int = 1,
+) -> None:
+    """
+    Add (weight=1) or remove (weight=-1) one confirmed outcome from the aggregates.
+    """
+    if not perf.calibration_bins:
+        perf.calibration_bins = [[0, 0.0, 0] for _ in range(CALIBRATION_BINS)]
+        perf.histogram_positive = [0] * HISTOGRAM_BINS
+        perf.histogram_negative = [0] * HISTOGRAM_BINS
+
+    predicted = 1 if predicted_label == "malignant" else 0
+    perf.n += weight
+    if predicted and true_label:
+        perf.true_positives += weight
+    elif predicted:
+        perf.false_positives += weight
+    elif true_label:
+        perf.false_negatives += weight
+    else:
+        perf.true_negatives += weight
+
+    p = min(max(probability, EPSILON), 1 - EPSILON)
+    perf.brier_sum += weight * (probability - true_label) ** 2
+    perf.log_loss_sum += weight * -(math.log(p) if true_label else math.log(1 - p))
+
+    calibration = perf.calibration_bins[_bin(probability, CALIBRATION_BINS)]
+    calibration[0] += weight
+    calibration[1] += weight * probability
+    calibration[2] += weight * true_label
+
+    histogram = perf.histogram_positive if true_label else perf.histogram_negative
+    histogram[_bin(probability, HISTOGRAM_BINS)] += weight
+
+
+def record_confirmation(
+    submission: Submission, confirmed_label: int, previous_label: Optional[int] = None
+) -> None:
+    """
+    Fold a (re-)confirmation into its model version's aggregates.
+    Call inside the transaction that saves the submission.
+    """
+    with transaction.atomic():
+        perf, _ = ModelPerformance.objects.select_for_update().get_or_create(
+            model_version=submission.model_version
+        )
+        if previous_label is not None:
+            apply_outcome(
+                perf,
+                submission.probability_malignant,
+                submission.prediction_label,
+                previous_label,
+                weight=-1,
+            )
+        apply_outcome(
+            perf,
+            submission.probability_malignant,
+            submission.prediction_label,
+            confirmed_label,
+        )
+        perf.save()
+
+
+def _ratio(numerator: float, denominator: float) -> Optional[float]:
+    return numerator / denominator if denominator else None
+
+
+def _approximate_auc(positive: list, negative: list) -> Optional[float]:
+    """
+    ROC-AUC from the per-class histograms: P(score_pos > score_neg), with
+    pairs in the same bin counted as ties.
+    """
+    n_pos, n_neg = sum(positive), sum(negative)
+    if not n_pos or not n_neg:
+        return None
+    wins = 0.0
+    negatives_below = 0
+    for pos_count, neg_count in zip(positive, negative):
+        wins += pos_count * (negatives_below + 0.5 * neg_count)
+        negatives_below += neg_count
+    return wins / (n_pos * n_neg)
+
+
+def summarize(perf: ModelPerformance) -> Dict[str, Any]:
+    """Metrics for one version, computed from its aggregates only."""
+    tp, fp, tn, fn = (
+        perf.true_positives,
+        perf.false_positives,
+        perf.true_negatives,
+        perf.false_negatives,
+    )
+    precision = _ratio(tp, tp + fp)
+    recall = _ratio(tp, tp + fn)
+
+    calibration = []
+    expected_calibration_error = 0.0
+    for index, (count, probability_sum, positives) in enumerate(perf.calibration_bins):
+        if not count:
+            continue
+        mean_predicted = probability_sum / count
+        observed_rate = positives / count
+        expected_calibration_error += (
+            count / perf.n * abs(mean_predicted - observed_rate)
+        )
+        calibration.append(
+            {
+                "bin": [index / CALIBRATION_BINS, (index + 1) / CALIBRATION_BINS],
+                "count": count,
+                "mean_predicted": mean_predicted,
+                "observed_rate": observed_rate,
+            }
+        )
+
+    return {
+        "model_version": perf.model_version,
+        "confirmed": perf.n,
+        "updated_at": perf.updated_at,
+        "confusion_matrix": {
+            "true_positives": tp,
+            "false_positives": fp,
+            "true_negatives": tn,
+            "false_negatives": fn,
+        },
+        "accuracy": _ratio(tp + tn, perf.n),
+        "precision": precision,
+        "recall": recall,
+        "specificity": _ratio(tn, tn + fp),
+        "f1": (
+            _ratio(2 * precision * recall, precision + recall)
+            if precision is not None and recall is not None
+            else None
+        ),
+        "brier_score": _ratio(perf.brier_sum, perf.n),
+        "log_loss": _ratio(perf.log_loss_sum, perf.n),
+        "roc_auc_approx": _approximate_auc(
+            perf.histogram_positive, perf.histogram_negative
+        ),
+        "expected_calibration_error": expected_calibration_error if perf.n else None,
+        "calibration": calibration,
+    }
+
+
+def rebuild_all() -> int:
+    """
+    Recompute every version's aggregates from Submission (one streaming scan).
+    Returns rows used.
+    """
+    aggregates: Dict[str, ModelPerformance] = {}
+    rows = Submission.objects.filter(confirmed_label__isnull=False).values_list(
+        "model_version", "probability_malignant", "prediction_label", "confirmed_label"
+    )
+    count = 0
+    for model_version, probability, predicted_label, confirmed_label in rows.iterator(
+        chunk_size=2000
+    ):
+        perf = aggregates.setdefault(
+            model_version, ModelPerformance(model_version=model_version)
+        )
+        apply_outcome(perf, probability, predicted_label, confirmed_label)
+        count += 1
+    with transaction.atomic():
+        ModelPerformance.objects.all().delete()
+        ModelPerformance.objects.bulk_create(aggregates.values())
+    return count
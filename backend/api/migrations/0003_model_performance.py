@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0002_submission_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ModelPerformance",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("model_version", models.CharField(max_length=50, unique=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("n", models.IntegerField(default=0)),
+                ("true_positives", models.IntegerField(default=0)),
+                ("false_positives", models.IntegerField(default=0)),
+                ("true_negatives", models.IntegerField(default=0)),
+                ("false_negatives", models.IntegerField(default=0)),
+                ("brier_sum", models.FloatField(default=0.0)),
+                ("log_loss_sum", models.FloatField(default=0.0)),
+                ("calibration_bins", models.JSONField(default=list)),
+                ("histogram_positive", models.JSONField(default=list)),
+                ("histogram_negative", models.JSONField(default=list)),
+            ],
+            options={
+                "verbose_name": "Model Performance",
+                "verbose_name_plural": "Model Performance",
+                "ordering": ["model_version"],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0003_model_performance"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="submission",
+            index=models.Index(
+                fields=["confirmed_at", "id"], name="submission_confirmed_at_idx"
+            ),
+        ),
+    ]
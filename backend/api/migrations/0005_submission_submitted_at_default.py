@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:08
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0004_submission_confirmed_at_index"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="submission",
+            name="submitted_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now, editable=False
+            ),
+        ),
+    ]
@@ -3,6 +3,7 @@ API models for breast cancer detector.
 """
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
 
 
 class Submission(models.Model):
@@ -15,7 +16,9 @@ class Submission(models.Model):
     
     # Auto-generated fields
     id = models.AutoField(primary_key=True)
-    submitted_at = models.DateTimeField(auto_now_add=True)
+    # Set when the row is built, not when it is written, so write-behind rows keep
+    # their request time
+    submitted_at = models.DateTimeField(default=timezone.now, editable=False)
     
     # Input data
     input_json = models.JSONField(help_text="Raw input features as received from client")
@@ -58,6 +61,26 @@ class Submission(models.Model):
         ordering = ['-submitted_at']
         verbose_name = "Prediction Submission"
         verbose_name_plural = "Prediction Submissions"
+        # Default ordering, plus each admin list filter followed by that ordering
+        indexes = [
+            models.Index(
+                fields=['submitted_at', 'id'], name='submission_submitted_idx'
+            ),
+            models.Index(
+                fields=['model_version', 'submitted_at'], name='submission_version_idx'
+            ),
+            models.Index(
+                fields=['prediction_label', 'submitted_at'], name='submission_label_idx'
+            ),
+            models.Index(
+                fields=['confirmed_label', 'submitted_at'],
+                name='submission_confirmed_idx',
+            ),
+            # Incremental extraction of new confirmations for retraining (ml/retrain.py)
+            models.Index(
+                fields=['confirmed_at', 'id'], name='submission_confirmed_at_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"Submission {self.id} - {self.prediction_label} ({self.probability_malignant:.3f})"
@@ -67,3 +90,39 @@ class Submission(models.Model):
         """Check if this submission has been confirmed by a doctor."""
         return self.confirmed_label is not None
 
+
+
+class ModelPerformance(models.Model):
+    """
+    Running aggregates of confirmed outcomes for one model version.
+    Updated in O(1) on every confirmation (see api/metrics.py), so live
+    metrics never need to scan Submission.
+    """
+    
+    model_version = models.CharField(max_length=50, unique=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    # Confusion matrix of the served prediction_label vs the confirmed label
+    n = models.IntegerField(default=0)
+    true_positives = models.IntegerField(default=0)
+    false_positives = models.IntegerField(default=0)
+    true_negatives = models.IntegerField(default=0)
+    false_negatives = models.IntegerField(default=0)
+    
+    # Sums of per-submission Brier score and log loss
+    brier_sum = models.FloatField(default=0.0)
+    log_loss_sum = models.FloatField(default=0.0)
+    
+    # Fixed-width probability bins: [count, sum of probabilities, positives] per
+    # calibration bin, and counts per (finer) histogram bin for each true class
+    calibration_bins = models.JSONField(default=list)
+    histogram_positive = models.JSONField(default=list)
+    histogram_negative = models.JSONField(default=list)
+    
+    class Meta:
+        ordering = ['model_version']
+        verbose_name = "Model Performance"
+        verbose_name_plural = "Model Performance"
+    
+    def __str__(self):
+        return f"Performance {self.model_version} (n={self.n})"
@@ -0,0 +1,71 @@
+"""
+Chunked scoring in worker processes for the offline commands (score_file,
+replay_submissions).
+
+A scorer is a small picklable object with load() (load and warm its models)
+and score(chunk). It holds only model directories and versions; each worker
+gets its own copy, loads it once in the pool initializer, and scores every
+chunk it is handed. Workers are started like the serving pool's
+(inference.pool.mp_context: forkserver, or spawn), so they don't inherit
+this process's threads or database connections; the scorer is sent pickled
+and unpickled only after the worker has set up Django, since scorer classes
+live next to the models. score_chunks() yields results in the order the chunks
+were read, with at most 2 * workers chunks in flight, so callers can write
+output or checkpoints as if scoring were sequential.
+"""
+
+import pickle
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Iterable, Iterator, Optional, Tuple
+
+from inference.pool import mp_context
+
+# Per-worker scorer, set by _init_worker
+_worker_scorer: Optional[Any] = None
+
+
+def _init_worker(pickled_scorer: bytes) -> None:
+    global _worker_scorer
+    import django
+
+    django.setup()
+    _worker_scorer = pickle.loads(pickled_scorer)
+    _worker_scorer.load()
+
+
+def _score_in_worker(chunk: Any) -> Any:
+    return _worker_scorer.score(chunk)
+
+
+def score_chunks(
+    scorer: Any, chunks: Iterable[Tuple[Any, Any]], workers: int = 0
+) -> Iterator[Tuple[Any, Any]]:
+    """
+    Score each (context, chunk) pair and yield (context, scorer.score(chunk)) in
+    input order. workers > 0 scores in that many processes; the pool is shut
+    down when the generator finishes or is closed.
+    """
+    if workers <= 0:
+        for context, chunk in chunks:
+            yield context, scorer.score(chunk)
+        return
+
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=mp_context(),
+        initializer=_init_worker,
+        initargs=(pickle.dumps(scorer),),
+    )
+    in_flight: deque = deque()
+    try:
+        for context, chunk in chunks:
+            in_flight.append((context, executor.submit(_score_in_worker, chunk)))
+            if len(in_flight) >= 2 * workers:
+                context, future = in_flight.popleft()
+                yield context, future.result()
+        while in_flight:
+            context, future = in_flight.popleft()
+            yield context, future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
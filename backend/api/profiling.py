@@ -0,0 +1,219 @@
+"""
+Opt-in per-request profiling.
+
+With PROFILING_ENABLED=True, requests to PROFILING_PATHS are run under
+cProfile when they carry `X-Profile: <PROFILING_TOKEN>` or are picked by
+PROFILING_SAMPLE_RATE. Each profile is stored under PROFILING_DIR as a
+pstats dump (open with snakeviz, gprof2dot or pstats) plus a JSON summary
+of per-function timings and callees, under a server-generated profile ID
+(the client's X-Request-ID is only recorded in the summary). One request is
+profiled at a time per process; others run unprofiled meanwhile, as do
+requests arriving while another profiler (a debugger, coverage) is active.
+Staff users can list and download profiles at /admin/profiles/.
+
+When disabled, the middleware raises MiddlewareNotUsed and Django drops it
+from the chain, so the hot path is untouched.
+"""
+
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, Http404, JsonResponse
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "HTTP_X_PROFILE"
+REQUEST_ID_HEADER = "HTTP_X_REQUEST_ID"
+# Functions kept in the JSON summary, by cumulative time
+SUMMARY_TOP_N = 40
+_PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+# Held while a request is profiled; Python 3.12+ allows only one active profiler
+_profiling = threading.Lock()
+
+
+def _profiles_dir() -> Path:
+    return Path(os.getenv("PROFILING_DIR", str(settings.BASE_DIR / "profiles")))
+
+
+def _function_name(func) -> str:
+    filename, line, name = func
+    return f"{filename}:{line}({name})"
+
+
+def summarize_profile(
+    stats: pstats.Stats, top_n: int = SUMMARY_TOP_N
+) -> List[Dict[str, Any]]:
+    """Top functions by cumulative time, each with its direct callees."""
+    # stats.stats: func -> (primitive calls, total calls, own time,
+    # cumulative time, callers)
+    callees: Dict[Any, List] = {}
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        for caller, (_, _, _, cumulative) in callers.items():
+            callees.setdefault(caller, []).append((cumulative, func))
+
+    ranked = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[
+        :top_n
+    ]
+    return [
+        {
+            "function": _function_name(func),
+            "calls": total_calls,
+            "own_ms": round(own * 1000, 3),
+            "cumulative_ms": round(cumulative * 1000, 3),
+            "callees": [
+                {
+                    "function": _function_name(callee),
+                    "cumulative_ms": round(callee_cumulative * 1000, 3),
+                }
+                for callee_cumulative, callee in sorted(
+                    callees.get(func, []), reverse=True
+                )[:10]
+            ],
+        }
+        for func, (_, total_calls, own, cumulative, _) in ranked
+    ]
+
+
+class ProfilingMiddleware:
+    """Profiles selected requests; see the module docstring for the settings."""
+
+    def __init__(self, get_response):
+        if os.getenv("PROFILING_ENABLED", "False").lower() != "true":
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.token = os.getenv("PROFILING_TOKEN", "")
+        self.sample_rate = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+        self.paths = tuple(
+            p for p in os.getenv("PROFILING_PATHS", "/api/predict/").split(",") if p
+        )
+        self.max_profiles = int(os.getenv("PROFILING_MAX_PROFILES", "200"))
+        self.directory = _profiles_dir()
+
+    def _should_profile(self, request) -> bool:
+        if not request.path.startswith(self.paths):
+            return False
+        # The header only counts with a configured token
+        if self.token and request.META.get(PROFILE_HEADER) == self.token:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if not self._should_profile(request) or not _profiling.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            return self._profile(request)
+        finally:
+            _profiling.release()
+
+    def _profile(self, request):
+        profile_id = uuid.uuid4().hex
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # Another profiler is active in this process
+            logger.info(f"Request not profiled: {e}")
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        try:
+            self._store(profile_id, request, response, profiler, elapsed_ms)
+            response["X-Profile-Id"] = profile_id
+        except Exception as e:
+            logger.warning(f"Failed to store profile {profile_id}: {e}")
+        return response
+
+    def _store(self, profile_id, request, response, profiler, elapsed_ms) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stats = pstats.Stats(profiler, stream=io.StringIO())
+        stats.dump_stats(self.directory / f"{profile_id}.prof")
+        summary = {
+            "profile_id": profile_id,
+            "request_id": request.META.get(REQUEST_ID_HEADER, "")[:128] or None,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "captured_at": time.time(),
+            "elapsed_ms": round(elapsed_ms, 3),
+            "total_calls": stats.total_calls,
+            "functions": summarize_profile(stats),
+        }
+        (self.directory / f"{profile_id}.json").write_text(
+            json.dumps(summary, indent=1)
+        )
+        self._prune()
+
+    def _prune(self) -> None:
+        summaries = sorted(
+            self.directory.glob("*.json"), key=lambda p: p.stat().st_mtime
+        )
+        for path in summaries[: max(0, len(summaries) - self.max_profiles)]:
+            path.unlink(missing_ok=True)
+            path.with_suffix(".prof").unlink(missing_ok=True)
+
+
+@staff_member_required
+def list_profiles(request):
+    """Most recent stored profiles first (staff only)."""
+    directory = _profiles_dir()
+    profiles = []
+    if directory.exists():
+        for path in sorted(
+            directory.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True
+        ):
+            try:
+                summary = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            profiles.append(
+                {
+                    key: summary.get(key)
+                    for key in (
+                        "profile_id",
+                        "request_id",
+                        "method",
+                        "path",
+                        "status",
+                        "captured_at",
+                        "elapsed_ms",
+                        "total_calls",
+                    )
+                }
+            )
+    return JsonResponse({"profiles": profiles})
+
+
+@staff_member_required
+def download_profile(request, profile_id):
+    """
+    The pstats dump of one profile, or its JSON summary with ?format=json (staff only).
+    """
+    if not _PROFILE_ID.match(profile_id):
+        raise Http404("Profile not found")
+    as_json = request.GET.get("format") == "json"
+    path = _profiles_dir() / f"{profile_id}.{'json' if as_json else 'prof'}"
+    if not path.exists():
+        raise Http404("Profile not found")
+    if as_json:
+        return JsonResponse(json.loads(path.read_text()))
+    return FileResponse(open(path, "rb"), as_attachment=True, filename=path.name)
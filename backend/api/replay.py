@@ -0,0 +1,388 @@
+"""
+Replay stored submissions against a candidate model before promoting it.
+
+Submissions are streamed from the database in primary-key order, one chunk
+at a time. Each chunk's input_json payloads are scored in one vectorized call
+by the baseline (by default the active model) and by the candidate,
+optionally in worker processes. Only running aggregates are kept, so memory
+does not grow with the table:
+
+- label flips in each direction, plus a sample of flipped submission ids
+- histograms of the probability shift (candidate - baseline), for all rows
+  and for flipped rows
+- metrics for both models on confirmed submissions (api/metrics.py
+  aggregates), and how many flips fixed or broke a confirmed case
+
+After every chunk the aggregates and the last submission id are written to a
+checkpoint file, so an interrupted run can continue where it stopped.
+"""
+
+import json
+import logging
+import os
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from inference.registry import ModelBundle
+
+from .metrics import apply_outcome, summarize
+from .models import ModelPerformance, Submission
+from .parallel import score_chunks
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_FORMAT = 1
+# Probability shift histogram: SHIFT_BINS equal bins over [-1, 1]
+SHIFT_BINS = 40
+SHIFT_EDGES = np.linspace(-1.0, 1.0, SHIFT_BINS + 1)
+MAX_FLIP_SAMPLES = 100
+# ModelPerformance fields that hold the running aggregates
+PERFORMANCE_FIELDS = (
+    "n",
+    "true_positives",
+    "false_positives",
+    "true_negatives",
+    "false_negatives",
+    "brier_sum",
+    "log_loss_sum",
+    "calibration_bins",
+    "histogram_positive",
+    "histogram_negative",
+)
+
+
+def payload_matrix(
+    payloads: List[Any], feature_names: List[str]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Stored input_json payloads as a schema-ordered float matrix, plus a mask of
+    the rows that are complete and numeric (the others are left as NaN).
+    """
+    try:
+        X = np.array(
+            [[p.get(name) for name in feature_names] for p in payloads],
+            dtype=np.float64,
+        )
+    except (AttributeError, TypeError, ValueError):
+        # Some payload is malformed; fall back to converting row by row
+        X = np.full((len(payloads), len(feature_names)), np.nan)
+        for i, payload in enumerate(payloads):
+            try:
+                X[i] = [float(payload[name]) for name in feature_names]
+            except (KeyError, TypeError, ValueError):
+                continue
+    X = X.reshape(len(payloads), len(feature_names))
+    return X, np.isfinite(X).all(axis=1)
+
+
+class ReplayScorer:
+    """
+    Scores payloads with the baseline and candidate models. Holds only model
+    directories and versions, so it can be sent to worker processes, which
+    load the bundles on first use.
+    """
+
+    def __init__(
+        self, baseline: Dict[str, str], candidate: Dict[str, str], fallback_schema: str
+    ):
+        self.baseline = baseline
+        self.candidate = candidate
+        self.fallback_schema = fallback_schema
+        self._bundles: Optional[Tuple[ModelBundle, ModelBundle]] = None
+
+    def bundles(self) -> Tuple[ModelBundle, ModelBundle]:
+        if self._bundles is None:
+            self._bundles = tuple(
+                ModelBundle.from_directory(
+                    Path(spec["model_dir"]),
+                    Path(self.fallback_schema),
+                    version=spec["version"],
+                )
+                for spec in (self.baseline, self.candidate)
+            )
+        return self._bundles
+
+    def load(self) -> None:
+        self.bundles()
+
+    def __getstate__(self):
+        return {**self.__dict__, "_bundles": None}
+
+    def score(self, payloads: List[Any]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (valid mask, baseline probabilities, candidate probabilities); invalid
+        rows score NaN.
+        """
+        valid = np.ones(len(payloads), dtype=bool)
+        matrices = []
+        for bundle in self.bundles():
+            X, ok = payload_matrix(payloads, bundle.feature_names)
+            matrices.append(X)
+            valid &= ok
+        probabilities = []
+        for bundle, X in zip(self.bundles(), matrices):
+            p = np.full(len(payloads), np.nan)
+            if valid.any():
+                p[valid] = bundle.predict_proba(X[valid])
+            probabilities.append(p)
+        return valid, probabilities[0], probabilities[1]
+
+
+class ReplayReport:
+    """Running aggregates of a replay; state() round-trips through the checkpoint."""
+
+    def __init__(self, baseline_threshold: float, candidate_threshold: float):
+        self.baseline_threshold = baseline_threshold
+        self.candidate_threshold = candidate_threshold
+        self.scanned = 0
+        self.unscorable = 0
+        self.flips = {"benign_to_malignant": 0, "malignant_to_benign": 0}
+        self.flip_samples: List[Dict[str, Any]] = []
+        self.shift_histogram = [0] * SHIFT_BINS
+        self.flip_shift_histogram = [0] * SHIFT_BINS
+        self.shift_sum = 0.0
+        self.abs_shift_sum = 0.0
+        self.max_abs_shift = 0.0
+        self.confirmed_flips = {"fixed": 0, "broken": 0}
+        self.performance = {
+            "baseline": ModelPerformance(model_version="baseline"),
+            "candidate": ModelPerformance(model_version="candidate"),
+        }
+
+    def add(
+        self,
+        ids: List[int],
+        confirmed: List[Optional[int]],
+        valid: np.ndarray,
+        baseline_p: np.ndarray,
+        candidate_p: np.ndarray,
+    ) -> None:
+        self.scanned += len(ids)
+        self.unscorable += int((~valid).sum())
+        ids = np.asarray(ids)[valid]
+        confirmed = [c for c, ok in zip(confirmed, valid) if ok]
+        baseline_p, candidate_p = baseline_p[valid], candidate_p[valid]
+        if not len(ids):
+            return
+
+        baseline_positive = baseline_p >= self.baseline_threshold
+        candidate_positive = candidate_p >= self.candidate_threshold
+        flipped = baseline_positive != candidate_positive
+        self.flips["benign_to_malignant"] += int((flipped & candidate_positive).sum())
+        self.flips["malignant_to_benign"] += int((flipped & baseline_positive).sum())
+        for i in np.flatnonzero(flipped)[
+            : max(0, MAX_FLIP_SAMPLES - len(self.flip_samples))
+        ]:
+            self.flip_samples.append(
+                {
+                    "submission_id": int(ids[i]),
+                    "baseline_probability": float(baseline_p[i]),
+                    "candidate_probability": float(candidate_p[i]),
+                    "confirmed_label": confirmed[i],
+                }
+            )
+
+        shift = candidate_p - baseline_p
+        self.shift_histogram = (
+            self.shift_histogram + np.histogram(shift, SHIFT_EDGES)[0]
+        ).tolist()
+        self.flip_shift_histogram = (
+            self.flip_shift_histogram + np.histogram(shift[flipped], SHIFT_EDGES)[0]
+        ).tolist()
+        self.shift_sum += float(shift.sum())
+        self.abs_shift_sum += float(np.abs(shift).sum())
+        self.max_abs_shift = max(self.max_abs_shift, float(np.abs(shift).max()))
+
+        # Confirmed rows are a small minority; fold them into the metric
+        # aggregates one by one
+        for i, label in enumerate(confirmed):
+            if label is None:
+                continue
+            for name, p, positive in (
+                ("baseline", baseline_p[i], baseline_positive[i]),
+                ("candidate", candidate_p[i], candidate_positive[i]),
+            ):
+                apply_outcome(
+                    self.performance[name],
+                    float(p),
+                    "malignant" if positive else "benign",
+                    label,
+                )
+            if flipped[i]:
+                self.confirmed_flips[
+                    "fixed" if candidate_positive[i] == bool(label) else "broken"
+                ] += 1
+
+    @property
+    def scored(self) -> int:
+        return self.scanned - self.unscorable
+
+    def state(self) -> Dict[str, Any]:
+        state = {k: v for k, v in self.__dict__.items() if k != "performance"}
+        state["performance"] = {
+            name: {field: getattr(perf, field) for field in PERFORMANCE_FIELDS}
+            for name, perf in self.performance.items()
+        }
+        return state
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "ReplayReport":
+        report = cls(state["baseline_threshold"], state["candidate_threshold"])
+        for key, value in state.items():
+            if key == "performance":
+                for name, fields in value.items():
+                    for field, field_value in fields.items():
+                        setattr(report.performance[name], field, field_value)
+            else:
+                setattr(report, key, value)
+        return report
+
+    def to_dict(self) -> Dict[str, Any]:
+        scored = self.scored
+        flipped = sum(self.flips.values())
+        metrics = {}
+        for name, perf in self.performance.items():
+            summary = summarize(perf) if perf.n else {"confirmed": 0}
+            summary.pop("model_version", None)
+            summary.pop("updated_at", None)
+            metrics[name] = summary
+        return {
+            "scanned": self.scanned,
+            "scored": scored,
+            "unscorable": self.unscorable,
+            "label_flips": {
+                **self.flips,
+                "total": flipped,
+                "rate": flipped / scored if scored else None,
+                "samples": self.flip_samples,
+            },
+            "probability_shift": {
+                "mean": self.shift_sum / scored if scored else None,
+                "mean_abs": self.abs_shift_sum / scored if scored else None,
+                "max_abs": self.max_abs_shift,
+                "bin_edges": SHIFT_EDGES.round(4).tolist(),
+                "histogram": self.shift_histogram,
+                "flipped_histogram": self.flip_shift_histogram,
+            },
+            "confirmed": {
+                "flips_fixed": self.confirmed_flips["fixed"],
+                "flips_broken": self.confirmed_flips["broken"],
+                "metrics": metrics,
+            },
+        }
+
+
+def _write_json(path: Path, data: Dict[str, Any]) -> None:
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(data, indent=2, default=str))
+    os.replace(tmp_path, path)
+
+
+def _model_spec(bundle: ModelBundle) -> Dict[str, str]:
+    return {"model_dir": str(bundle.model_dir.resolve()), "version": bundle.version}
+
+
+def run_replay(
+    baseline: ModelBundle,
+    candidate: ModelBundle,
+    fallback_schema: Path,
+    checkpoint_path: Path,
+    chunk_size: int = 5000,
+    workers: int = 0,
+    resume: bool = False,
+    limit: Optional[int] = None,
+    progress: Optional[Callable[[ReplayReport, int], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Replay every submission up to the current max id and return the report.
+    With resume=True and a matching checkpoint, continue after its last id
+    (the id range is fixed when a run starts, so later inserts are not included).
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    if limit is not None and limit < 1:
+        raise ValueError("limit must be at least 1")
+    for bundle in (baseline, candidate):
+        if bundle.scoring_model() is None:
+            raise RuntimeError(
+                f"Model {bundle.version} in {bundle.model_dir} could not be loaded"
+            )
+    specs = {"baseline": _model_spec(baseline), "candidate": _model_spec(candidate)}
+
+    checkpoint = None
+    if resume and checkpoint_path.exists():
+        checkpoint = json.loads(checkpoint_path.read_text())
+        if (
+            checkpoint.get("format") != CHECKPOINT_FORMAT
+            or checkpoint["models"] != specs
+        ):
+            raise ValueError(
+                f"Checkpoint {checkpoint_path} is for different models; "
+                "remove it or drop --resume"
+            )
+    if checkpoint:
+        report = ReplayReport.from_state(checkpoint["report"])
+        last_id, max_id = checkpoint["last_id"], checkpoint["max_id"]
+        logger.info(
+            f"Resuming replay after submission {last_id} "
+            f"({report.scanned} already scanned)"
+        )
+    else:
+        report = ReplayReport(baseline.config.threshold, candidate.config.threshold)
+        last_id = 0
+        ids = Submission.objects.order_by("id").values_list("id", flat=True)
+        max_id = ids.last() or 0
+        if limit is not None:
+            max_id = next(iter(ids[limit - 1 : limit]), max_id)
+
+    scorer = ReplayScorer(specs["baseline"], specs["candidate"], str(fallback_schema))
+
+    def save_checkpoint(upto: int) -> None:
+        _write_json(
+            checkpoint_path,
+            {
+                "format": CHECKPOINT_FORMAT,
+                "models": specs,
+                "max_id": max_id,
+                "last_id": upto,
+                "report": report.state(),
+            },
+        )
+
+    def chunks() -> Iterator[Tuple[Tuple[List[int], List[Optional[int]]], List[Any]]]:
+        cursor = last_id
+        while True:
+            rows = list(
+                Submission.objects.filter(id__gt=cursor, id__lte=max_id)
+                .order_by("id")
+                .values_list("id", "input_json", "confirmed_label")[:chunk_size]
+            )
+            if not rows:
+                return
+            ids, payloads, confirmed = (list(column) for column in zip(*rows))
+            cursor = ids[-1]
+            yield (ids, confirmed), payloads
+
+    # Results come back in id order, so the checkpoint never skips a chunk that is
+    # still in flight
+    with closing(score_chunks(scorer, chunks(), workers)) as results:
+        for (ids, confirmed), result in results:
+            report.add(ids, confirmed, *result)
+            last_id = ids[-1]
+            save_checkpoint(last_id)
+            if progress is not None:
+                progress(report, max_id)
+
+    return {
+        "baseline": specs["baseline"],
+        "candidate": specs["candidate"],
+        "thresholds": {
+            "baseline": report.baseline_threshold,
+            "candidate": report.candidate_threshold,
+        },
+        "submission_id_range": [1, max_id],
+        **report.to_dict(),
+    }
@@ -3,14 +3,19 @@ from rest_framework import serializers
 from .models import Submission
 
 class SubmissionReadSerializer(serializers.ModelSerializer):
+    # Same key the predict endpoints return
+    submission_id = serializers.IntegerField(source="id", read_only=True)
+
     class Meta:
         model = Submission
         fields = [
             "id",
-            "created_at",
-            "input_data",
+            "submission_id",
+            "submitted_at",
+            "input_json",
             "prediction_label",
             "probability_malignant",
+            "top_contributions",
             "model_version",
             "confirmed_label",
             "confirmed_at",
@@ -19,4 +24,4 @@ class SubmissionReadSerializer(serializers.ModelSerializer):
 class ConfirmSerializer(serializers.Serializer):
     submission_id = serializers.IntegerField()
     # 0 = benign, 1 = malignant (match your README)
-    confirmed_label = serializers.IntegerField(min_value=0, max_value=1)
\ No newline at end of file
+    confirmed_label = serializers.IntegerField(min_value=0, max_value=1)
@@ -0,0 +1,83 @@
+"""
+Batch prediction endpoint: vectorized scoring and one bulk insert per request.
+"""
+
+import os
+from unittest import mock
+
+from django.test import TestCase
+
+from api.models import Submission
+from inference import predictor
+
+from .utils import model_mode, valid_record
+
+URL = "/api/predict/batch/"
+
+
+class BatchPredictTests(TestCase):
+    def post(self, data):
+        return self.client.post(URL, data, content_type="application/json")
+
+    def test_matches_single_predictions(self):
+        records = [valid_record(radius_mean=r) for r in (8.0, 14.0, 20.0, 27.0)]
+        with model_mode(PREDICTION_CACHE_SIZE="0"):
+            response = self.post(records)
+            single = [predictor.predict(r) for r in records]
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual((body["created"], body["errors"]), (4, 0))
+        for i, (result, (label, probability, contributions, version)) in enumerate(
+            zip(body["results"], single)
+        ):
+            self.assertEqual(result["index"], i)
+            self.assertEqual(result["prediction_label"], label)
+            self.assertAlmostEqual(
+                result["probability_malignant"], probability, places=12
+            )
+            self.assertEqual(
+                [c["feature"] for c in result["top_contributions"]],
+                [c["feature"] for c in contributions],
+            )
+            self.assertEqual(result["model_version"], version)
+        self.assertNotEqual(body["results"][0]["model_version"], "dummy-1.0")
+
+        ids = [r["submission_id"] for r in body["results"]]
+        self.assertEqual(
+            list(
+                Submission.objects.filter(id__in=ids)
+                .order_by("id")
+                .values_list("id", flat=True)
+            ),
+            sorted(ids),
+        )
+
+    def test_invalid_records_are_reported_per_index(self):
+        response = self.post(
+            {"records": [valid_record(), valid_record(radius_mean="big"), "nope"]}
+        )
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual((body["created"], body["errors"]), (1, 2))
+        self.assertIn("submission_id", body["results"][0])
+        self.assertEqual(body["results"][1]["index"], 1)
+        self.assertEqual(body["results"][1]["errors"][0]["code"], "not_numeric")
+        self.assertEqual(body["results"][2]["errors"][0]["code"], "not_object")
+        self.assertEqual(Submission.objects.count(), 1)
+
+    def test_all_invalid(self):
+        response = self.post([{"radius_mean": 14.1}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["created"], 0)
+        self.assertFalse(Submission.objects.exists())
+
+    def test_rejects_empty_and_non_list_input(self):
+        for data in ([], {"records": []}, {"radius_mean": 14.1}):
+            with self.subTest(data=data):
+                self.assertEqual(self.post(data).status_code, 400)
+
+    def test_batch_size_limit(self):
+        with mock.patch.dict(os.environ, {"PREDICT_BATCH_MAX_SIZE": "2"}):
+            response = self.post([valid_record()] * 3)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("max 2", response.json()["error"])
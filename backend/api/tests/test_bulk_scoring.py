@@ -0,0 +1,100 @@
+"""
+Offline file scoring (api/bulk_scoring.py, the score_file command).
+"""
+
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.test import TransactionTestCase
+
+from api.bulk_scoring import UNSCORABLE_ERROR, score_file
+from api.models import Submission
+from inference.predictor import MODEL_DIR, SCHEMA_PATH
+from inference.registry import ModelBundle
+
+
+class ScoreFileTests(TransactionTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.bundle = ModelBundle.from_directory(MODEL_DIR, SCHEMA_PATH)
+        cls.feature_names = cls.bundle.feature_names
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        features = self.bundle.schema["features"]
+        rng = np.random.default_rng(0)
+        frame = pd.DataFrame(
+            {f["name"]: rng.uniform(f["min"], f["max"], 25) for f in features}
+        )
+        frame.insert(0, "id", range(100, 125))
+        frame[self.feature_names[0]] = frame[self.feature_names[0]].astype(object)
+        frame.loc[3, self.feature_names[0]] = "n/a"
+        frame.loc[7, self.feature_names[1]] = features[1]["max"] * 10
+        self.frame = frame
+        self.input_path = self.dir / "cases.csv"
+        frame.to_csv(self.input_path, index=False)
+
+    def score(self, name, **kwargs):
+        output_path = self.dir / name
+        result = score_file(
+            self.bundle,
+            SCHEMA_PATH,
+            self.input_path,
+            output_path,
+            chunk_size=4,
+            **kwargs,
+        )
+        return result, pd.read_csv(output_path)
+
+    def test_output_matches_the_model(self):
+        result, output = self.score("results.csv")
+        self.assertEqual(result["rows"], 25)
+        self.assertEqual(result["unscorable"], 1)
+        self.assertEqual(output["row"].tolist(), list(range(25)))
+        self.assertEqual(output["id"].tolist(), self.frame["id"].tolist())
+        self.assertEqual(output.loc[3, "error"], UNSCORABLE_ERROR)
+        self.assertTrue(np.isnan(output.loc[3, "probability_malignant"]))
+
+        scored = output.drop(index=3)
+        X = self.frame.drop(index=3)[self.feature_names].astype(float).to_numpy()
+        np.testing.assert_allclose(
+            scored["probability_malignant"], self.bundle.predict_proba(X), rtol=1e-9
+        )
+        self.assertFalse(Path(str(self.dir / "results.csv") + ".partial").exists())
+
+    def test_workers_match_in_process_scoring(self):
+        _, in_process = self.score("in_process.csv")
+        result, pooled = self.score("pooled.csv", workers=2)
+        self.assertEqual(result["scored"], 24)
+        pd.testing.assert_frame_equal(in_process, pooled)
+
+    def test_limit(self):
+        result, output = self.score("results.csv", limit=10, explain=False)
+        self.assertEqual(result["rows"], 10)
+        self.assertTrue(output["top_contributions"].isna().all())
+
+    def test_save_applies_schema_validation(self):
+        result, output = self.score("results.csv", save=True)
+        self.assertEqual(result["saved"], 23)
+        self.assertEqual(result["rejected"], 1)
+        self.assertEqual(Submission.objects.count(), 23)
+
+        # Out of range: scored, but rejected by the validator before saving
+        self.assertFalse(np.isnan(output.loc[7, "probability_malignant"]))
+        self.assertTrue(pd.isna(output.loc[7, "submission_id"]))
+        self.assertIn(
+            f"{self.feature_names[1]} must be between", output.loc[7, "error"]
+        )
+        self.assertTrue(pd.isna(output.loc[3, "submission_id"]))
+
+        stored = Submission.objects.get(id=int(output.loc[0, "submission_id"]))
+        self.assertEqual(
+            stored.input_json[self.feature_names[2]],
+            self.frame.loc[0, self.feature_names[2]],
+        )
+        self.assertEqual(stored.model_version, self.bundle.version)
@@ -0,0 +1,44 @@
+"""
+Submission indexes and the per-connection SQLite settings.
+"""
+
+from django.db import connection
+from django.test import TestCase
+
+from api.models import Submission
+
+
+class DatabaseTuningTests(TestCase):
+    def query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return " ".join(str(row[-1]) for row in cursor.fetchall())
+
+    def test_listing_queries_use_indexes(self):
+        plans = {
+            "submission_submitted_idx": Submission.objects.order_by(
+                "-submitted_at", "-id"
+            )[:50],
+            "submission_version_idx": Submission.objects.filter(
+                model_version="v1"
+            ).order_by("-submitted_at")[:50],
+            "submission_label_idx": Submission.objects.filter(
+                prediction_label="benign"
+            ).order_by("-submitted_at")[:50],
+            "submission_confirmed_at_idx": Submission.objects.filter(
+                confirmed_at__isnull=False
+            ).order_by("confirmed_at", "id"),
+        }
+        for index, queryset in plans.items():
+            with self.subTest(index=index):
+                plan = self.query_plan(queryset)
+                self.assertIn(index, plan)
+                self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_connection_pragmas(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA cache_size")
+            self.assertLess(cursor.fetchone()[0], 0)
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 20000)
@@ -0,0 +1,143 @@
+"""
+Lean endpoints (api/lean.py) and the fast JSON helpers (api/fastjson.py).
+"""
+
+import json
+import math
+import re
+from datetime import date, datetime, time, timezone
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from api import fastjson
+from api.models import Submission
+
+from .utils import valid_record
+
+LEAN = "/api/lean/"
+
+
+class LeanEndpointTests(TestCase):
+    def post(self, path, body, **headers):
+        return self.client.post(
+            path, body, content_type="application/json", headers=headers
+        )
+
+    def test_health_matches_drf(self):
+        drf, lean = self.client.get("/api/health/"), self.client.get(f"{LEAN}health/")
+        self.assertEqual(lean.status_code, 200)
+        self.assertEqual(lean.content, drf.content)
+        self.assertEqual(lean["Content-Type"], "application/json")
+
+    def test_schema_matches_drf(self):
+        drf, lean = self.client.get("/api/schema/"), self.client.get(f"{LEAN}schema/")
+        self.assertEqual(lean.status_code, 200)
+        self.assertEqual(lean.content, drf.content)
+        self.assertEqual(int(lean["Content-Length"]), len(lean.content))
+
+    def test_predict_matches_drf(self):
+        body = json.dumps(valid_record())
+        drf, lean = self.post("/api/predict/", body), self.post(f"{LEAN}predict/", body)
+        self.assertEqual((drf.status_code, lean.status_code), (201, 201))
+        drf_id, lean_id = drf.json()["submission_id"], lean.json()["submission_id"]
+        self.assertEqual(Submission.objects.filter(id__in=[drf_id, lean_id]).count(), 2)
+        # Identical apart from the new submission's id
+        self.assertEqual(
+            lean.content,
+            re.sub(
+                rb'"submission_id":\d+',
+                f'"submission_id":{lean_id}'.encode(),
+                drf.content,
+            ),
+        )
+
+    def test_invalid_record_matches_drf(self):
+        body = json.dumps(valid_record(radius_mean=1e6))
+        drf, lean = self.post("/api/predict/", body), self.post(f"{LEAN}predict/", body)
+        self.assertEqual(lean.status_code, 400)
+        self.assertEqual(lean.content, drf.content)
+        self.assertEqual(lean.json()["errors"][0]["code"], "out_of_range")
+
+    def test_malformed_json(self):
+        response = self.post(f"{LEAN}predict/", "{not json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("JSON parse error", response.json()["error"])
+
+    def test_unknown_pinned_version(self):
+        response = self.client.get(
+            f"{LEAN}schema/", headers={"X-Model-Version": "no-such-version"}
+        )
+        self.assertEqual(response.status_code, 404)
+        response = self.post(
+            f"{LEAN}predict/",
+            json.dumps(valid_record()),
+            **{"X-Model-Version": "../model"},
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_wrong_method(self):
+        self.assertEqual(self.client.post(f"{LEAN}health/").status_code, 405)
+        self.assertEqual(self.client.get(f"{LEAN}predict/").status_code, 405)
+
+    def test_unknown_path_falls_through(self):
+        self.assertEqual(self.client.get(f"{LEAN}nothing-here/").status_code, 404)
+
+    def test_disallowed_host(self):
+        for path in ("/api/health/", f"{LEAN}health/", f"{LEAN}schema/"):
+            with self.subTest(path=path):
+                response = self.client.get(path, headers={"Host": "evil.example"})
+                self.assertEqual(response.status_code, 400)
+        response = self.post(
+            f"{LEAN}predict/", json.dumps(valid_record()), Host="evil.example"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Submission.objects.exists())
+
+    @override_settings(ALLOWED_HOSTS=["api.example"])
+    def test_allowed_host(self):
+        response = self.client.get(f"{LEAN}health/", headers={"Host": "api.example"})
+        self.assertEqual(response.status_code, 200)
+
+
+class FastJsonTests(SimpleTestCase):
+    def test_dumps_matches_drf_renderer(self):
+        from rest_framework.renderers import JSONRenderer
+
+        data = {
+            "label": "bénin",
+            "values": [1.5, 2, None],
+            "nested": {"a": " "},
+            "at": datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc),
+            "naive": datetime(2024, 5, 1, 12, 30, 15, 500),
+            "day": date(2024, 5, 1),
+            "time": time(9, 5, 1, 250000),
+        }
+        expected = JSONRenderer().render(data)
+        self.assertEqual(fastjson.dumps(data), expected)
+        with mock.patch.object(fastjson, "orjson", None):
+            self.assertEqual(fastjson.dumps(data), expected)
+
+    def test_dumps_refuses_non_finite_floats(self):
+        from rest_framework.renderers import JSONRenderer
+
+        for value in (math.nan, math.inf, -math.inf):
+            data = {"values": [1.0, None, {"p": value}]}
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    JSONRenderer().render(data)
+                with self.assertRaises(ValueError):
+                    fastjson.dumps(data)
+                with (
+                    mock.patch.object(fastjson, "orjson", None),
+                    self.assertRaises(ValueError),
+                ):
+                    fastjson.dumps(data)
+
+    def test_loads(self):
+        self.assertEqual(fastjson.loads(b'{"a": [1, 2.5]}'), {"a": [1, 2.5]})
+        with self.assertRaises(ValueError):
+            fastjson.loads(b"{")
+        with mock.patch.object(fastjson, "orjson", None):
+            with self.assertRaises(ValueError):
+                fastjson.loads(b"{")
@@ -0,0 +1,138 @@
+"""
+Live model metrics kept incrementally from doctor confirmations.
+"""
+
+import threading
+from unittest import skipUnless
+
+import numpy as np
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from rest_framework.renderers import JSONRenderer
+from sklearn.metrics import brier_score_loss, log_loss, roc_auc_score
+
+from api import fastjson
+from api.metrics import rebuild_all, summarize
+from api.models import ModelPerformance, Submission
+
+AGGREGATE_FIELDS = (
+    "n",
+    "true_positives",
+    "false_positives",
+    "true_negatives",
+    "false_negatives",
+    "histogram_positive",
+    "histogram_negative",
+)
+
+
+def make_submissions(probabilities, model_version="v1"):
+    return [
+        Submission.objects.create(
+            input_json={},
+            probability_malignant=p,
+            model_version=model_version,
+            prediction_label="malignant" if p >= 0.5 else "benign",
+        )
+        for p in probabilities
+    ]
+
+
+class ConfirmationMetricsMixin:
+    def confirm(self, submission_id, label):
+        return self.client.post(
+            "/api/confirm/",
+            {"submission_id": submission_id, "confirmed_label": label},
+            content_type="application/json",
+        )
+
+    def assertMatchesRebuild(self, model_version="v1"):
+        live = ModelPerformance.objects.get(model_version=model_version)
+        rebuild_all()
+        rebuilt = ModelPerformance.objects.get(model_version=model_version)
+        for field in AGGREGATE_FIELDS:
+            self.assertEqual(getattr(live, field), getattr(rebuilt, field), field)
+        self.assertAlmostEqual(live.brier_sum, rebuilt.brier_sum)
+        self.assertAlmostEqual(live.log_loss_sum, rebuilt.log_loss_sum)
+
+
+class ModelMetricsTests(ConfirmationMetricsMixin, TestCase):
+    def test_metrics_match_sklearn(self):
+        rng = np.random.default_rng(0)
+        probabilities = rng.uniform(size=200).round(6)
+        labels = (rng.uniform(size=200) < probabilities).astype(int)
+        for submission, label in zip(make_submissions(probabilities), labels):
+            self.assertEqual(self.confirm(submission.id, int(label)).status_code, 200)
+
+        response = self.client.get("/api/metrics/model/", {"model_version": "v1"})
+        metrics = response.json()["versions"][0]
+        self.assertEqual(metrics["confirmed"], 200)
+        predicted = (probabilities >= 0.5).astype(int)
+        self.assertAlmostEqual(metrics["accuracy"], float((predicted == labels).mean()))
+        self.assertAlmostEqual(
+            metrics["brier_score"], brier_score_loss(labels, probabilities)
+        )
+        self.assertAlmostEqual(
+            metrics["log_loss"], log_loss(labels, probabilities), places=6
+        )
+        self.assertAlmostEqual(
+            metrics["roc_auc_approx"], roc_auc_score(labels, probabilities), delta=0.01
+        )
+
+    def test_reconfirmation_replaces_the_previous_outcome(self):
+        (submission,) = make_submissions([0.9])
+        self.confirm(submission.id, 0)
+        self.confirm(submission.id, 1)
+        self.confirm(submission.id, 1)
+        perf = ModelPerformance.objects.get(model_version="v1")
+        self.assertEqual((perf.n, perf.true_positives, perf.false_positives), (1, 1, 0))
+        self.assertMatchesRebuild()
+
+    def test_unknown_submission(self):
+        self.assertEqual(self.confirm(999999, 1).status_code, 404)
+        self.assertFalse(ModelPerformance.objects.exists())
+
+    @skipUnless(fastjson.orjson, "orjson is not installed")
+    def test_summary_renders_as_drf_does(self):
+        for submission, label in zip(
+            make_submissions([0.1, 0.7, 0.4, 0.95]), [0, 1, 1, 0]
+        ):
+            self.confirm(submission.id, label)
+        perf = ModelPerformance.objects.get(model_version="v1")
+        summary = summarize(perf)
+        body = fastjson.ORJSONRenderer().render(summary)
+        self.assertEqual(body, JSONRenderer().render(summary))
+        # orjson's own datetime format ("+00:00") would not have matched
+        self.assertNotEqual(
+            fastjson.orjson.dumps(summary, default=fastjson._default), body
+        )
+
+    def test_summary_without_confirmations(self):
+        summary = summarize(ModelPerformance(model_version="v1"))
+        self.assertIsNone(summary["accuracy"])
+        self.assertIsNone(summary["roc_auc_approx"])
+
+
+class ConcurrentConfirmationTests(ConfirmationMetricsMixin, TransactionTestCase):
+    def test_concurrent_reconfirmations_are_counted_once(self):
+        (submission,) = make_submissions([0.3])
+        self.confirm(submission.id, 0)
+        start = threading.Barrier(8)
+        statuses = []
+
+        def reconfirm(label):
+            start.wait()
+            try:
+                statuses.append(self.confirm(submission.id, label).status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=reconfirm, args=(i % 2,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(statuses, [200] * 8)
+        self.assertEqual(ModelPerformance.objects.get(model_version="v1").n, 1)
+        self.assertMatchesRebuild()
@@ -0,0 +1,100 @@
+"""
+Opt-in per-request profiling middleware and the staff profile views.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+
+from api import profiling
+
+TOKEN = "secret-token"
+
+
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = Path(tmp.name)
+        environ = mock.patch.dict(
+            os.environ,
+            {
+                "PROFILING_ENABLED": "True",
+                "PROFILING_TOKEN": TOKEN,
+                "PROFILING_PATHS": "/api/health/",
+                "PROFILING_DIR": tmp.name,
+            },
+        )
+        environ.start()
+        self.addCleanup(environ.stop)
+        # A fresh client builds its middleware chain with the settings above
+        self.client = Client()
+
+    def get_health(self, **headers):
+        return self.client.get("/api/health/", headers=headers)
+
+    def test_profiles_requests_with_the_token(self):
+        response = self.get_health(X_Profile=TOKEN)
+        self.assertEqual(response.status_code, 200)
+        profile_id = response["X-Profile-Id"]
+        self.assertTrue((self.directory / f"{profile_id}.prof").exists())
+        self.assertTrue((self.directory / f"{profile_id}.json").exists())
+        self.assertNotIn("X-Profile-Id", self.get_health(X_Profile="wrong"))
+        self.assertNotIn("X-Profile-Id", self.get_health())
+
+    def test_client_request_id_never_names_the_file(self):
+        first = self.get_health(X_Profile=TOKEN)["X-Profile-Id"]
+        stored = (self.directory / f"{first}.prof").read_bytes()
+        second = self.get_health(X_Profile=TOKEN, X_Request_ID=first)["X-Profile-Id"]
+        self.assertNotEqual(first, second)
+        self.assertEqual((self.directory / f"{first}.prof").read_bytes(), stored)
+        self.get_health(X_Profile=TOKEN, X_Request_ID="../../escape")
+        self.assertEqual(len(list(self.directory.glob("*.json"))), 3)
+        self.assertFalse(any(self.directory.parent.glob("escape*")))
+
+    def test_runs_unprofiled_when_another_profiler_is_active(self):
+        with mock.patch(
+            "cProfile.Profile.enable",
+            side_effect=ValueError("Another profiling tool is already active"),
+        ):
+            response = self.get_health(X_Profile=TOKEN)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Profile-Id", response)
+        self.assertFalse(any(self.directory.iterdir()))
+
+    def test_one_profiled_request_at_a_time(self):
+        with profiling._profiling:
+            response = self.get_health(X_Profile=TOKEN)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Profile-Id", response)
+        self.assertIn("X-Profile-Id", self.get_health(X_Profile=TOKEN))
+
+    def test_staff_can_list_and_download(self):
+        profile_id = self.get_health(X_Profile=TOKEN, X_Request_ID="trace-1")[
+            "X-Profile-Id"
+        ]
+        self.assertEqual(self.client.get("/admin/profiles/").status_code, 302)
+
+        staff = get_user_model().objects.create_user(
+            "staff", password="pw", is_staff=True
+        )
+        self.client.force_login(staff)
+        listed = self.client.get("/admin/profiles/").json()["profiles"]
+        self.assertEqual(
+            [(p["profile_id"], p["request_id"]) for p in listed],
+            [(profile_id, "trace-1")],
+        )
+        summary = self.client.get(
+            f"/admin/profiles/{profile_id}/", {"format": "json"}
+        ).json()
+        self.assertTrue(summary["functions"])
+        self.assertEqual(
+            self.client.get(f"/admin/profiles/{profile_id}/").status_code, 200
+        )
+        self.assertEqual(
+            self.client.get("/admin/profiles/not-a-profile/").status_code, 404
+        )
@@ -0,0 +1,42 @@
+"""
+Readiness reporting (/api/ready/) with eager and lazy warmup.
+"""
+
+import os
+import sys
+from unittest import mock
+
+from django.apps import apps
+from django.test import SimpleTestCase
+
+from inference import predictor
+
+
+class ReadinessTests(SimpleTestCase):
+    def setUp(self):
+        predictor._ready.clear()
+        predictor._warmup_report = {"status": "cold"}
+        self.addCleanup(predictor._ready.clear)
+
+    def test_not_ready_before_warmup(self):
+        response = self.client.get("/api/ready/")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()["status"], "cold")
+
+    def test_ready_after_warmup(self):
+        predictor.warmup()
+        response = self.client.get("/api/ready/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "ready")
+
+    def test_ready_without_eager_warmup(self):
+        with (
+            mock.patch.dict(os.environ, {"EAGER_WARMUP": "False"}),
+            mock.patch.object(sys, "argv", ["gunicorn"]),
+            mock.patch("threading.Thread") as thread,
+        ):
+            apps.get_app_config("api").ready()
+        thread.assert_not_called()
+        response = self.client.get("/api/ready/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "lazy")
@@ -0,0 +1,193 @@
+"""
+Replay of stored submissions against a candidate model (api/replay.py).
+"""
+
+import json
+import os
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+from django.core.management import CommandError, call_command
+from django.test import TransactionTestCase
+
+from api.models import Submission
+from api.replay import payload_matrix, run_replay
+from inference.predictor import MODEL_DIR, SCHEMA_PATH
+from inference.registry import ModelBundle
+
+from .utils import valid_record
+
+
+class Interrupted(Exception):
+    pass
+
+
+class ReplayTests(TransactionTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.bundle = ModelBundle.from_directory(MODEL_DIR, SCHEMA_PATH)
+        cls.features = cls.bundle.schema["features"]
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.checkpoint = Path(tmp.name) / "replay.checkpoint"
+        rng = np.random.default_rng(0)
+        rows = []
+        for i in range(30):
+            record = {
+                f["name"]: float(rng.uniform(f["min"], f["max"])) for f in self.features
+            }
+            rows.append(
+                Submission(
+                    input_json=record,
+                    prediction_label="benign",
+                    probability_malignant=0.5,
+                    model_version="v1",
+                    confirmed_label=i % 2 if i % 3 == 0 else None,
+                )
+            )
+        rows.append(
+            Submission(
+                input_json=valid_record(**{self.features[0]["name"]: "n/a"}),
+                prediction_label="benign",
+                probability_malignant=0.5,
+                model_version="v1",
+            )
+        )
+        Submission.objects.bulk_create(rows)
+
+    def replay(self, **kwargs):
+        return run_replay(
+            self.bundle,
+            self.bundle,
+            SCHEMA_PATH,
+            self.checkpoint,
+            **{"chunk_size": 7, **kwargs},
+        )
+
+    def test_same_model_has_no_flips(self):
+        report = self.replay()
+        self.assertEqual(report["scanned"], 31)
+        self.assertEqual(report["scored"], 30)
+        self.assertEqual(report["unscorable"], 1)
+        self.assertEqual(report["label_flips"]["total"], 0)
+        self.assertEqual(report["probability_shift"]["max_abs"], 0.0)
+        self.assertEqual(report["confirmed"]["metrics"]["baseline"]["confirmed"], 10)
+        self.assertEqual(
+            report["confirmed"]["metrics"]["baseline"],
+            report["confirmed"]["metrics"]["candidate"],
+        )
+
+    def test_workers_match_in_process_replay(self):
+        self.assertEqual(self.replay(workers=2), self.replay())
+
+    def test_resume_continues_after_the_checkpoint(self):
+        expected = self.replay()
+        self.checkpoint.unlink()
+        seen = []
+
+        def stop_after_two_chunks(report, max_id):
+            seen.append(report.scanned)
+            if len(seen) == 2:
+                raise Interrupted
+
+        with self.assertRaises(Interrupted):
+            self.replay(progress=stop_after_two_chunks)
+        self.assertEqual(self.replay(resume=True), expected)
+
+    def test_limit(self):
+        self.assertEqual(self.replay(limit=10)["scanned"], 10)
+
+    def test_rejects_non_positive_limit_and_chunk_size(self):
+        for options in ({"limit": 0}, {"limit": -5}, {"chunk_size": 0}):
+            with self.subTest(**options), self.assertRaises(ValueError):
+                self.replay(**options)
+            flag, value = next(iter(options.items()))
+            with (
+                self.subTest(command=flag),
+                self.assertRaisesMessage(CommandError, "must be at least 1"),
+            ):
+                call_command(
+                    "replay_submissions",
+                    str(MODEL_DIR),
+                    f"--{flag.replace('_', '-')}",
+                    str(value),
+                    "--out",
+                    str(self.checkpoint.with_name("report.json")),
+                )
+
+    def test_flips_against_a_candidate_with_another_threshold(self):
+        rows = list(
+            Submission.objects.order_by("id").values_list(
+                "input_json", "confirmed_label"
+            )
+        )[:30]
+        X, _ = payload_matrix(
+            [payload for payload, _ in rows], self.bundle.feature_names
+        )
+        p = self.bundle.predict_proba(X)
+        threshold = float(np.median(p))
+        with mock.patch.dict(os.environ, {"PREDICTION_THRESHOLD": repr(threshold)}):
+            candidate = ModelBundle.from_directory(
+                MODEL_DIR, SCHEMA_PATH, version="candidate"
+            )
+        report = run_replay(
+            self.bundle, candidate, SCHEMA_PATH, self.checkpoint, chunk_size=7
+        )
+
+        before, after = p >= self.bundle.config.threshold, p >= threshold
+        flips = report["label_flips"]
+        self.assertEqual(flips["benign_to_malignant"], int((after & ~before).sum()))
+        self.assertEqual(flips["malignant_to_benign"], int((before & ~after).sum()))
+        self.assertGreater(flips["total"], 0)
+        self.assertEqual(report["probability_shift"]["max_abs"], 0.0)
+
+        confirmed = [
+            (label, b, a)
+            for (_, label), b, a in zip(rows, before, after)
+            if label is not None and a != b
+        ]
+        self.assertEqual(
+            report["confirmed"]["flips_fixed"],
+            sum(a == bool(label) for label, _, a in confirmed),
+        )
+        self.assertEqual(
+            report["confirmed"]["flips_broken"],
+            sum(a != bool(label) for label, _, a in confirmed),
+        )
+
+    def test_resume_refuses_a_checkpoint_for_other_models(self):
+        self.replay()
+        other = ModelBundle.from_directory(MODEL_DIR, SCHEMA_PATH, version="other")
+        with self.assertRaisesMessage(ValueError, "different models"):
+            run_replay(self.bundle, other, SCHEMA_PATH, self.checkpoint, resume=True)
+
+    def test_command(self):
+        out = self.checkpoint.with_name("report.json")
+        stdout = StringIO()
+        call_command(
+            "replay_submissions",
+            str(MODEL_DIR),
+            "--baseline",
+            str(MODEL_DIR),
+            "--out",
+            str(out),
+            "--chunk-size",
+            "10",
+            stdout=stdout,
+        )
+        report = json.loads(out.read_text())
+        self.assertEqual(report["scanned"], 31)
+        self.assertFalse(Path(f"{out}.checkpoint").exists())
+        self.assertIn("Replayed 30 submissions (1 unscorable)", stdout.getvalue())
+
+    def test_payload_matrix_marks_incomplete_rows(self):
+        names = [f["name"] for f in self.features]
+        X, ok = payload_matrix([valid_record(), {names[0]: 1.0}, None], names)
+        self.assertEqual(X.shape, (3, len(names)))
+        self.assertEqual(ok.tolist(), [True, False, False])
@@ -0,0 +1,120 @@
+"""
+Retraining from confirmations with incremental extraction (ml/retrain.py).
+"""
+
+import sys
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.test import TestCase
+from django.utils import timezone
+
+from api.models import Submission
+from inference.compiled import compile_model
+from inference.predictor import get_schema
+
+from .utils import valid_record
+
+ML_DIR = Path(__file__).resolve().parents[3] / "ml"
+MODEL_DIR = Path(__file__).resolve().parents[2] / "inference" / "model"
+
+
+def import_retrain():
+    if str(ML_DIR) not in sys.path:
+        sys.path.insert(0, str(ML_DIR))
+    import retrain
+
+    return retrain
+
+
+class RetrainTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.retrain = import_retrain()
+        cls.feature_names = [f["name"] for f in get_schema()["features"]]
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache_dir = tmp.name
+
+    def confirmed(self, label, at, **overrides):
+        return Submission.objects.create(
+            input_json=valid_record(**overrides),
+            prediction_label="benign",
+            probability_malignant=0.2,
+            model_version="v1",
+            confirmed_label=label,
+            confirmed_at=at,
+        )
+
+    def test_next_version(self):
+        self.assertEqual(
+            self.retrain.next_version("wdbc-calibrated-1.0"), "wdbc-calibrated-1.1"
+        )
+        self.assertEqual(self.retrain.next_version("model-v9"), "model-v10")
+        self.assertEqual(self.retrain.next_version("baseline"), "baseline-r1")
+
+    def test_extracts_only_new_confirmations(self):
+        now = timezone.now()
+        first = self.confirmed(0, now - timedelta(hours=2))
+        self.confirmed(1, now - timedelta(hours=1))
+        Submission.objects.create(
+            input_json=valid_record(),
+            prediction_label="benign",
+            probability_malignant=0.2,
+            model_version="v1",
+        )
+        extract = self.retrain.extract_confirmations
+        self.assertEqual(extract(self.cache_dir, self.feature_names), 2)
+        self.assertEqual(extract(self.cache_dir, self.feature_names), 0)
+
+        # A re-confirmation is appended again and its latest label wins
+        Submission.objects.filter(id=first.id).update(
+            confirmed_label=1, confirmed_at=now
+        )
+        self.assertEqual(extract(self.cache_dir, self.feature_names), 1)
+        ids, X, y = self.retrain.load_confirmations(self.cache_dir, self.feature_names)
+        self.assertEqual(len(ids), 2)
+        self.assertEqual(dict(zip(ids.tolist(), y.tolist()))[first.id], 1)
+        self.assertEqual(X.shape, (2, len(self.feature_names)))
+
+    def test_skips_incomplete_payloads(self):
+        submission = self.confirmed(1, timezone.now())
+        submission.input_json.pop(self.feature_names[0])
+        submission.save()
+        self.assertEqual(
+            self.retrain.extract_confirmations(self.cache_dir, self.feature_names), 0
+        )
+
+    def test_holdout_is_stable(self):
+        ids = np.arange(1, 10001)
+        holdout = self.retrain.is_holdout(ids)
+        np.testing.assert_array_equal(holdout, self.retrain.is_holdout(ids))
+        self.assertAlmostEqual(
+            holdout.mean(), 1 / self.retrain.HOLDOUT_MODULUS, delta=0.02
+        )
+
+    def test_warm_refit_compiles(self):
+        previous = self.retrain.load_previous(MODEL_DIR)
+        warm = self.retrain.previous_linear_model(
+            MODEL_DIR, previous, self.feature_names
+        )
+        self.assertIsNotNone(warm)
+
+        rng = np.random.default_rng(0)
+        features = get_schema()["features"]
+        X = pd.DataFrame(
+            {f["name"]: rng.uniform(f["min"], f["max"], 300) for f in features}
+        )
+        y = previous.predict(X)
+        calib, n_iter = self.retrain.refit(X, y, self.feature_names, warm, seed=0)
+        self.assertGreater(n_iter, 0)
+        compiled = compile_model(calib, self.feature_names)
+        np.testing.assert_allclose(
+            compiled.predict_proba(X.values), calib.predict_proba(X)[:, 1], atol=1e-9
+        )
@@ -0,0 +1,175 @@
+"""
+Keyset-paginated submission listing and streaming export, and who may read them.
+"""
+
+import base64
+import csv
+import io
+import json
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from api.models import Submission
+from inference.predictor import get_schema
+
+from .utils import staff_user, valid_record
+
+
+class SubmissionListingTests(TestCase):
+    def setUp(self):
+        self.client.force_login(staff_user())
+        now = timezone.now()
+        # Pairs share a timestamp, so paging has to break ties on id
+        self.submissions = [
+            Submission.objects.create(
+                input_json=valid_record(),
+                prediction_label="malignant" if i % 3 == 0 else "benign",
+                probability_malignant=0.1 * (i % 10),
+                model_version="v1" if i < 8 else "v2",
+                confirmed_label=1 if i % 4 == 0 else None,
+                submitted_at=now - timedelta(minutes=i // 2),
+            )
+            for i in range(11)
+        ]
+        self.newest_first = sorted(
+            self.submissions, key=lambda s: (s.submitted_at, s.id), reverse=True
+        )
+
+    def pages(self, **params):
+        ids, cursor = [], None
+        while True:
+            query = {**params, **({"cursor": cursor} if cursor else {})}
+            response = self.client.get("/api/submissions/", query)
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            ids.append([row["id"] for row in body["results"]])
+            cursor = body["next_cursor"]
+            if cursor is None:
+                return ids
+
+    def test_pages_cover_every_row_once_newest_first(self):
+        pages = self.pages(limit=3)
+        self.assertEqual([len(page) for page in pages], [3, 3, 3, 2])
+        self.assertEqual(sum(pages, []), [s.id for s in self.newest_first])
+
+    def test_rows_added_while_paging_do_not_shift_pages(self):
+        first = self.client.get("/api/submissions/", {"limit": 4}).json()
+        Submission.objects.create(
+            input_json=valid_record(),
+            prediction_label="benign",
+            probability_malignant=0.2,
+            model_version="v1",
+        )
+        second = self.client.get(
+            "/api/submissions/", {"limit": 4, "cursor": first["next_cursor"]}
+        ).json()
+        self.assertEqual(
+            [row["id"] for row in second["results"]],
+            [s.id for s in self.newest_first[4:8]],
+        )
+
+    def test_filters(self):
+        pages = self.pages(limit=2, model_version="v1", prediction_label="benign")
+        expected = [
+            s.id
+            for s in self.newest_first
+            if s.model_version == "v1" and s.prediction_label == "benign"
+        ]
+        self.assertEqual(sum(pages, []), expected)
+        confirmed = sum(self.pages(confirmed="true"), [])
+        self.assertEqual(
+            confirmed,
+            [s.id for s in self.newest_first if s.confirmed_label is not None],
+        )
+
+    def test_bad_parameters(self):
+        for params in (
+            {"cursor": "not-a-cursor"},
+            {"limit": "ten"},
+            {"prediction_label": "maybe"},
+            {"confirmed": "yes"},
+            {"confirmed_label": "2"},
+        ):
+            with self.subTest(params=params):
+                self.assertEqual(
+                    self.client.get("/api/submissions/", params).status_code, 400
+                )
+
+    def test_limit_is_capped(self):
+        body = self.client.get("/api/submissions/", {"limit": 0}).json()
+        self.assertEqual(len(body["results"]), 1)
+
+    def test_export_ndjson(self):
+        response = self.client.get("/api/submissions/export/", {"model_version": "v1"})
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).decode().splitlines()
+        ]
+        oldest_first = [
+            s.id for s in reversed(self.newest_first) if s.model_version == "v1"
+        ]
+        self.assertEqual([row["id"] for row in rows], oldest_first)
+        self.assertEqual(rows[0]["input_json"], valid_record())
+
+    def test_export_csv(self):
+        response = self.client.get("/api/submissions/export/", {"format": "csv"})
+        reader = csv.DictReader(
+            io.StringIO(b"".join(response.streaming_content).decode())
+        )
+        rows = list(reader)
+        self.assertEqual(len(rows), 11)
+        feature = get_schema()["features"][0]["name"]
+        self.assertIn(feature, reader.fieldnames)
+        self.assertEqual(float(rows[0][feature]), valid_record()[feature])
+        unconfirmed = next(
+            row for row in rows if int(row["id"]) == self.submissions[1].id
+        )
+        self.assertEqual(unconfirmed["confirmed_label"], "")
+
+    def test_export_rejects_unknown_format(self):
+        self.assertEqual(
+            self.client.get("/api/submissions/export/", {"format": "xml"}).status_code,
+            400,
+        )
+
+
+class StaffOnlyEndpointTests(TestCase):
+    PATHS = (
+        "/api/submissions/",
+        "/api/submissions/export/",
+        "/metrics",
+        "/api/predict/queue/",
+        "/api/predict/cache/",
+    )
+
+    def test_anonymous_requests_are_rejected(self):
+        for path in self.PATHS:
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, 403)
+                self.assertEqual(
+                    response.json(),
+                    {"detail": "Authentication credentials were not provided."},
+                )
+
+    def test_non_staff_users_are_rejected(self):
+        self.client.force_login(staff_user("clinician", is_staff=False))
+        for path in self.PATHS:
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 403)
+
+    def test_staff_can_use_http_basic_auth(self):
+        staff_user()
+        good = "Basic " + base64.b64encode(b"staff:staff-password").decode()
+        bad = "Basic " + base64.b64encode(b"staff:wrong").decode()
+        for path in self.PATHS:
+            with self.subTest(path=path):
+                self.assertEqual(
+                    self.client.get(path, HTTP_AUTHORIZATION=good).status_code, 200
+                )
+                self.assertEqual(
+                    self.client.get(path, HTTP_AUTHORIZATION=bad).status_code, 403
+                )
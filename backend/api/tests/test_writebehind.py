@@ -0,0 +1,204 @@
+"""
+Write-behind persistence: ID reservation, flushing, spilling and draining.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError, connection
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from api import views, writebehind
+from api.models import Submission
+from api.writebehind import WriteBehindBuffer, reserve_ids
+
+from .utils import valid_record
+
+
+def row(**overrides):
+    return {
+        "input_json": {"radius_mean": 14.1},
+        "prediction_label": "benign",
+        "probability_malignant": 0.2,
+        "top_contributions": [],
+        "model_version": "test",
+        **overrides,
+    }
+
+
+class WriteBehindTests(TransactionTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.spill_path = Path(tmp.name) / "spill.jsonl"
+
+    def make_buffer(self, **kwargs):
+        # Long flush interval: the tests flush explicitly
+        options = {
+            "max_batch": 200,
+            "flush_interval_ms": 60000,
+            "id_block_size": 10,
+            "spill_path": self.spill_path,
+        }
+        buffer = WriteBehindBuffer(**{**options, **kwargs})
+        self.addCleanup(buffer.drain, 1.0)
+        return buffer
+
+    def wait_for(self, condition, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            self.assertLess(
+                time.monotonic(), deadline, "timed out waiting for the writer"
+            )
+            time.sleep(0.02)
+
+    def test_reserved_ids_never_collide_with_inserted_rows(self):
+        first = Submission.objects.create(**row()).id
+        reserved = reserve_ids(5)
+        self.assertEqual(reserved, list(range(first + 1, first + 6)))
+        self.assertEqual(Submission.objects.create(**row()).id, first + 6)
+
+    def test_submit_then_flush(self):
+        buffer = self.make_buffer()
+        ids = buffer.submit_many([row(), row(prediction_label="malignant")])
+        self.assertTrue(buffer.is_pending(ids[0]))
+        self.assertEqual(buffer.flush(), 2)
+        self.assertFalse(buffer.is_pending(ids[0]))
+        self.assertEqual(
+            Submission.objects.get(id=ids[1]).prediction_label, "malignant"
+        )
+
+    def test_concurrent_requests_share_an_id_block(self):
+        buffer = self.make_buffer(id_block_size=100)
+        results, start = [], threading.Barrier(8)
+
+        def take():
+            start.wait()
+            results.extend(buffer._take_ids(1))
+
+        with mock.patch.object(
+            writebehind, "reserve_ids", wraps=reserve_ids
+        ) as reserve:
+            threads = [threading.Thread(target=take) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(reserve.call_count, 1)
+        self.assertEqual(len(set(results)), 8)
+        self.assertEqual(max(results) - min(results), 7)
+
+    def test_submitted_at_is_request_time(self):
+        buffer = self.make_buffer()
+        before = timezone.now()
+        submission_id = buffer.submit(**row())
+        after = timezone.now()
+        time.sleep(0.05)
+        buffer.flush()
+        submitted_at = Submission.objects.get(id=submission_id).submitted_at
+        self.assertTrue(before <= submitted_at <= after)
+
+    def test_rejected_row_does_not_block_the_batch(self):
+        buffer = self.make_buffer()
+        good, bad, also_good = buffer.submit_many(
+            [row(), row(prediction_label=None), row()]
+        )
+        self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(buffer.stats()["rejected"], 1)
+        self.assertEqual(
+            set(Submission.objects.values_list("id", flat=True)), {good, also_good}
+        )
+        self.assertFalse(self.spill_path.exists())
+
+    def test_spills_while_database_is_down_and_replays(self):
+        buffer = self.make_buffer()
+        down = mock.patch.object(
+            Submission.objects,
+            "bulk_create",
+            side_effect=OperationalError("database is locked"),
+        )
+        before = timezone.now()
+        with down:
+            ids = buffer.submit_many([row(), row()])
+            self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(buffer.stats()["spilled"], 2)
+        self.assertEqual(Submission.objects.count(), 0)
+
+        buffer._replay_spill()
+        self.assertEqual(buffer.stats()["replayed"], 2)
+        self.assertFalse(self.spill_path.exists())
+        for submission in Submission.objects.filter(id__in=ids):
+            self.assertLess(
+                submission.submitted_at - before, timezone.timedelta(seconds=5)
+            )
+
+    def test_drain_while_the_lock_is_held_does_not_deadlock(self):
+        # What a SIGTERM handler sees when it interrupts the main thread inside _enqueue
+        buffer = self.make_buffer()
+        buffer.submit(**row())
+
+        def interrupted():
+            with buffer._lock:
+                buffer.drain(timeout=0.5)
+
+        thread = threading.Thread(target=interrupted)
+        thread.start()
+        thread.join(10)
+        self.assertFalse(thread.is_alive(), "drain() deadlocked")
+        # The writer finishes the queue once the interrupted code lets go of the lock
+        self.wait_for(lambda: buffer._worker is None)
+        self.assertEqual(buffer.stats()["pending"], 0)
+        self.assertFalse(self.spill_path.exists())
+
+    def test_drain_flushes_on_the_writer_thread(self):
+        buffer = self.make_buffer()
+        submission_id = buffer.submit(**row())
+        buffer.drain(timeout=10)
+        self.assertTrue(Submission.objects.filter(id=submission_id).exists())
+        self.assertIsNone(buffer._worker)
+
+    def test_rows_queued_after_a_drain_are_written_by_a_new_writer(self):
+        # A graceful shutdown keeps serving in-flight requests after SIGTERM
+        buffer = self.make_buffer(flush_interval_ms=50)
+        buffer.submit(**row())
+        buffer.drain(timeout=10)
+        self.assertFalse(buffer._stopping)
+
+        submission_id = buffer.submit(**row())
+        self.assertIsNotNone(buffer._worker)
+        self.wait_for(lambda: Submission.objects.filter(id=submission_id).exists())
+        self.assertFalse(self.spill_path.exists())
+        # ...and keeps running as a normal writer rather than stopping again
+        self.assertTrue(buffer._worker.is_alive())
+
+    def test_reserve_ids_rejects_unsupported_databases(self):
+        with (
+            mock.patch.object(connection, "vendor", "mysql"),
+            self.assertRaises(ImproperlyConfigured),
+        ):
+            reserve_ids(1)
+
+    def test_disabled_on_unsupported_databases(self):
+        with (
+            mock.patch.dict(os.environ, {"SUBMISSION_WRITE_BEHIND": "True"}),
+            mock.patch.object(connection, "vendor", "mysql"),
+        ):
+            self.assertIsNone(WriteBehindBuffer.from_environ())
+
+    def test_predict_view_returns_reserved_id(self):
+        buffer = self.make_buffer()
+        with mock.patch.object(views, "get_write_behind", return_value=buffer):
+            response = self.client.post(
+                "/api/predict/", valid_record(), content_type="application/json"
+            )
+        self.assertEqual(response.status_code, 201)
+        submission_id = response.json()["submission_id"]
+        self.assertTrue(buffer.is_pending(submission_id))
+        buffer.flush()
+        self.assertTrue(Submission.objects.filter(id=submission_id).exists())
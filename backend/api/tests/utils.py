@@ -0,0 +1,44 @@
+"""
+Shared helpers for the API tests.
+"""
+
+import os
+from contextlib import contextmanager
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+
+from inference import predictor
+from inference.predictor import MODEL_DIR, SCHEMA_PATH, get_schema
+from inference.registry import ModelRegistry
+
+
+def valid_record(**overrides):
+    """A payload with every schema feature at the middle of its range."""
+    record = {
+        f["name"]: round((f["min"] + f["max"]) / 2, 4) for f in get_schema()["features"]
+    }
+    record.update(overrides)
+    return record
+
+
+def staff_user(username="staff", password="staff-password", is_staff=True):
+    """
+    A user for the staff-only endpoints (listing, export, metrics, cache
+    and queue stats).
+    """
+    return get_user_model().objects.create_user(
+        username, password=password, is_staff=is_staff
+    )
+
+
+@contextmanager
+def model_mode(**env):
+    """
+    Serve predictions from the bundled model (DUMMY_MODE off) through a fresh
+    registry, so the runtime config is snapshotted with `env` applied.
+    """
+    with mock.patch.dict(os.environ, {"DUMMY_MODE": "False", **env}):
+        registry = ModelRegistry.from_environ(MODEL_DIR, SCHEMA_PATH)
+        with mock.patch.object(predictor, "_registry", registry):
+            yield registry
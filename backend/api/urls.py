@@ -6,9 +6,18 @@ from . import views
 
 urlpatterns = [
     path('health/', views.health_check, name='health'),
+    path('ready/', views.readiness_check, name='ready'),
     path('schema/', views.get_feature_schema, name='schema'),
     path('predict/', views.predict_cancer_risk, name='predict'),
+    path('predict/batch/', views.predict_cancer_risk_batch, name='predict_batch'),
+    path('predict/cache/', views.prediction_cache_stats, name='prediction_cache'),
+    path('predict/async/', views.predict_cancer_risk_async, name='predict_async'),
+    path('predict/queue/', views.prediction_queue_stats, name='prediction_queue'),
     path('confirm/', views.confirm_outcome, name='confirm'),
+    path('metrics/model/', views.model_metrics, name='model_metrics'),
+    path('metrics/drift/', views.drift_metrics, name='drift_metrics'),
+    path('submissions/', views.list_submissions, name='list_submissions'),
+    path('submissions/export/', views.export_submissions, name='export_submissions'),
     path('submissions/<int:submission_id>/', views.get_submission, name='get_submission'),
 ]
 
@@ -1,32 +1,174 @@
 """
 API views for breast cancer detector.
 """
+import base64
+import csv
+import functools
+import json
 import logging
-from django.http import JsonResponse
+import os
+from datetime import datetime
+from django.db import transaction
+from django.db.models import Q
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
 from rest_framework import status
-from rest_framework.decorators import api_view
+from rest_framework.authentication import BasicAuthentication
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import AuthenticationFailed, ParseError
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from django.utils import timezone
 
-from .models import Submission
+from . import fastjson
+from .metrics import record_confirmation, summarize
+from .models import ModelPerformance, Submission
 from .serializers import SubmissionReadSerializer, ConfirmSerializer
-from inference.predictor import predict, get_schema
+from .writebehind import get_write_behind
+from inference.telemetry import telemetry
+from inference.validation import error_message
+from inference.predictor import (
+    ModelNotFoundError,
+    predict,
+    predict_async,
+    predict_batch,
+    get_drift_monitor,
+    get_schema,
+    get_pool,
+    get_validator,
+    get_prediction_cache,
+    get_scheduler,
+    get_warmup_report,
+    is_ready,
+)
 
 logger = logging.getLogger(__name__)
 
 
+def _invalid_record(errors):
+    """
+    Error body for a payload that failed schema validation: a summary plus
+    per-field errors.
+    """
+    return {"error": error_message(errors), "errors": errors}
+
+
+def _pinned_version(request):
+    """
+    Model version pinned via the X-Model-Version header, or None for the active one.
+    """
+    return request.headers.get('X-Model-Version') or None
+
+
+def _staff_only(view):
+    """
+    IsAdminUser for plain Django views: staff signed in by session or HTTP Basic
+    auth (as DRF views accept), else the 403 body DRF would send.
+    """
+    @functools.wraps(view)
+    def wrapped(request, *args, **kwargs):
+        user = request.user
+        if not user.is_authenticated:
+            try:
+                credentials = BasicAuthentication().authenticate(request)
+            except AuthenticationFailed as e:
+                return JsonResponse(
+                    {"detail": str(e.detail)}, status=status.HTTP_403_FORBIDDEN
+                )
+            if credentials is None:
+                return JsonResponse(
+                    {"detail": "Authentication credentials were not provided."},
+                    status=status.HTTP_403_FORBIDDEN,
+                )
+            user = credentials[0]
+        if not user.is_staff:
+            return JsonResponse(
+                {"detail": "You do not have permission to perform this action."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        return view(request, *args, **kwargs)
+    return wrapped
+
+
+# Listing page size (default / maximum) and export fetch size
+SUBMISSIONS_PAGE_SIZE = 50
+SUBMISSIONS_PAGE_MAX = 500
+EXPORT_CHUNK_SIZE = 2000
+
+
+def _filter_submissions(params):
+    """
+    Apply the listing/export query filters.
+    Returns (queryset, error_message).
+    """
+    queryset = Submission.objects.all()
+    if params.get("model_version"):
+        queryset = queryset.filter(model_version=params["model_version"])
+    if params.get("prediction_label"):
+        label = params["prediction_label"]
+        if label not in dict(Submission.PREDICTION_CHOICES):
+            return (
+                None,
+                "prediction_label must be one of: "
+                f"{', '.join(dict(Submission.PREDICTION_CHOICES))}",
+            )
+        queryset = queryset.filter(prediction_label=label)
+    if params.get("confirmed"):
+        confirmed = params["confirmed"].lower()
+        if confirmed not in ("true", "false"):
+            return None, "confirmed must be true or false"
+        queryset = queryset.filter(confirmed_label__isnull=(confirmed == "false"))
+    if params.get("confirmed_label"):
+        if params["confirmed_label"] not in ("0", "1"):
+            return None, "confirmed_label must be 0 or 1"
+        queryset = queryset.filter(confirmed_label=int(params["confirmed_label"]))
+    return queryset, None
+
+
+def _encode_cursor(submission):
+    raw = f"{submission.submitted_at.isoformat()}|{submission.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor):
+    """
+    (submitted_at, id) of the last row on the previous page; raises
+    ValueError if malformed.
+    """
+    submitted_at, submission_id = (
+        base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    )
+    return datetime.fromisoformat(submitted_at), int(submission_id)
+
+
 @api_view(['GET'])
 def health_check(request):
     """Health check endpoint."""
     return JsonResponse({"status": "ok"})
 
 
+@api_view(['GET'])
+def readiness_check(request):
+    """
+    Readiness endpoint for the load balancer.
+    Returns 503 until this worker has loaded and warmed the model.
+    """
+    report = get_warmup_report()
+    return JsonResponse(
+        report,
+        status=status.HTTP_200_OK if is_ready() else status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+
+
 @api_view(['GET'])
 def get_feature_schema(request):
     """Get the feature schema for dynamic form generation."""
     try:
-        schema = get_schema()
+        schema = get_schema(_pinned_version(request))
         return Response(schema)
+    except ModelNotFoundError as e:
+        return Response({"error": str(e)}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         logger.error(f"Error loading schema: {e}")
         return Response(
@@ -35,6 +177,41 @@ def get_feature_schema(request):
         )
 
 
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def prediction_cache_stats(request):
+    """Hit/miss/eviction counters of this worker's prediction cache."""
+    return Response(get_prediction_cache().stats())
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def prediction_queue_stats(request):
+    """
+    Stats of this worker's micro-batching scheduler (queue depth, batch sizes),
+    process-pool backend (dispatches, timeouts, in-process fallbacks) and
+    write-behind submission buffer (pending rows, flushes, spills).
+    """
+    scheduler = get_scheduler()
+    pool = get_pool()
+    write_behind = get_write_behind()
+    return Response(
+        {
+            "scheduler": (
+                {"enabled": True, **scheduler.stats()}
+                if scheduler
+                else {"enabled": False}
+            ),
+            "pool": {"enabled": True, **pool.stats()} if pool else {"enabled": False},
+            "write_behind": (
+                {"enabled": True, **write_behind.stats()}
+                if write_behind
+                else {"enabled": False}
+            ),
+        }
+    )
+
+
 @api_view(['POST'])
 def predict_cancer_risk(request):
     """
@@ -42,69 +219,259 @@ def predict_cancer_risk(request):
     
     Expected input: JSON object with feature names as keys and numeric values
     """
+    with telemetry.timed("request.total"):
+        return _predict_cancer_risk(request)
+
+
+def _score_and_save(validated, version):
+    """
+    Predict the single validated record and store its Submission.
+    Returns the response body. Shared by the DRF view and the lean view (api/lean.py).
+    """
+    numeric_data = validated.records[0]
+    
+    # Make prediction
+    with telemetry.timed("request.predict"):
+        prediction_label, probability_malignant, top_contributions, model_version = (
+            predict(numeric_data, version, validated)
+        )
+    
+    # Create submission record (queued for a background bulk insert in
+    # write-behind mode)
+    fields = dict(
+        input_json=numeric_data,
+        prediction_label=prediction_label,
+        probability_malignant=probability_malignant,
+        top_contributions=top_contributions,
+        model_version=model_version
+    )
+    with telemetry.timed("request.persist"):
+        write_behind = get_write_behind()
+        if write_behind is not None:
+            submission_id = write_behind.submit(**fields)
+        else:
+            submission_id = Submission.objects.create(**fields).id
+    
+    logger.info(
+        f"Prediction created: submission_id={submission_id}, label={prediction_label}"
+    )
+    return {
+        "submission_id": submission_id,
+        "prediction_label": prediction_label,
+        "probability_malignant": probability_malignant,
+        "top_contributions": top_contributions,
+        "model_version": model_version
+    }
+
+
+def _predict_cancer_risk(request):
     try:
-        # Get input data
-        input_data = request.data
+        # DRF parses the body lazily on first access
+        with telemetry.timed("request.parse"):
+            input_data = request.data
         
-        if not isinstance(input_data, dict):
+        with telemetry.timed("request.validate"):
+            version = _pinned_version(request)
+            validated = get_validator(version).validate_many([input_data])
+        if validated.errors:
             return Response(
-                {"error": "Input must be a JSON object"}, 
-                status=status.HTTP_400_BAD_REQUEST
+                _invalid_record(validated.errors[0]), status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Validate that we have numeric values
+        return Response(
+            _score_and_save(validated, version), status=status.HTTP_201_CREATED
+        )
+        
+    except ParseError as e:
+        # e.g. a number orjson can't hold in a double; the lean and async
+        # views answer 400 too
+        return Response({"error": str(e.detail)}, status=status.HTTP_400_BAD_REQUEST)
+    except ModelNotFoundError as e:
+        return Response({"error": str(e)}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        logger.error(f"Error in prediction endpoint: {e}")
+        return Response(
+            {"error": "Internal server error during prediction"}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@csrf_exempt
+@require_POST
+async def predict_cancer_risk_async(request):
+    """
+    Async variant of predict_cancer_risk for ASGI deployments (core/asgi.py).
+    Awaits the micro-batching scheduler instead of holding a thread per request.
+    """
+    try:
         try:
-            numeric_data = {k: float(v) for k, v in input_data.items()}
-        except (ValueError, TypeError) as e:
-            return Response(
-                {"error": f"All values must be numeric: {e}"}, 
-                status=status.HTTP_400_BAD_REQUEST
+            input_data = fastjson.loads(request.body)
+        except ValueError:
+            return fastjson.json_response(
+                {"error": "Request body must be valid JSON"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
         
-        # Get schema to validate required features
-        schema = get_schema()
-        required_features = {f["name"] for f in schema["features"] if f.get("required", False)}
-        
-        # Check for missing required features
-        missing_features = required_features - set(numeric_data.keys())
-        if missing_features:
-            return Response(
-                {"error": f"Missing required features: {list(missing_features)}"}, 
-                status=status.HTTP_400_BAD_REQUEST
+        version = _pinned_version(request)
+        validated = get_validator(version).validate_many([input_data])
+        if validated.errors:
+            return fastjson.json_response(
+                _invalid_record(validated.errors[0]), status=status.HTTP_400_BAD_REQUEST
             )
+        numeric_data = validated.records[0]
         
         # Make prediction
-        prediction_label, probability_malignant, top_contributions, model_version = predict(numeric_data)
+        prediction_label, probability_malignant, top_contributions, model_version = (
+            await predict_async(numeric_data, version, validated)
+        )
         
-        # Create submission record
-        submission = Submission.objects.create(
+        # Create submission record (queued for a background bulk insert in
+        # write-behind mode)
+        fields = dict(
             input_json=numeric_data,
             prediction_label=prediction_label,
             probability_malignant=probability_malignant,
             top_contributions=top_contributions,
             model_version=model_version
         )
+        write_behind = get_write_behind()
+        if write_behind is not None:
+            submission_id = await write_behind.asubmit(**fields)
+        else:
+            submission_id = (await Submission.objects.acreate(**fields)).id
         
-        # Return response
         response_data = {
-            "submission_id": submission.id,
+            "submission_id": submission_id,
             "prediction_label": prediction_label,
             "probability_malignant": probability_malignant,
             "top_contributions": top_contributions,
             "model_version": model_version
         }
         
-        logger.info(f"Prediction created: submission_id={submission.id}, label={prediction_label}")
-        return Response(response_data, status=status.HTTP_201_CREATED)
+        logger.info(
+            f"Prediction created: submission_id={submission_id}, "
+            f"label={prediction_label}"
+        )
+        return fastjson.json_response(response_data, status=status.HTTP_201_CREATED)
         
+    except ModelNotFoundError as e:
+        return fastjson.json_response(
+            {"error": str(e)}, status=status.HTTP_404_NOT_FOUND
+        )
     except Exception as e:
-        logger.error(f"Error in prediction endpoint: {e}")
-        return Response(
+        logger.error(f"Error in async prediction endpoint: {e}")
+        return fastjson.json_response(
             {"error": "Internal server error during prediction"}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
 
+@api_view(['POST'])
+def predict_cancer_risk_batch(request):
+    """
+    Predict cancer risk for many records in one request.
+    
+    Expected input: JSON array of feature objects, or {"records": [...]}.
+    Valid records are scored together and persisted with a single bulk insert;
+    invalid records are reported individually without failing the batch.
+    """
+    try:
+        records = request.data
+        if isinstance(records, dict):
+            records = records.get("records")
+        
+        if not isinstance(records, list) or not records:
+            return Response(
+                {"error": "Input must be a non-empty JSON array of records"}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        max_batch_size = int(os.getenv('PREDICT_BATCH_MAX_SIZE', '1000'))
+        if len(records) > max_batch_size:
+            return Response(
+                {
+                    "error": f"Batch too large: {len(records)} records "
+                    f"(max {max_batch_size})"
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        
+        # Validate every record up front in one pass; keep per-record errors
+        version = _pinned_version(request)
+        validated = get_validator(version).validate_many(records)
+        results = [None] * len(records)
+        for index, errors in validated.errors.items():
+            results[index] = {"index": index, **_invalid_record(errors)}
+        valid_indices = validated.indices
+        valid_data = validated.records
+        
+        # Score all valid records together
+        predictions = predict_batch(valid_data, version, validated)
+        
+        # Persist all submissions in one transaction (or queue them in
+        # write-behind mode)
+        rows = [
+            dict(
+                input_json=numeric_data,
+                prediction_label=prediction_label,
+                probability_malignant=probability_malignant,
+                top_contributions=top_contributions,
+                model_version=model_version,
+            )
+            for numeric_data, (
+                prediction_label,
+                probability_malignant,
+                top_contributions,
+                model_version,
+            ) in zip(valid_data, predictions)
+        ]
+        write_behind = get_write_behind()
+        if write_behind is not None:
+            submission_ids = write_behind.submit_many(rows)
+        else:
+            submission_ids = [
+                s.id
+                for s in Submission.objects.bulk_create(
+                    [Submission(**row) for row in rows]
+                )
+            ]
+        
+        for index, submission_id, row in zip(valid_indices, submission_ids, rows):
+            results[index] = {
+                "index": index,
+                "submission_id": submission_id,
+                "prediction_label": row["prediction_label"],
+                "probability_malignant": row["probability_malignant"],
+                "top_contributions": row["top_contributions"],
+                "model_version": row["model_version"]
+            }
+        
+        error_count = len(records) - len(submission_ids)
+        logger.info(
+            f"Batch prediction created: {len(submission_ids)} submissions, "
+            f"{error_count} errors"
+        )
+        return Response(
+            {"results": results, "created": len(submission_ids), "errors": error_count},
+            status=(
+                status.HTTP_201_CREATED
+                if submission_ids
+                else status.HTTP_400_BAD_REQUEST
+            ),
+        )
+        
+    except ParseError as e:
+        return Response({"error": str(e.detail)}, status=status.HTTP_400_BAD_REQUEST)
+    except ModelNotFoundError as e:
+        return Response({"error": str(e)}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        logger.error(f"Error in batch prediction endpoint: {e}")
+        return Response(
+            {"error": "Internal server error during batch prediction"}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
 @api_view(['POST'])
 def confirm_outcome(request):
     """
@@ -121,19 +488,29 @@ def confirm_outcome(request):
         submission_id = serializer.validated_data['submission_id']
         confirmed_label = serializer.validated_data['confirmed_label']
         
-        # Get the submission
-        try:
-            submission = Submission.objects.get(id=submission_id)
-        except Submission.DoesNotExist:
-            return Response(
-                {"error": "Submission not found"}, 
-                status=status.HTTP_404_NOT_FOUND
-            )
+        # Flush the submission first if it is still queued
+        write_behind = get_write_behind()
+        if write_behind is not None:
+            write_behind.ensure_persisted(submission_id)
         
-        # Update with confirmation
-        submission.confirmed_label = confirmed_label
-        submission.confirmed_at = timezone.now()
-        submission.save()
+        # Update with confirmation and fold it into the live metrics. The row is
+        # locked and its previous label read in the same transaction, so concurrent
+        # re-confirmations are applied one after the other
+        with transaction.atomic():
+            try:
+                submission = Submission.objects.select_for_update().get(
+                    id=submission_id
+                )
+            except Submission.DoesNotExist:
+                return Response(
+                    {"error": "Submission not found"}, 
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            previous_label = submission.confirmed_label
+            submission.confirmed_label = confirmed_label
+            submission.confirmed_at = timezone.now()
+            submission.save(update_fields=['confirmed_label', 'confirmed_at'])
+            record_confirmation(submission, confirmed_label, previous_label)
         
         logger.info(f"Outcome confirmed: submission_id={submission_id}, confirmed_label={confirmed_label}")
         
@@ -151,12 +528,72 @@ def confirm_outcome(request):
         )
 
 
+@api_view(['GET'])
+def model_metrics(request):
+    """
+    Live performance of each model version from doctor confirmations.
+    
+    Optional query param: model_version. Reads the running aggregates kept by
+    confirm_outcome, so cost does not depend on the number of submissions.
+    """
+    try:
+        queryset = ModelPerformance.objects.all()
+        if request.query_params.get("model_version"):
+            queryset = queryset.filter(
+                model_version=request.query_params["model_version"]
+            )
+        return Response({"versions": [summarize(perf) for perf in queryset]})
+    except Exception as e:
+        logger.error(f"Error computing model metrics: {e}")
+        return Response(
+            {"error": "Internal server error"}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['GET'])
+def drift_metrics(request):
+    """
+    Input drift of the active (or X-Model-Version pinned) model: PSI and binned
+    KS per feature, comparing this worker's last DRIFT_WINDOW_SIZE inputs
+    with the training histograms.
+    """
+    try:
+        monitor = get_drift_monitor(_pinned_version(request))
+        if monitor is None:
+            return Response({"enabled": False})
+        return Response({"enabled": True, **monitor.scores()})
+    except ModelNotFoundError as e:
+        return Response({"error": str(e)}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        logger.error(f"Error computing drift metrics: {e}")
+        return Response(
+            {"error": "Internal server error"}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@_staff_only
+def prometheus_metrics(request):
+    """
+    Stage latency histograms and result counters in Prometheus text format
+    (summed over all workers when METRICS_MULTIPROC_DIR is set).
+    """
+    return HttpResponse(
+        telemetry.render_prometheus(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
 @api_view(['GET'])
 def get_submission(request, submission_id):
     """
     Get a specific submission by ID.
     """
     try:
+        write_behind = get_write_behind()
+        if write_behind is not None:
+            write_behind.ensure_persisted(submission_id)
         submission = Submission.objects.get(id=submission_id)
         serializer = SubmissionReadSerializer(submission)
         return Response(serializer.data)
@@ -172,3 +609,156 @@ def get_submission(request, submission_id):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def list_submissions(request):
+    """
+    List submissions newest first, with keyset pagination.
+    
+    Query params: limit, cursor (next_cursor from the previous page), and the
+    filters model_version, prediction_label, confirmed (true/false) and
+    confirmed_label (0/1).
+    Each page is an index range scan on (submitted_at, id), so deep pages cost
+    the same as the first one.
+    """
+    try:
+        queryset, error = _filter_submissions(request.query_params)
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            limit = int(request.query_params.get("limit", SUBMISSIONS_PAGE_SIZE))
+        except ValueError:
+            return Response(
+                {"error": "limit must be an integer"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        limit = max(1, min(limit, SUBMISSIONS_PAGE_MAX))
+        
+        cursor = request.query_params.get("cursor")
+        if cursor:
+            try:
+                submitted_at, submission_id = _decode_cursor(cursor)
+            except ValueError:
+                return Response(
+                    {"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST
+                )
+            queryset = queryset.filter(
+                Q(submitted_at__lt=submitted_at)
+                | Q(submitted_at=submitted_at, id__lt=submission_id)
+            )
+        
+        # One extra row tells us whether there is a next page
+        page = list(queryset.order_by('-submitted_at', '-id')[:limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit]
+        
+        return Response({
+            "results": SubmissionReadSerializer(page, many=True).data,
+            "next_cursor": _encode_cursor(page[-1]) if has_more else None
+        })
+        
+    except Exception as e:
+        logger.error(f"Error listing submissions: {e}")
+        return Response(
+            {"error": "Internal server error"}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+class _Echo:
+    """File-like object whose write() returns the line, for csv.writer streaming."""
+    def write(self, value):
+        return value
+
+
+EXPORT_COLUMNS = [
+    "id", "submitted_at", "prediction_label", "probability_malignant",
+    "model_version", "confirmed_label", "confirmed_at",
+]
+
+
+def _export_rows(queryset):
+    """Stream rows oldest first, EXPORT_CHUNK_SIZE at a time, without caching them."""
+    fields = EXPORT_COLUMNS + ["input_json", "top_contributions"]
+    return (
+        queryset.order_by('submitted_at', 'id')
+        .values(*fields)
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+def _ndjson_lines(rows):
+    for row in rows:
+        row["submitted_at"] = row["submitted_at"].isoformat()
+        if row["confirmed_at"] is not None:
+            row["confirmed_at"] = row["confirmed_at"].isoformat()
+        yield json.dumps(row) + "\n"
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _csv_lines(rows, feature_names):
+    # One column per schema feature; contributions stay a JSON string
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_COLUMNS + feature_names + ["top_contributions"])
+    for row in rows:
+        features = row["input_json"] or {}
+        yield writer.writerow(
+            [_csv_value(row[column]) for column in EXPORT_COLUMNS]
+            + [features.get(name, "") for name in feature_names]
+            + [json.dumps(row["top_contributions"])]
+        )
+
+
+@require_GET
+@_staff_only
+def export_submissions(request):
+    """
+    Stream every matching submission as NDJSON (default) or CSV (?format=csv).
+    
+    Accepts the same filters as list_submissions. Rows are read with a
+    chunked iterator and written as they are produced, so memory use does
+    not grow with the table.
+    """
+    try:
+        queryset, error = _filter_submissions(request.GET)
+        if error:
+            return JsonResponse({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+        
+        export_format = request.GET.get("format", "ndjson")
+        if export_format == "ndjson":
+            response = StreamingHttpResponse(
+                _ndjson_lines(_export_rows(queryset)),
+                content_type="application/x-ndjson",
+            )
+        elif export_format == "csv":
+            feature_names = [f["name"] for f in get_schema()["features"]]
+            response = StreamingHttpResponse(
+                _csv_lines(_export_rows(queryset), feature_names),
+                content_type="text/csv",
+            )
+        else:
+            return JsonResponse(
+                {"error": "format must be ndjson or csv"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        
+        response["Content-Disposition"] = (
+            f'attachment; filename="submissions.{export_format}"'
+        )
+        return response
+        
+    except Exception as e:
+        logger.error(f"Error exporting submissions: {e}")
+        return JsonResponse(
+            {"error": "Internal server error"}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
@@ -0,0 +1,515 @@
+"""
+Write-behind persistence for Submission rows.
+
+With SUBMISSION_WRITE_BEHIND=True the prediction views don't insert rows
+themselves. Each row gets a submission ID from a block of IDs reserved in the
+database up front, is queued in memory, and the view returns straight away. A
+background thread writes queued rows with one bulk_create per batch (at most
+WRITE_BEHIND_MAX_BATCH rows, or every WRITE_BEHIND_FLUSH_MS). A batch the
+database rejects is retried row by row, and a row it rejects on its own is
+logged and dropped. Rows that can't be written because the database is
+unavailable are appended to a JSONL spill file and replayed on a later flush.
+The queue is drained on SIGTERM and at interpreter exit.
+"""
+
+import atexit
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import (
+    DataError,
+    IntegrityError,
+    close_old_connections,
+    connection,
+    transaction,
+)
+from django.utils import timezone
+
+from .models import Submission
+
+logger = logging.getLogger(__name__)
+
+# Fields copied from the request path into each queued row
+ROW_FIELDS = (
+    "input_json",
+    "prediction_label",
+    "probability_malignant",
+    "top_contributions",
+    "model_version",
+)
+
+# Databases reserve_ids() supports
+SUPPORTED_VENDORS = ("sqlite", "postgresql")
+
+# Errors that mean the database refused this row, not that it is unavailable
+REJECTED_ROW_ERRORS = (IntegrityError, DataError, ValueError, TypeError)
+
+# Longest the writer waits between checks for a drain request
+STOP_POLL_SECONDS = 0.1
+
+
+def reserve_ids(count: int) -> List[int]:
+    """
+    Reserve `count` Submission primary keys without inserting rows.
+    Rows created normally afterwards (e.g. by a worker running without
+    write-behind) get IDs after the reserved ones, so the two never collide.
+    Only SUPPORTED_VENDORS; WriteBehindBuffer.from_environ checks at startup.
+    """
+    table = Submission._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            # AUTOINCREMENT tables hand out ids above sqlite_sequence.seq
+            cursor.execute(
+                "UPDATE sqlite_sequence SET seq = seq + %s WHERE name = %s",
+                [count, table],
+            )
+            if cursor.rowcount == 0:
+                cursor.execute(
+                    "SELECT COALESCE(MAX(id), 0) FROM "
+                    f"{connection.ops.quote_name(table)}"
+                )
+                cursor.execute(
+                    "INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)",
+                    [table, cursor.fetchone()[0] + count],
+                )
+            cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = %s", [table])
+            last = cursor.fetchone()[0]
+            return list(range(last - count + 1, last + 1))
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM "
+                "generate_series(1, %s)",
+                [table, count],
+            )
+            return [row[0] for row in cursor.fetchall()]
+    raise ImproperlyConfigured(
+        f"Write-behind ID reservation is not supported on {connection.vendor}"
+    )
+
+
+class WriteBehindBuffer:
+    """
+    In-memory queue of unsaved Submission rows plus the thread that flushes it.
+    Queued rows are keyed by their reserved id until they are committed.
+    """
+
+    def __init__(
+        self,
+        max_batch: int = 200,
+        flush_interval_ms: float = 500.0,
+        id_block_size: int = 100,
+        spill_path: Optional[Path] = None,
+    ):
+        self.max_batch = max_batch
+        self.flush_interval_ms = flush_interval_ms
+        self.id_block_size = id_block_size
+        self.spill_path = Path(spill_path) if spill_path else None
+        self._pending: Dict[int, Submission] = {}
+        self._free_ids: List[int] = []
+        # drain() may run in a SIGTERM handler on top of code holding this lock,
+        # so it only ever tries it without blocking
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        # One ID block reservation at a time, so concurrent requests share a block
+        self._reserve_lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._stopping = False
+        self.queued = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.spilled = 0
+        self.replayed = 0
+        self.rejected = 0
+        self.max_pending = 0
+
+    @classmethod
+    def from_environ(cls) -> Optional["WriteBehindBuffer"]:
+        """
+        Build a buffer from the WRITE_BEHIND_* settings, or None if
+        SUBMISSION_WRITE_BEHIND is off.
+        """
+        if os.getenv("SUBMISSION_WRITE_BEHIND", "False").lower() != "true":
+            return None
+        if connection.vendor not in SUPPORTED_VENDORS:
+            logger.warning(
+                f"Write-behind persistence is not supported on {connection.vendor}; "
+                "writing synchronously"
+            )
+            return None
+        return cls(
+            max_batch=int(os.getenv("WRITE_BEHIND_MAX_BATCH", "200")),
+            flush_interval_ms=float(os.getenv("WRITE_BEHIND_FLUSH_MS", "500")),
+            id_block_size=int(os.getenv("WRITE_BEHIND_ID_BLOCK", "100")),
+            spill_path=os.getenv(
+                "WRITE_BEHIND_SPILL_FILE",
+                str(settings.BASE_DIR / "submission_spill.jsonl"),
+            ),
+        )
+
+    def _ensure_started(self) -> None:
+        # Caller holds self._lock. Started lazily so each forked worker process
+        # gets its own thread
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(
+                target=self._run, name="submission-writer", daemon=True
+            )
+            self._worker.start()
+
+    def _pop_free_ids(self, count: int) -> Optional[List[int]]:
+        with self._lock:
+            if len(self._free_ids) < count:
+                return None
+            ids, self._free_ids = self._free_ids[:count], self._free_ids[count:]
+            return ids
+
+    def _take_ids(self, count: int) -> List[int]:
+        ids = self._pop_free_ids(count)
+        if ids is not None:
+            return ids
+        with self._reserve_lock:
+            # Another request may have reserved a block while this one waited
+            ids = self._pop_free_ids(count)
+            if ids is not None:
+                return ids
+            reserved = reserve_ids(max(self.id_block_size, count))
+            with self._lock:
+                self._free_ids.extend(reserved)
+                ids, self._free_ids = self._free_ids[:count], self._free_ids[count:]
+                return ids
+
+    def submit(self, **fields: Any) -> int:
+        """Queue one row and return its submission id."""
+        return self.submit_many([fields])[0]
+
+    def submit_many(self, rows: List[Dict[str, Any]]) -> List[int]:
+        """Queue rows (dicts of ROW_FIELDS) and return their submission ids in order."""
+        if not rows:
+            return []
+        ids = self._take_ids(len(rows))
+        self._enqueue(ids, rows)
+        return ids
+
+    async def asubmit(self, **fields: Any) -> int:
+        """
+        submit() for async views; only leaves the event loop when a new ID
+        block is needed.
+        """
+        ids = self._pop_free_ids(1)
+        if ids is None:
+            ids = await sync_to_async(self._take_ids)(1)
+        self._enqueue(ids, [fields])
+        return ids[0]
+
+    def _enqueue(self, ids: List[int], rows: List[Dict[str, Any]]) -> None:
+        submitted_at = timezone.now()
+        with self._lock:
+            for submission_id, fields in zip(ids, rows):
+                self._pending[submission_id] = Submission(
+                    id=submission_id, submitted_at=submitted_at, **fields
+                )
+            # Under the lock, so a writer that is stopping either sees these rows or
+            # has already gone
+            self._ensure_started()
+            self.queued += len(rows)
+            self.max_pending = max(self.max_pending, len(self._pending))
+            if len(self._pending) >= self.max_batch:
+                self._wakeup.notify()
+
+    def is_pending(self, submission_id: int) -> bool:
+        with self._lock:
+            return submission_id in self._pending
+
+    def ensure_persisted(self, submission_id: int) -> None:
+        """
+        Flush now if `submission_id` is still queued, so it can be read or updated.
+        """
+        if self.is_pending(submission_id):
+            self.flush()
+
+    def _wait_for_work(self) -> None:
+        deadline = time.monotonic() + self.flush_interval_ms / 1000.0
+        with self._lock:
+            while len(self._pending) < self.max_batch and not self._stopping:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                # drain() can't always notify, so check _stopping regularly
+                self._wakeup.wait(timeout=min(remaining, STOP_POLL_SECONDS))
+
+    def _run(self) -> None:
+        while True:
+            self._wait_for_work()
+            stopping = self._stopping
+            try:
+                self.flush()
+                if not stopping:
+                    self._replay_spill()
+            except Exception as e:
+                logger.error(f"Submission writer cycle failed: {e}")
+            finally:
+                close_old_connections()
+            if stopping:
+                with self._lock:
+                    # Rows queued while stopping are written before the thread exits;
+                    # the next row after that starts a fresh writer
+                    if not self._pending:
+                        self._worker = None
+                        self._stopping = False
+                        return
+
+    def flush(self) -> int:
+        """
+        Write every queued row now. Rows the database can't take are spilled to disk.
+        Returns rows written.
+        """
+        with self._flush_lock:
+            return self._flush_locked()
+
+    def _flush_locked(self) -> int:
+        written = 0
+        while True:
+            with self._lock:
+                batch = list(self._pending.values())[: self.max_batch]
+            if not batch:
+                return written
+            batch_written, unwritten = self._write(batch)
+            written += batch_written
+            self.flushed += batch_written
+            self.flushes += 1
+            if unwritten:
+                logger.error(
+                    f"Failed to write {len(unwritten)} submissions, spilling "
+                    f"to {self.spill_path}"
+                )
+                self._spill(unwritten)
+            with self._lock:
+                for submission in batch:
+                    self._pending.pop(submission.id, None)
+
+    def _write(
+        self, rows: List[Submission], ignore_conflicts: bool = False
+    ) -> Tuple[int, List[Submission]]:
+        """
+        Insert rows with one bulk_create; if that fails, one row at a time so a
+        bad row can't hold back the rest. A row the database rejects is logged
+        and dropped. Returns (rows written, rows to retry later) -- the latter
+        once the database itself fails.
+        """
+        try:
+            with transaction.atomic():
+                Submission.objects.bulk_create(
+                    rows, batch_size=self.max_batch, ignore_conflicts=ignore_conflicts
+                )
+            return len(rows), []
+        except Exception as e:
+            logger.warning(
+                f"Bulk write of {len(rows)} submissions failed, "
+                f"retrying row by row: {e}"
+            )
+
+        written = 0
+        for i, row in enumerate(rows):
+            try:
+                with transaction.atomic():
+                    Submission.objects.bulk_create(
+                        [row], ignore_conflicts=ignore_conflicts
+                    )
+                written += 1
+            except REJECTED_ROW_ERRORS as e:
+                self.rejected += 1
+                fields = {name: getattr(row, name) for name in ROW_FIELDS}
+                logger.error(
+                    f"Dropping submission {row.id}, rejected by the "
+                    f"database: {e}. Row: {fields}"
+                )
+            except Exception as e:
+                logger.error(f"Database unavailable while writing submissions: {e}")
+                return written, rows[i:]
+        return written, []
+
+    def _spill(self, batch: List[Submission]) -> None:
+        if self.spill_path is None:
+            logger.error(f"No spill file configured; dropping {len(batch)} submissions")
+            return
+        lines = "".join(_row_json(s) + "\n" for s in batch)
+        self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.spill_path, "a") as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        self.spilled += len(batch)
+
+    def _replay_spill(self) -> None:
+        if self.spill_path is None or not self.spill_path.exists():
+            return
+        # Claim the file so concurrent writers start a fresh one
+        claimed = self.spill_path.with_name(
+            f"{self.spill_path.name}.{os.getpid()}.replay"
+        )
+        try:
+            os.replace(self.spill_path, claimed)
+        except FileNotFoundError:
+            return
+        rows = []
+        with open(claimed) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    rows.append(_row_from_json(line))
+                except (ValueError, TypeError) as e:
+                    self.rejected += 1
+                    logger.error(
+                        f"Dropping unreadable spilled submission: {e}. "
+                        f"Line: {line.strip()}"
+                    )
+        # Rows from an interrupted drain may already be in the table
+        written, unwritten = self._write(rows, ignore_conflicts=True)
+        if unwritten:
+            # Still down; put the rest back for the next cycle
+            with open(self.spill_path, "a") as out:
+                out.write("".join(_row_json(s) + "\n" for s in unwritten))
+            logger.warning(
+                f"Spill replay stopped with {len(unwritten)} "
+                "submissions left, will retry"
+            )
+        os.remove(claimed)
+        self.replayed += written
+        if written:
+            logger.info(f"Replayed {written} spilled submissions")
+
+    def drain(self, timeout: float = 10.0) -> None:
+        """
+        Have the writer thread flush everything queued and stop, waiting up to
+        `timeout` seconds; whatever is still queued after that is spilled.
+        Safe to call from a signal handler: it does no database work on the
+        calling thread and never blocks on self._lock. If the interrupted code
+        holds it, queued rows are left for the writer to finish once it resumes.
+        """
+        worker = self._worker
+        if worker is not None:
+            self._stopping = True
+            if self._lock.acquire(blocking=False):
+                try:
+                    self._wakeup.notify()
+                finally:
+                    self._lock.release()
+            if worker is not threading.current_thread():
+                worker.join(timeout)
+        if not self._lock.acquire(blocking=False):
+            logger.warning(
+                "Write-behind drain interrupted code holding the queue lock; the "
+                "writer will finish the queue"
+            )
+            return
+        try:
+            remaining = list(self._pending.values())
+            self._pending.clear()
+        finally:
+            self._lock.release()
+        if remaining:
+            self._spill(remaining)
+            logger.warning(
+                f"Write-behind drain did not write {len(remaining)} submissions "
+                "in time; spilled them"
+            )
+        logger.info(
+            f"Write-behind drained: {self.flushed} submissions written in total"
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "max_pending": self.max_pending,
+                "reserved_ids": len(self._free_ids),
+                "max_batch": self.max_batch,
+                "flush_interval_ms": self.flush_interval_ms,
+                "queued": self.queued,
+                "flushed": self.flushed,
+                "flushes": self.flushes,
+                "spilled": self.spilled,
+                "replayed": self.replayed,
+                "rejected": self.rejected,
+                "spill_file_present": bool(
+                    self.spill_path and self.spill_path.exists()
+                ),
+            }
+
+
+def _row_json(submission: Submission) -> str:
+    return json.dumps(
+        {
+            "id": submission.id,
+            "submitted_at": (
+                submission.submitted_at.isoformat() if submission.submitted_at else None
+            ),
+            **{name: getattr(submission, name) for name in ROW_FIELDS},
+            "confirmed_label": submission.confirmed_label,
+            "confirmed_at": (
+                submission.confirmed_at.isoformat() if submission.confirmed_at else None
+            ),
+        }
+    )
+
+
+def _row_from_json(line: str) -> Submission:
+    data = json.loads(line)
+    for name in ("submitted_at", "confirmed_at"):
+        if data.get(name):
+            data[name] = datetime.fromisoformat(data[name])
+        else:
+            data.pop(name, None)
+    return Submission(**data)
+
+
+_buffer: Optional[WriteBehindBuffer] = None
+_buffer_checked = False
+_buffer_lock = threading.Lock()
+
+
+def get_write_behind() -> Optional[WriteBehindBuffer]:
+    """
+    The process-wide write-behind buffer, or None if SUBMISSION_WRITE_BEHIND is off.
+    """
+    global _buffer, _buffer_checked
+
+    if not _buffer_checked:
+        with _buffer_lock:
+            if not _buffer_checked:
+                _buffer = WriteBehindBuffer.from_environ()
+                _buffer_checked = True
+    return _buffer
+
+
+def install_shutdown_hooks() -> None:
+    """Drain the buffer at exit and on SIGTERM (chaining any existing handler)."""
+    buffer = get_write_behind()
+    if buffer is None:
+        return
+    atexit.register(buffer.drain)
+
+    if threading.current_thread() is not threading.main_thread():
+        return
+    previous = signal.getsignal(signal.SIGTERM)
+
+    def _on_sigterm(signum, frame):
+        buffer.drain()
+        if callable(previous):
+            previous(signum, frame)
+        else:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            os.kill(os.getpid(), signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, _on_sigterm)
@@ -0,0 +1,9 @@
+"""
+Benchmarks for the backend. Run from backend/:
+
+  python -m benchmarks run --out results.json     # inference, db and loadgen suites
+  python -m benchmarks compare old.json new.json  # flag regressions (thresholds.json)
+
+Each suite can also be run on its own: benchmarks.bench_inference,
+benchmarks.bench_db and benchmarks.loadgen.
+"""
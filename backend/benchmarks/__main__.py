@@ -0,0 +1,111 @@
+"""
+Run the benchmark suite and write one results file, or compare two.
+
+  python -m benchmarks run [--suites inference,db,http,loadgen] [--quick]
+                           [--out results.json]
+  python -m benchmarks compare baseline.json results.json
+                               [--thresholds benchmarks/thresholds.json]
+
+`compare` exits with status 1 if any metric got worse by more than its
+threshold (relative change; see thresholds.json, longest prefix wins).
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from . import bench_db, bench_http, bench_inference, loadgen
+from .common import THRESHOLDS_PATH, compare, load_thresholds, write_results
+
+SUITES = ("inference", "db", "http", "loadgen")
+
+
+def _run(args) -> None:
+    suites = args.suites.split(",")
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        sys.exit(f"Unknown suites: {', '.join(sorted(unknown))}")
+
+    options = {"suites": suites, "quick": args.quick}
+    results = {}
+    if "inference" in suites:
+        sizes = (1, 10, 100, 1000) if args.quick else bench_inference.DEFAULT_SIZES
+        results.update(bench_inference.run(sizes, min_time=0.2 if args.quick else 0.5))
+    if "db" in suites:
+        results.update(
+            bench_db.run(
+                rows=10000 if args.quick else 100000,
+                inserts=500 if args.quick else 2000,
+            )
+        )
+    if "http" in suites:
+        results.update(bench_http.run(min_time=0.2 if args.quick else 0.5))
+    if "loadgen" in suites:
+        results.update(loadgen.run(concurrency=8, duration=3.0 if args.quick else 10.0))
+
+    for name, result in results.items():
+        print(f"{name:52} {result['value']:12.2f} {result['unit']}")
+    write_results(args.out, results, options)
+    print(f"\nWrote {args.out}")
+
+
+def _compare(args) -> None:
+    baseline = json.loads(Path(args.baseline).read_text())
+    current = json.loads(Path(args.current).read_text())
+    rows = compare(baseline, current, load_thresholds(args.thresholds))
+
+    print(f"baseline {baseline.get('commit')} -> current {current.get('commit')}\n")
+    print(
+        f"{'metric':52} {'baseline':>12} {'current':>12} {'worse by':>9} {'allowed':>8}"
+    )
+    for name, before, after, change, allowed, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(
+            f"{name:52} {before:12.2f} {after:12.2f} {change:+9.1%} "
+            f"{allowed:8.0%}{flag}"
+        )
+
+    regressions = [row for row in rows if row[-1]]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s)")
+        sys.exit(1)
+    print("\nNo regressions")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser(
+        "run", help="run benchmarks and write a results file"
+    )
+    run_parser.add_argument(
+        "--suites",
+        default=",".join(SUITES),
+        help="comma-separated subset of " + ", ".join(SUITES),
+    )
+    run_parser.add_argument(
+        "--quick", action="store_true", help="smaller sizes and shorter runs"
+    )
+    run_parser.add_argument(
+        "--out", default="benchmark-results.json", help="results file to write"
+    )
+    run_parser.set_defaults(func=_run)
+
+    compare_parser = commands.add_parser("compare", help="compare two results files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--thresholds", default=str(THRESHOLDS_PATH))
+    compare_parser.set_defaults(func=_compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
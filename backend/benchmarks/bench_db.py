@@ -0,0 +1,198 @@
+"""
+Submission insert/list throughput under different database settings.
+
+Each configuration runs in a fresh subprocess against a temporary SQLite file:
+
+  baseline  - 0001 schema only (no indexes), rollback journal,
+              new connection per request
+  indexes   - + the 0002 composite indexes
+  tuned     - + WAL / synchronous=NORMAL / page cache and persistent connections
+
+Usage: python -m benchmarks.bench_db [--rows 100000] [--inserts 2000] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from .common import BACKEND_DIR, metric, setup_django
+
+CONFIGS = {
+    "baseline": {
+        "SQLITE_WAL": "False",
+        "DB_CONN_MAX_AGE": "0",
+        "BENCH_MIGRATION": "0001",
+    },
+    "indexes": {
+        "SQLITE_WAL": "False",
+        "DB_CONN_MAX_AGE": "0",
+        "BENCH_MIGRATION": "0002",
+    },
+    "tuned": {"SQLITE_WAL": "True", "DB_CONN_MAX_AGE": "60", "BENCH_MIGRATION": "0002"},
+}
+VERSIONS = ["wdbc-calibrated-1.0", "wdbc-calibrated-1.1", "wdbc-calibrated-2.0"]
+
+
+def _setup(db_path: str) -> None:
+    setup_django(db_path)
+    from django.core.management import call_command
+
+    call_command("migrate", "api", os.environ["BENCH_MIGRATION"], verbosity=0)
+
+
+def _row(rng: random.Random) -> dict:
+    p = rng.random()
+    return dict(
+        input_json={"radius_mean": rng.uniform(6, 28)},
+        prediction_label="malignant" if p >= 0.5 else "benign",
+        probability_malignant=p,
+        top_contributions=[],
+        model_version=rng.choice(VERSIONS),
+        confirmed_label=rng.choice([None, None, None, 0, 1]),
+    )
+
+
+def run_worker(db_path: str, rows: int, inserts: int) -> dict:
+    """Runs inside the subprocess for one configuration."""
+    _setup(db_path)
+    from django.db import close_old_connections
+    from api.models import Submission
+
+    rng = random.Random(0)
+    results = {}
+
+    # Request-style inserts: one autocommit insert per "request", then the
+    # end-of-request connection handling (closes unless CONN_MAX_AGE > 0)
+    start = time.perf_counter()
+    for _ in range(inserts):
+        Submission.objects.create(**_row(rng))
+        close_old_connections()
+    results["single_inserts_per_s"] = inserts / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for offset in range(0, rows, 5000):
+        Submission.objects.bulk_create(
+            [Submission(**_row(rng)) for _ in range(min(5000, rows - offset))]
+        )
+    results["bulk_rows_per_s"] = rows / (time.perf_counter() - start)
+
+    # Admin-style list pages: newest first, optionally filtered
+    queries = {
+        "list_newest": lambda: list(Submission.objects.order_by("-submitted_at")[:50]),
+        "list_by_version": lambda: list(
+            Submission.objects.filter(model_version=VERSIONS[1]).order_by(
+                "-submitted_at"
+            )[:50]
+        ),
+        "list_by_label": lambda: list(
+            Submission.objects.filter(prediction_label="malignant").order_by(
+                "-submitted_at"
+            )[:50]
+        ),
+        "list_unconfirmed": lambda: list(
+            Submission.objects.filter(confirmed_label__isnull=True).order_by(
+                "-submitted_at"
+            )[:50]
+        ),
+        "count_confirmed_malignant": lambda: Submission.objects.filter(
+            confirmed_label=1
+        ).count(),
+        "get_by_id": lambda: Submission.objects.get(id=rng.randint(1, rows)),
+    }
+    for name, query in queries.items():
+        query()
+        n = 0
+        start = time.perf_counter()
+        while n < 20 or time.perf_counter() - start < 0.5:
+            query()
+            close_old_connections()
+            n += 1
+        results[f"{name}_per_s"] = n / (time.perf_counter() - start)
+    return results
+
+
+def run(rows: int = 100000, inserts: int = 2000, configs=tuple(CONFIGS)) -> dict:
+    """
+    Results per configuration as {"db.<config>.<metric>": metric(...)} (all ops/s).
+    """
+    results = {}
+    for name in configs:
+        with tempfile.TemporaryDirectory() as tmp:
+            out = subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "benchmarks.bench_db",
+                    "--worker",
+                    str(Path(tmp) / "bench.sqlite3"),
+                    "--rows",
+                    str(rows),
+                    "--inserts",
+                    str(inserts),
+                ],
+                cwd=BACKEND_DIR,
+                env={**os.environ, **CONFIGS[name]},
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            for key, value in json.loads(out.stdout.strip().splitlines()[-1]).items():
+                results[f"db.{name}.{key}"] = metric(value, "ops/s", better="higher")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--rows",
+        type=int,
+        default=100000,
+        help="rows bulk-loaded before the list queries",
+    )
+    parser.add_argument(
+        "--inserts", type=int, default=2000, help="single-row request-style inserts"
+    )
+    parser.add_argument(
+        "--configs",
+        default=",".join(CONFIGS),
+        help="comma-separated subset of " + ", ".join(CONFIGS),
+    )
+    parser.add_argument("--json", help="also write results to this file")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.rows, args.inserts)))
+        return
+
+    configs = args.configs.split(",")
+    results = run(args.rows, args.inserts, configs)
+
+    keys = [
+        name.split(".", 2)[2]
+        for name in results
+        if name.startswith(f"db.{configs[0]}.")
+    ]
+    print(f"{'metric (ops/s)':34}" + "".join(f"{name:>14}" for name in configs))
+    for key in keys:
+        print(
+            f"{key[:-6]:34}"
+            + "".join(
+                f"{results[f'db.{name}.{key}']['value']:14.1f}" for name in configs
+            )
+        )
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Per-request cost of the JSON endpoints through the full Django stack.
+
+Calls the WSGI application directly with prebuilt environs, so the numbers
+are server-side cost only (no sockets or test client): middleware, routing,
+DRF (or not), JSON parse/encode, validation, scoring and the Submission insert.
+
+  drf   - /api/health/, /api/schema/, /api/predict/: DRF views, full MIDDLEWARE
+  lean  - the same endpoints under LEAN_API_PREFIX (api/lean.py)
+
+Each stack runs in a fresh subprocess once with FAST_JSON=False (stdlib json)
+and once with FAST_JSON=True (orjson), against a temporary SQLite file with
+the prediction cache off, so every predict is scored and stored.
+
+Usage: python -m benchmarks.bench_http [--min-time 0.5] [--json out.json]
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict
+
+from .common import BACKEND_DIR, metric, setup_django, time_call
+
+JSON_MODES = {"stdlib": "False", "orjson": "True"}
+ENDPOINTS = ("health", "schema", "predict")
+
+
+def _environ(method: str, path: str, body: bytes = b"") -> Dict:
+    return {
+        "REQUEST_METHOD": method,
+        "PATH_INFO": path,
+        "SCRIPT_NAME": "",
+        "QUERY_STRING": "",
+        "SERVER_NAME": "127.0.0.1",
+        "SERVER_PORT": "8000",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "HTTP_HOST": "127.0.0.1",
+        "REMOTE_ADDR": "127.0.0.1",
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.url_scheme": "http",
+        "wsgi.version": (1, 0),
+        "wsgi.multithread": False,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+
+
+def run_worker(db_path: str, min_time: float) -> Dict[str, float]:
+    """
+    Runs inside the subprocess for one JSON mode; p50 microseconds per stack/endpoint.
+    """
+    os.environ.update(
+        DJANGO_SETTINGS_MODULE="benchmarks.settings",
+        BENCH_DB_PATH=db_path,
+        DUMMY_MODE="False",
+        PREDICTION_CACHE_SIZE="0",
+        INFERENCE_BATCHING="False",
+        INFERENCE_POOL_SIZE="0",
+        SUBMISSION_WRITE_BEHIND="False",
+        PROFILING_ENABLED="False",
+    )
+    setup_django()
+    from django.conf import settings
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.core.management import call_command
+    from inference import predictor
+
+    call_command("migrate", verbosity=0)
+    predictor.warmup()
+    application = WSGIHandler()
+    rng = random.Random(0)
+    records = [
+        json.dumps(
+            {
+                f["name"]: rng.uniform(f["min"], f["max"])
+                for f in predictor.get_schema()["features"]
+            }
+        ).encode()
+        for _ in range(256)
+    ]
+    counter = iter(range(10**9))
+
+    def request(method: str, path: str, body: bytes = b"", expect: int = 200) -> None:
+        statuses = []
+        response = application(
+            _environ(method, path, body), lambda s, headers: statuses.append(s)
+        )
+        b"".join(response)
+        response.close()
+        if not statuses[0].startswith(str(expect)):
+            raise RuntimeError(f"{method} {path} returned {statuses[0]}")
+
+    prefixes = {"drf": "/api/", "lean": settings.LEAN_API_PREFIX}
+    results = {}
+    for stack, prefix in prefixes.items():
+        calls = {
+            "health": lambda: request("GET", f"{prefix}health/"),
+            "schema": lambda: request("GET", f"{prefix}schema/"),
+            "predict": lambda: request(
+                "POST", f"{prefix}predict/", records[next(counter) % len(records)], 201
+            ),
+        }
+        for endpoint in ENDPOINTS:
+            results[f"{stack}.{endpoint}_us"] = (
+                time_call(calls[endpoint], min_time)["p50"] * 1e6
+            )
+    return results
+
+
+def run(min_time: float = 0.5) -> Dict[str, Dict]:
+    """{"http.<json mode>.<stack>.<endpoint>_us": metric(...)} for every combination."""
+    results = {}
+    for mode, fast_json in JSON_MODES.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            out = subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "benchmarks.bench_http",
+                    "--worker",
+                    str(Path(tmp) / "bench.sqlite3"),
+                    "--min-time",
+                    str(min_time),
+                ],
+                cwd=BACKEND_DIR,
+                env={**os.environ, "FAST_JSON": fast_json},
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            for key, value in json.loads(out.stdout.strip().splitlines()[-1]).items():
+                results[f"http.{mode}.{key}"] = metric(value, "us")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--min-time", type=float, default=0.5, help="seconds to spend per measurement"
+    )
+    parser.add_argument("--json", help="also write results to this file")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.min_time)))
+        return
+
+    results = run(args.min_time)
+    print(
+        f"{'p50 per request (us)':22}"
+        + "".join(f"{f'{m}/{s}':>16}" for m in JSON_MODES for s in ("drf", "lean"))
+    )
+    for endpoint in ENDPOINTS:
+        print(
+            f"{endpoint:22}"
+            + "".join(
+                f"{results[f'http.{m}.{s}.{endpoint}_us']['value']:16.1f}"
+                for m in JSON_MODES
+                for s in ("drf", "lean")
+            )
+        )
+    before, after = (
+        results["http.stdlib.drf.predict_us"]["value"],
+        results["http.orjson.lean.predict_us"]["value"],
+    )
+    print(
+        f"\npredict: {before:.1f} us (DRF, stdlib json) -> "
+        f"{after:.1f} us (lean, orjson), "
+        f"{before - after:.1f} us less per request"
+    )
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
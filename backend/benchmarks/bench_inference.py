@@ -0,0 +1,143 @@
+"""
+Inference micro-benchmarks: predictor.predict, predict_batch, predict_dummy,
+payload validation and explainer contributions (linear plan and SHAP) at
+batch sizes 1 to 10k.
+
+Runs the real model from inference/model/ with the prediction cache off, so
+every call is scored. Set COMPILED_INFERENCE=False to benchmark the sklearn
+pipeline instead of the compiled arrays.
+
+Usage: python -m benchmarks.bench_inference [--sizes 1,10,100,1000,10000]
+                                            [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Any, Dict, List
+
+from .common import BACKEND_DIR, metric, time_call
+
+DEFAULT_SIZES = (1, 10, 100, 1000, 10000)
+
+
+def _records(schema: Dict, n: int) -> List[Dict[str, float]]:
+    from inference.compiled import probe_matrix
+
+    names = [f["name"] for f in schema["features"]]
+    return [dict(zip(names, row)) for row in probe_matrix(schema, n, seed=1).tolist()]
+
+
+def run(sizes=DEFAULT_SIZES, min_time: float = 0.5) -> Dict[str, Dict[str, Any]]:
+    os.environ.update(
+        DUMMY_MODE="False",
+        PREDICTION_CACHE_SIZE="0",
+        INFERENCE_BATCHING="False",
+        INFERENCE_POOL_SIZE="0",
+    )
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+    import pandas as pd
+    from inference import predictor
+    from inference.explainer import compute_contributions, compute_contributions_batch
+
+    predictor.warmup()
+    bundle = predictor.get_bundle()
+    schema = bundle.schema
+    names = bundle.feature_names
+    model = bundle.scoring_model()
+    plan = bundle.explanation_plan()
+    shap_explainer = bundle.shap_explainer()
+    records = _records(schema, max(sizes))
+    results = {}
+
+    stats = time_call(lambda: predictor.predict(records[0]), min_time)
+    results["inference.predict.single_us"] = metric(
+        stats["p50"] * 1e6, "us", p95=stats["p95"] * 1e6
+    )
+
+    stats = time_call(lambda: predictor.predict_dummy(records[0]), min_time)
+    results["inference.predict_dummy.single_us"] = metric(
+        stats["p50"] * 1e6, "us", p95=stats["p95"] * 1e6
+    )
+
+    frame = pd.DataFrame(records[:1], columns=names)
+    stats = time_call(
+        lambda: compute_contributions(model, frame, names, False, plan=plan), min_time
+    )
+    results["explain.linear.single_us"] = metric(stats["p50"] * 1e6, "us")
+    if shap_explainer is not None:
+        stats = time_call(
+            lambda: compute_contributions(
+                model, frame, names, True, plan=plan, shap_explainer=shap_explainer
+            ),
+            min_time,
+        )
+        results["explain.shap.single_us"] = metric(stats["p50"] * 1e6, "us")
+
+    for n in sizes:
+        batch = records[:n]
+        X = pd.DataFrame(batch, columns=names).to_numpy()
+        stats = time_call(lambda: predictor.predict_batch(batch), min_time)
+        results[f"inference.predict_batch.n{n}.per_record_us"] = metric(
+            stats["p50"] / n * 1e6, "us", batch_ms=stats["p50"] * 1e3
+        )
+        stats = time_call(lambda: bundle.validator.validate_many(batch), min_time)
+        results[f"validate.n{n}.per_record_us"] = metric(
+            stats["p50"] / n * 1e6, "us", batch_ms=stats["p50"] * 1e3
+        )
+        stats = time_call(
+            lambda: compute_contributions_batch(model, X, names, False, plan=plan),
+            min_time,
+        )
+        results[f"explain.linear.n{n}.per_record_us"] = metric(
+            stats["p50"] / n * 1e6, "us", batch_ms=stats["p50"] * 1e3
+        )
+        if shap_explainer is not None:
+            stats = time_call(
+                lambda: compute_contributions_batch(
+                    model, X, names, True, plan=plan, shap_explainer=shap_explainer
+                ),
+                min_time,
+            )
+            results[f"explain.shap.n{n}.per_record_us"] = metric(
+                stats["p50"] / n * 1e6, "us", batch_ms=stats["p50"] * 1e3
+            )
+    return results
+
+
+def print_table(results: Dict[str, Dict[str, Any]]) -> None:
+    for name, result in results.items():
+        extra = "".join(
+            f"  {key}={value:.3f}"
+            for key, value in result.items()
+            if key not in ("value", "unit", "better")
+        )
+        print(f"{name:48} {result['value']:12.2f} {result['unit']}{extra}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--sizes",
+        default=",".join(map(str, DEFAULT_SIZES)),
+        help="comma-separated batch sizes",
+    )
+    parser.add_argument(
+        "--min-time", type=float, default=0.5, help="seconds to spend per measurement"
+    )
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    results = run([int(n) for n in args.sizes.split(",")], args.min_time)
+    print_table(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Shared helpers for the benchmark modules: timing, result records and the
+machine-readable results file.
+
+Every benchmark returns {metric_name: result}, where a result is built by
+metric() and says which direction is better, so compare() can flag
+regressions without knowing what the metric measures.
+"""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+THRESHOLDS_PATH = Path(__file__).resolve().parent / "thresholds.json"
+
+
+def metric(
+    value: float, unit: str, better: str = "lower", **extra: Any
+) -> Dict[str, Any]:
+    """One result. `better` is "lower" (latency) or "higher" (throughput)."""
+    return {"value": value, "unit": unit, "better": better, **extra}
+
+
+def time_call(
+    fn: Callable[[], Any],
+    min_time: float = 0.5,
+    min_runs: int = 5,
+    max_runs: int = 10000,
+) -> Dict[str, float]:
+    """
+    Run fn repeatedly (after one warm-up call) and return per-call latency
+    stats in seconds.
+    """
+    fn()
+    samples = []
+    deadline = time.perf_counter() + min_time
+    while len(samples) < max_runs and (
+        len(samples) < min_runs or time.perf_counter() < deadline
+    ):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return latency_stats(samples)
+
+
+def latency_stats(samples) -> Dict[str, float]:
+    ordered = sorted(samples)
+
+    def percentile(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {
+        "runs": len(ordered),
+        "mean": statistics.fmean(ordered),
+        "p50": percentile(0.50),
+        "p95": percentile(0.95),
+        "p99": percentile(0.99),
+    }
+
+
+def setup_django(db_path: Optional[str] = None) -> None:
+    """
+    Configure Django from core.settings, optionally on another SQLite file,
+    and migrate it.
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+    os.environ["EAGER_WARMUP"] = "False"
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+    from django.conf import settings
+
+    if db_path:
+        settings.DATABASES["default"]["NAME"] = db_path
+    import django
+
+    django.setup()
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = (
+            subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"],
+                cwd=BACKEND_DIR,
+                capture_output=True,
+                text=True,
+            ).stdout.strip()
+            or None
+        )
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def write_results(
+    path: Path, results: Dict[str, Dict[str, Any]], options: Dict[str, Any]
+) -> None:
+    document = {**environment(), "options": options, "results": results}
+    Path(path).write_text(json.dumps(document, indent=2, sort_keys=True))
+
+
+def load_thresholds(path: Path = THRESHOLDS_PATH) -> Dict[str, Any]:
+    return json.loads(Path(path).read_text())
+
+
+def _threshold_for(name: str, thresholds: Dict[str, Any]) -> float:
+    # Longest matching prefix wins, e.g. "loadgen." over the default
+    matches = [
+        prefix for prefix in thresholds.get("metrics", {}) if name.startswith(prefix)
+    ]
+    if matches:
+        return thresholds["metrics"][max(matches, key=len)]
+    return thresholds["default"]
+
+
+def compare(
+    baseline: Dict[str, Any], current: Dict[str, Any], thresholds: Dict[str, Any]
+) -> list:
+    """
+    Rows of (metric, baseline, current, relative change, allowed, regressed) for
+    metrics present in both result files. A positive change is always worse.
+    """
+    rows = []
+    for name, result in sorted(current["results"].items()):
+        before = baseline["results"].get(name)
+        if before is None or not before["value"]:
+            continue
+        change = (result["value"] - before["value"]) / before["value"]
+        if result["better"] == "higher":
+            change = -change
+        allowed = _threshold_for(name, thresholds)
+        rows.append(
+            (name, before["value"], result["value"], change, allowed, change > allowed)
+        )
+    return rows
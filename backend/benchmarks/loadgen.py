@@ -0,0 +1,188 @@
+"""
+Local load generator: starts the Django development server on a temporary
+database and drives it with concurrent clients, reporting throughput and
+p50/p95/p99 latency per endpoint.
+
+Usage: python -m benchmarks.loadgen [--concurrency 8] [--duration 10] [--dummy]
+                                    [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, List
+
+from .common import BACKEND_DIR, latency_stats, metric
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(base_url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(
+                f"{base_url}/api/ready/", timeout=2
+            ) as response:
+                if response.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not become ready within {timeout}s")
+
+
+def _records(schema: Dict, n: int) -> List[bytes]:
+    rng = random.Random(0)
+    return [
+        json.dumps(
+            {
+                f["name"]: round(rng.uniform(f["min"], f["max"]), 4)
+                for f in schema["features"]
+            }
+        ).encode()
+        for _ in range(n)
+    ]
+
+
+def _drive(request_factory, concurrency: int, duration: float) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client(seed: int) -> None:
+        rng = random.Random(seed)
+        local, failed = [], 0
+        while time.monotonic() < stop_at:
+            request = request_factory(rng)
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    response.read()
+                local.append(time.perf_counter() - start)
+            except (urllib.error.URLError, ConnectionError, OSError):
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "elapsed": elapsed,
+        **(latency_stats(latencies) if latencies else {}),
+    }
+
+
+def run(
+    concurrency: int = 8, duration: float = 10.0, dummy: bool = False
+) -> Dict[str, Dict[str, Any]]:
+    schema = json.loads((BACKEND_DIR / "inference" / "schema.json").read_text())
+    bodies = _records(schema, 1000)
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": "benchmarks.settings",
+            "BENCH_DB_PATH": str(Path(tmp) / "loadgen.sqlite3"),
+            "DUMMY_MODE": "True" if dummy else "False",
+            "EAGER_WARMUP": "True",
+        }
+        subprocess.run(
+            [sys.executable, "manage.py", "migrate", "-v", "0"],
+            cwd=BACKEND_DIR,
+            env=env,
+            check=True,
+        )
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                "manage.py",
+                "runserver",
+                f"127.0.0.1:{port}",
+                "--noreload",
+            ],
+            cwd=BACKEND_DIR,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            _wait_ready(base_url)
+            scenarios = {
+                "health": lambda rng: urllib.request.Request(f"{base_url}/api/health/"),
+                "predict": lambda rng: urllib.request.Request(
+                    f"{base_url}/api/predict/",
+                    data=rng.choice(bodies),
+                    headers={"Content-Type": "application/json"},
+                    method="POST",
+                ),
+            }
+            results = {}
+            for name, factory in scenarios.items():
+                stats = _drive(factory, concurrency, duration)
+                results[f"loadgen.{name}.rps"] = metric(
+                    stats["requests"] / stats["elapsed"],
+                    "req/s",
+                    better="higher",
+                    requests=stats["requests"],
+                    errors=stats["errors"],
+                )
+                if stats["requests"]:
+                    for q in ("p50", "p95", "p99"):
+                        results[f"loadgen.{name}.{q}_ms"] = metric(
+                            stats[q] * 1000, "ms"
+                        )
+            return results
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent clients")
+    parser.add_argument(
+        "--duration", type=float, default=10.0, help="seconds per endpoint"
+    )
+    parser.add_argument(
+        "--dummy", action="store_true", help="serve with DUMMY_MODE=True"
+    )
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    results = run(args.concurrency, args.duration, args.dummy)
+    for name, result in results.items():
+        print(f"{name:28} {result['value']:10.2f} {result['unit']}")
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+"""
+Settings for benchmark servers: core.settings on a throwaway SQLite file.
+"""
+
+import os
+
+from core.settings import *  # noqa: F401,F403
+
+DATABASES["default"]["NAME"] = os.environ["BENCH_DB_PATH"]  # noqa: F405
+ALLOWED_HOSTS = ["*"]
+DEBUG = False
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "root": {"level": "WARNING"},
+}
@@ -0,0 +1,119 @@
+"""
+Benchmark results files, regression thresholds and `python -m benchmarks compare`.
+"""
+
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from django.test import SimpleTestCase
+
+from benchmarks.common import (
+    BACKEND_DIR,
+    compare,
+    latency_stats,
+    load_thresholds,
+    metric,
+    write_results,
+)
+
+THRESHOLDS = {"default": 0.25, "metrics": {"http.": 0.30, "http.orjson.": 0.10}}
+
+
+def results(**values):
+    return {
+        "results": {
+            name: metric(value, "us", better)
+            for name, (value, better) in values.items()
+        }
+    }
+
+
+class CompareTests(SimpleTestCase):
+    def test_direction_and_longest_prefix(self):
+        baseline = results(
+            **{
+                "inference.p50": (100, "lower"),
+                "loadgen.rps": (200, "higher"),
+                "http.stdlib.predict": (1000, "lower"),
+                "http.orjson.predict": (1000, "lower"),
+            }
+        )
+        current = results(
+            **{
+                "inference.p50": (120, "lower"),
+                "loadgen.rps": (140, "higher"),
+                "http.stdlib.predict": (1200, "lower"),
+                "http.orjson.predict": (1200, "lower"),
+            }
+        )
+        rows = {row[0]: row[3:] for row in compare(baseline, current, THRESHOLDS)}
+        self.assertEqual(rows["inference.p50"], (0.2, 0.25, False))
+        # Lower throughput is worse: the change is positive
+        self.assertEqual(rows["loadgen.rps"], (0.3, 0.25, True))
+        self.assertEqual(rows["http.stdlib.predict"], (0.2, 0.30, False))
+        self.assertEqual(rows["http.orjson.predict"], (0.2, 0.10, True))
+
+    def test_improvements_and_unmatched_metrics(self):
+        baseline = results(
+            **{"a": (100, "lower"), "b": (0, "lower"), "only_before": (1, "lower")}
+        )
+        current = results(
+            **{"a": (50, "lower"), "b": (5, "lower"), "only_after": (1, "lower")}
+        )
+        rows = compare(baseline, current, THRESHOLDS)
+        self.assertEqual(
+            [(row[0], row[3], row[5]) for row in rows], [("a", -0.5, False)]
+        )
+
+    def test_shipped_thresholds_have_a_default(self):
+        thresholds = load_thresholds()
+        self.assertIn("default", thresholds)
+        self.assertTrue(all(0 < value < 1 for value in thresholds["metrics"].values()))
+
+
+class ResultsFileTests(SimpleTestCase):
+    def test_latency_stats(self):
+        stats = latency_stats([float(i) for i in range(100, 0, -1)])
+        self.assertEqual(
+            (stats["runs"], stats["p50"], stats["p95"], stats["p99"]),
+            (100, 51.0, 96.0, 100.0),
+        )
+        self.assertEqual(stats["mean"], 50.5)
+
+    def test_compare_command_exit_status(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            write_results(
+                tmp / "base.json", {"inference.p50": metric(100, "us")}, {"quick": True}
+            )
+            document = json.loads((tmp / "base.json").read_text())
+            self.assertEqual(document["options"], {"quick": True})
+            self.assertIn("python", document)
+
+            def run(value):
+                write_results(
+                    tmp / "current.json", {"inference.p50": metric(value, "us")}, {}
+                )
+                return subprocess.run(
+                    [
+                        sys.executable,
+                        "-m",
+                        "benchmarks",
+                        "compare",
+                        str(tmp / "base.json"),
+                        str(tmp / "current.json"),
+                    ],
+                    cwd=BACKEND_DIR,
+                    capture_output=True,
+                    text=True,
+                )
+
+            ok = run(110)
+            self.assertEqual(ok.returncode, 0, ok.stderr)
+            self.assertIn("No regressions", ok.stdout)
+            regressed = run(150)
+            self.assertEqual(regressed.returncode, 1)
+            self.assertIn("REGRESSION", regressed.stdout)
@@ -1,5 +1,9 @@
 """
 ASGI config for breast cancer detector project.
+
+Serve with an ASGI server (e.g. `uvicorn core.asgi:application`) to use the
+async /api/predict/async/ endpoint, which awaits the micro-batching scheduler
+(INFERENCE_BATCHING=True) instead of holding a thread per request.
 """
 
 import os
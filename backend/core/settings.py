@@ -34,8 +34,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Opt-in (PROFILING_ENABLED); removes itself from the chain when off
+    'api.profiling.ProfilingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Serves LEAN_API_PREFIX itself, skipping everything below (api/lean.py)
+    'api.lean.LeanPathMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -46,6 +50,10 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'core.urls'
 
+# Stateless health/schema/predict endpoints without session/auth/messages middleware;
+# '' disables them
+LEAN_API_PREFIX = os.getenv('LEAN_API_PREFIX', '/api/lean/')
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -65,10 +73,32 @@ TEMPLATES = [
 WSGI_APPLICATION = 'core.wsgi.application'
 
 # Database
+# SQLite pragmas run on every new connection: WAL lets readers proceed during
+# writes, synchronous=NORMAL only fsyncs at checkpoints (safe under WAL), and
+# a negative cache_size is in KiB.
+SQLITE_INIT_PRAGMAS = [
+    f"PRAGMA cache_size=-{int(os.getenv('SQLITE_CACHE_SIZE_KB', '65536'))}",
+]
+if os.getenv('SQLITE_WAL', 'True').lower() == 'true':
+    SQLITE_INIT_PRAGMAS += ["PRAGMA journal_mode=WAL", "PRAGMA synchronous=NORMAL"]
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Reuse connections across requests instead of reconnecting each time
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ';'.join(SQLITE_INIT_PRAGMAS),
+            # Take the write lock at BEGIN so concurrent writers queue on
+            # `timeout` instead of failing with "database is locked"
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # A file rather than in-memory, so tests get the same WAL locking as
+        # a real database
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -102,12 +132,14 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Django REST Framework
+# orjson-backed when FAST_JSON is on and orjson is installed, else DRF's JSON classes
+# (api/fastjson.py)
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'api.fastjson.ORJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
-        'rest_framework.parsers.JSONParser',
+        'api.fastjson.ORJSONParser',
     ],
 }
 
@@ -1,11 +1,24 @@
 """
 URL configuration for breast cancer detector project.
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 
+from api.profiling import download_profile, list_profiles
+from api.views import prometheus_metrics
+
 urlpatterns = [
+    path('admin/profiles/', list_profiles, name='list_profiles'),
+    path('admin/profiles/<str:profile_id>/', download_profile, name='download_profile'),
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
+    path('metrics', prometheus_metrics, name='prometheus_metrics'),
 ]
 
+if settings.LEAN_API_PREFIX:
+    # Normally answered by LeanPathMiddleware before URL resolution; mounted
+    # here for reverse()
+    urlpatterns.append(
+        path(settings.LEAN_API_PREFIX.lstrip('/'), include('api.lean_urls'))
+    )
@@ -0,0 +1,90 @@
+"""
+Bounded in-process LRU cache for prediction results.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+import numpy as np
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache with a per-entry TTL.
+
+    Keys are built from the schema-ordered feature vector quantized to
+    `precision` decimals plus whatever context distinguishes results
+    (threshold, explanation mode). Each model bundle owns its own cache, so
+    a new model version or schema always starts empty.
+    """
+
+    def __init__(
+        self, max_size: int = 1024, ttl_seconds: float = 300.0, precision: int = 6
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.precision = precision
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def keys_for(self, X: np.ndarray, context: Tuple) -> list:
+        """One cache key per row of X (already in schema order)."""
+        # + 0.0 folds -0.0 into 0.0 so both quantize to the same bytes
+        quantized = np.round(np.asarray(X, dtype=np.float64), self.precision) + 0.0
+        return [(row.tobytes(), context) for row in quantized]
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "precision": self.precision,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,289 @@
+"""
+Compiled NumPy inference for linear calibrated pipelines.
+
+At model-load time the fitted sklearn objects are flattened into contiguous
+arrays so that a batch can be scored with a few matrix operations instead of
+going through pandas, ColumnTransformer and every calibrated fold.
+"""
+
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Compact, non-pickle artifact written next to model_pipeline.pkl
+ARTIFACT_FORMAT = "compiled-linear-v1"
+ARRAYS_FILENAME = "model_arrays.npz"
+MANIFEST_FILENAME = "manifest.json"
+_ARRAY_FIELDS = ("means", "scales", "coefs", "intercepts", "a", "b")
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    with np.errstate(over="ignore"):
+        return 1.0 / (1.0 + np.exp(-x))
+
+
+class CompiledLinearModel:
+    """
+    Array form of a calibrated (or plain) standardized linear classifier.
+
+    Per fold k, with feature order fixed to the schema:
+        z_k = (x - means[k]) / scales[k]
+        t_k = z_k @ coefs[k] + intercepts[k]
+        p_k = sigmoid(-(a[k] * t_k + b[k]))
+    and the malignant probability is the mean of p_k over folds.
+    An uncalibrated classifier is represented by a single fold with a=-1, b=0.
+    """
+
+    def __init__(
+        self,
+        feature_names: List[str],
+        means: np.ndarray,
+        scales: np.ndarray,
+        coefs: np.ndarray,
+        intercepts: np.ndarray,
+        a: np.ndarray,
+        b: np.ndarray,
+    ):
+        self.feature_names = list(feature_names)
+        self.means = np.ascontiguousarray(means, dtype=np.float64)
+        self.scales = np.ascontiguousarray(scales, dtype=np.float64)
+        self.coefs = np.ascontiguousarray(coefs, dtype=np.float64)
+        self.intercepts = np.ascontiguousarray(intercepts, dtype=np.float64)
+        self.a = np.ascontiguousarray(a, dtype=np.float64)
+        self.b = np.ascontiguousarray(b, dtype=np.float64)
+
+        # Fold the scaler into raw-space weights: t = x @ weights.T + biases
+        self.weights = np.ascontiguousarray(self.coefs / self.scales)
+        self.biases = self.intercepts - np.einsum("kf,kf->k", self.means, self.weights)
+
+    @property
+    def n_folds(self) -> int:
+        return self.coefs.shape[0]
+
+    def decision_function(self, X: np.ndarray) -> np.ndarray:
+        """Per-fold decision values, shape (n_samples, n_folds)."""
+        return X @ self.weights.T + self.biases
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Malignant probability for each row of X, shape (n_samples,)."""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        t = self.decision_function(X)
+        return _sigmoid(-(self.a * t + self.b)).mean(axis=1)
+
+
+def _final_estimator(est):
+    return est.steps[-1][1] if hasattr(est, "steps") else est
+
+
+def fold_estimator(calibrated):
+    """
+    The fitted estimator of one CalibratedClassifierCV fold, unwrapped from the
+    FrozenEstimator used when a prefit model is recalibrated.
+    """
+    est = (
+        calibrated.estimator
+        if hasattr(calibrated, "estimator")
+        else calibrated.base_estimator
+    )
+    if type(est).__name__ == "FrozenEstimator":
+        est = est.estimator
+    return est
+
+
+def _extract_linear_fold(pipeline, feature_names: List[str]):
+    """
+    Pull (means, scales, coef, intercept) in schema order from one fitted
+    Pipeline of [optional scaler/ColumnTransformer] -> linear classifier.
+    Raises ValueError if the pipeline has a shape we do not know how to compile.
+    """
+    from sklearn.compose import ColumnTransformer
+    from sklearn.linear_model._base import LinearClassifierMixin
+    from sklearn.preprocessing import StandardScaler
+
+    steps = pipeline.steps if hasattr(pipeline, "steps") else [("clf", pipeline)]
+    n_features = len(feature_names)
+    clf = steps[-1][1]
+    if not isinstance(clf, LinearClassifierMixin) or clf.coef_.shape != (1, n_features):
+        raise ValueError(f"Unsupported final estimator: {type(clf).__name__}")
+
+    means = np.zeros(n_features)
+    scales = np.ones(n_features)
+    columns = list(feature_names)
+
+    transformers = [step for _, step in steps[:-1] if step not in (None, "passthrough")]
+    if len(transformers) > 1:
+        raise ValueError("Only a single preprocessing step can be compiled")
+    if transformers:
+        pre = transformers[0]
+        if isinstance(pre, ColumnTransformer):
+            fitted = [
+                t for t in pre.transformers_ if t[0] != "remainder" and t[1] != "drop"
+            ]
+            if len(fitted) != 1 or pre.remainder != "drop":
+                raise ValueError(
+                    "Only a single-scaler ColumnTransformer can be compiled"
+                )
+            _, scaler, columns = fitted[0]
+            columns = list(columns)
+        else:
+            scaler = pre
+        if not isinstance(scaler, StandardScaler):
+            raise ValueError(f"Unsupported preprocessing step: {type(scaler).__name__}")
+        if scaler.mean_ is not None:
+            means = np.asarray(scaler.mean_, dtype=np.float64)
+        if scaler.scale_ is not None:
+            scales = np.asarray(scaler.scale_, dtype=np.float64)
+
+    if len(columns) != n_features or set(columns) != set(feature_names):
+        raise ValueError("Model columns do not match the schema features")
+
+    # Reorder from model column order to schema order
+    order = [columns.index(name) for name in feature_names]
+    return means[order], scales[order], clf.coef_[0][order], float(clf.intercept_[0])
+
+
+def compile_model(model, feature_names: List[str]) -> CompiledLinearModel:
+    """
+    Compile a fitted model into a CompiledLinearModel.
+    Supports CalibratedClassifierCV(method='sigmoid') over a standardized
+    linear pipeline, or the bare pipeline itself.
+    Raises ValueError for anything else (e.g. tree ensembles).
+    """
+    if hasattr(model, "calibrated_classifiers_"):
+        if list(getattr(model, "classes_", [])) != [0, 1]:
+            raise ValueError("Only binary 0/1 models can be compiled")
+        folds = []
+        for calibrated in model.calibrated_classifiers_:
+            if calibrated.method != "sigmoid" or len(calibrated.calibrators) != 1:
+                raise ValueError(f"Unsupported calibration method: {calibrated.method}")
+            est = fold_estimator(calibrated)
+            calibrator = calibrated.calibrators[0]
+            folds.append(
+                (
+                    *_extract_linear_fold(est, feature_names),
+                    calibrator.a_,
+                    calibrator.b_,
+                )
+            )
+    else:
+        clf = _final_estimator(model)
+        if list(getattr(clf, "classes_", [])) != [0, 1]:
+            raise ValueError("Only binary 0/1 models can be compiled")
+        # Plain logistic regression: p = sigmoid(t) == sigmoid(-(-1 * t + 0))
+        if type(clf).__name__ != "LogisticRegression":
+            raise ValueError(
+                f"Unsupported uncalibrated estimator: {type(clf).__name__}"
+            )
+        folds = [(*_extract_linear_fold(model, feature_names), -1.0, 0.0)]
+
+    means, scales, coefs, intercepts, a, b = (np.array(col) for col in zip(*folds))
+    return CompiledLinearModel(feature_names, means, scales, coefs, intercepts, a, b)
+
+
+def probe_matrix(schema: dict, n_rows: int = 64, seed: int = 0) -> np.ndarray:
+    """Deterministic rows spread across the schema min/max bounds."""
+    lows = np.array([float(f.get("min") or 0.0) for f in schema["features"]])
+    highs = np.array(
+        [
+            float(f.get("max") if f.get("max") is not None else 1.0)
+            for f in schema["features"]
+        ]
+    )
+    rng = np.random.RandomState(seed)
+    return lows + rng.uniform(size=(n_rows, len(lows))) * (highs - lows)
+
+
+def verify_parity(
+    compiled: CompiledLinearModel, model, X: np.ndarray, atol: float = 1e-9
+) -> float:
+    """
+    Compare compiled and sklearn probabilities on X.
+    Returns the max absolute difference; raises ValueError if it exceeds atol.
+    """
+    import pandas as pd
+
+    expected = model.predict_proba(pd.DataFrame(X, columns=compiled.feature_names))[
+        :, 1
+    ]
+    max_diff = float(np.max(np.abs(compiled.predict_proba(X) - expected)))
+    if max_diff > atol:
+        raise ValueError(
+            f"Compiled model disagrees with sklearn (max diff {max_diff:.3e})"
+        )
+    return max_diff
+
+
+def try_compile(model, schema: dict) -> Optional[CompiledLinearModel]:
+    """
+    Compile and parity-check a model. Never raise; return None (meaning
+    'use sklearn') if the model cannot be compiled or fails the check.
+    """
+    feature_names = [f["name"] for f in schema["features"]]
+    try:
+        compiled = compile_model(model, feature_names)
+        max_diff = verify_parity(compiled, model, probe_matrix(schema))
+        logger.info(
+            f"Compiled model with {compiled.n_folds} fold(s); parity "
+            f"max diff {max_diff:.2e}"
+        )
+        return compiled
+    except Exception as e:
+        logger.info(f"Model not compiled, using sklearn for inference. Reason: {e}")
+        return None
+
+
+def _sha256(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def save_artifact(compiled: CompiledLinearModel, out_dir: Path, version: str) -> Dict:
+    """
+    Write the compiled arrays as an uncompressed .npz plus a JSON manifest
+    (format, version, feature order, checksum). Returns the manifest.
+    """
+    out_dir = Path(out_dir)
+    arrays_path = out_dir / ARRAYS_FILENAME
+    with open(arrays_path, "wb") as f:
+        np.savez(f, **{name: getattr(compiled, name) for name in _ARRAY_FIELDS})
+
+    manifest = {
+        "format": ARTIFACT_FORMAT,
+        "version": version,
+        "feature_names": compiled.feature_names,
+        "n_folds": compiled.n_folds,
+        "arrays": ARRAYS_FILENAME,
+        "sha256": _sha256(arrays_path),
+    }
+    with open(out_dir / MANIFEST_FILENAME, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_artifact(model_dir: Path) -> Tuple[CompiledLinearModel, Dict]:
+    """
+    Load a compiled model written by save_artifact without importing sklearn.
+    Raises (OSError/ValueError/KeyError) if files are missing, the format is
+    unknown, or the checksum does not match.
+    """
+    model_dir = Path(model_dir)
+    with open(model_dir / MANIFEST_FILENAME, "r") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != ARTIFACT_FORMAT:
+        raise ValueError(f"Unsupported artifact format: {manifest.get('format')}")
+
+    arrays_path = model_dir / manifest["arrays"]
+    if _sha256(arrays_path) != manifest["sha256"]:
+        raise ValueError(f"Checksum mismatch for {arrays_path}")
+
+    with np.load(arrays_path, allow_pickle=False) as arrays:
+        compiled = CompiledLinearModel(
+            manifest["feature_names"], *(arrays[name] for name in _ARRAY_FIELDS)
+        )
+    return compiled, manifest
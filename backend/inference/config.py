@@ -0,0 +1,50 @@
+"""
+Immutable runtime configuration for the inference module.
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() == "true"
+
+
+@dataclass(frozen=True)
+class RuntimeConfig:
+    """
+    Snapshot of everything predict() needs that used to be re-read per request:
+    environment flags, the model version and the schema feature order.
+    Built once (at startup warmup or on first use) and never mutated.
+    """
+
+    dummy_mode: bool
+    threshold: float
+    explain_with_shap: bool
+    compiled_inference: bool
+    cache_size: int
+    cache_ttl_seconds: float
+    cache_precision: int
+    drift_monitoring: bool
+    drift_window_size: int
+    enforce_schema_bounds: bool
+    model_version: str
+    feature_names: Tuple[str, ...]
+
+    @classmethod
+    def from_environ(cls, model_version: str, schema: Dict) -> "RuntimeConfig":
+        return cls(
+            dummy_mode=_env_flag("DUMMY_MODE", "True"),
+            threshold=float(os.getenv("PREDICTION_THRESHOLD", "0.50")),
+            explain_with_shap=_env_flag("EXPLAIN_WITH_SHAP", "False"),
+            compiled_inference=_env_flag("COMPILED_INFERENCE", "True"),
+            cache_size=int(os.getenv("PREDICTION_CACHE_SIZE", "1024")),
+            cache_ttl_seconds=float(os.getenv("PREDICTION_CACHE_TTL", "300")),
+            cache_precision=int(os.getenv("PREDICTION_CACHE_PRECISION", "6")),
+            drift_monitoring=_env_flag("DRIFT_MONITORING", "True"),
+            drift_window_size=int(os.getenv("DRIFT_WINDOW_SIZE", "5000")),
+            enforce_schema_bounds=_env_flag("ENFORCE_SCHEMA_BOUNDS", "True"),
+            model_version=model_version,
+            feature_names=tuple(f["name"] for f in schema["features"]),
+        )
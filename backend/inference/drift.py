@@ -0,0 +1,180 @@
+"""
+Streaming input-drift detection against the training distribution.
+
+Training (ml/train_model.py) saves a reference histogram per feature: the
+counts of the training rows in quantile bins. At serving time each incoming
+record is mapped to the same bins and kept in a fixed-size ring buffer, so the
+live histogram always covers the last `window_size` records in constant memory.
+PSI and a binned KS statistic are computed from the two histograms on demand.
+"""
+
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_FILENAME = "reference_histograms.json"
+N_REFERENCE_BINS = 20
+
+# Conventional PSI bands: < 0.1 stable, 0.1-0.25 moderate shift, > 0.25 significant
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+# Smoothing for empty bins in the PSI log-ratio
+EPSILON = 1e-4
+
+
+def build_reference(
+    X, feature_names: Sequence[str], model_version: str, n_bins: int = N_REFERENCE_BINS
+) -> Dict[str, Any]:
+    """
+    Quantile-binned histogram of each training feature (X is a DataFrame
+    or (N, F) array).
+    """
+    values = np.asarray(X, dtype=np.float64)
+    features = {}
+    for j, name in enumerate(feature_names):
+        column = values[:, j]
+        # Interior quantile edges; duplicates collapse for low-cardinality features
+        edges = np.unique(np.quantile(column, np.linspace(0, 1, n_bins + 1)[1:-1]))
+        counts = np.bincount(
+            np.searchsorted(edges, column, side="right"), minlength=len(edges) + 1
+        )
+        features[name] = {"edges": edges.tolist(), "counts": counts.tolist()}
+    return {
+        "model_version": model_version,
+        "n_samples": int(len(values)),
+        "features": features,
+    }
+
+
+def save_reference(reference: Dict[str, Any], out_dir: Path) -> Path:
+    path = Path(out_dir) / REFERENCE_FILENAME
+    path.write_text(json.dumps(reference, indent=2), encoding="utf-8")
+    return path
+
+
+class DriftMonitor:
+    """
+    Rolling-window histograms of live inputs, binned like the reference.
+    observe() costs a few microseconds per record; memory is
+    window_size x n_features bin indices plus the count tables.
+    """
+
+    def __init__(self, reference: Dict[str, Any], window_size: int = 5000):
+        self.feature_names: List[str] = list(reference["features"])
+        self.reference_version = reference.get("model_version")
+        self.window_size = window_size
+        n_features = len(self.feature_names)
+        n_bins = max(len(f["counts"]) for f in reference["features"].values())
+
+        # Pad every feature to the same number of edges with +inf so binning is one
+        # vectorized compare
+        self._edges = np.full((n_features, n_bins - 1), np.inf)
+        self._reference = np.zeros((n_features, n_bins))
+        self._n_bins = np.zeros(n_features, dtype=np.int64)
+        for j, name in enumerate(self.feature_names):
+            spec = reference["features"][name]
+            self._edges[j, : len(spec["edges"])] = spec["edges"]
+            counts = np.asarray(spec["counts"], dtype=np.float64)
+            self._reference[j, : len(counts)] = counts / counts.sum()
+            self._n_bins[j] = len(counts)
+
+        self._ring = np.zeros((window_size, n_features), dtype=np.int16)
+        self._counts = np.zeros((n_features, n_bins), dtype=np.int64)
+        self._feature_index = np.arange(n_features)
+        self._position = 0
+        self._filled = 0
+        self.observed = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: Path, window_size: int = 5000) -> Optional["DriftMonitor"]:
+        """
+        Monitor for the reference at `path`, or None if there is no usable reference.
+        """
+        if not path.exists():
+            return None
+        try:
+            return cls(json.loads(path.read_text(encoding="utf-8")), window_size)
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable drift reference {path}: {e}")
+            return None
+
+    def observe(self, input_dicts: List[Dict[str, float]]) -> None:
+        """Add records to the window, evicting the oldest once it is full."""
+        if not input_dicts:
+            return
+        X = np.array(
+            [
+                [d.get(name, np.nan) for name in self.feature_names]
+                for d in input_dicts[-self.window_size :]
+            ],
+            dtype=np.float64,
+        )
+        # Same rule as the reference: bin = number of edges <= value (NaN
+        # lands in bin 0)
+        bins = (X[:, :, None] >= self._edges[None, :, :]).sum(axis=2).astype(np.int16)
+
+        with self._lock:
+            for row in bins:
+                if self._filled == self.window_size:
+                    self._counts[self._feature_index, self._ring[self._position]] -= 1
+                else:
+                    self._filled += 1
+                self._ring[self._position] = row
+                self._counts[self._feature_index, row] += 1
+                self._position = (self._position + 1) % self.window_size
+            self.observed += len(input_dicts)
+
+    def scores(self) -> Dict[str, Any]:
+        """PSI and binned KS per feature for the current window."""
+        with self._lock:
+            counts = self._counts.astype(np.float64)
+            n = self._filled
+        features = {}
+        for j, name in enumerate(self.feature_names):
+            k = self._n_bins[j]
+            reference = self._reference[j, :k]
+            if n:
+                current = counts[j, :k] / n
+                psi = float(
+                    np.sum(
+                        (current - reference)
+                        * np.log((current + EPSILON) / (reference + EPSILON))
+                    )
+                )
+                ks = float(np.max(np.abs(np.cumsum(current) - np.cumsum(reference))))
+            else:
+                psi = ks = None
+            features[name] = {
+                "psi": psi,
+                "ks": ks,
+                "status": self._status(psi),
+            }
+        psis = [f["psi"] for f in features.values() if f["psi"] is not None]
+        return {
+            "reference_version": self.reference_version,
+            "window_size": self.window_size,
+            "window_count": n,
+            "observed": self.observed,
+            "max_psi": max(psis) if psis else None,
+            "drifted_features": [
+                name for name, f in features.items() if f["status"] == "significant"
+            ],
+            "features": features,
+        }
+
+    @staticmethod
+    def _status(psi: Optional[float]) -> Optional[str]:
+        if psi is None:
+            return None
+        if psi >= PSI_SIGNIFICANT:
+            return "significant"
+        if psi >= PSI_MODERATE:
+            return "moderate"
+        return "stable"
@@ -1,53 +1,156 @@
 import logging
-from typing import List
+from typing import List, Optional
 import numpy as np
 import pandas as pd
 
+from .compiled import CompiledLinearModel, compile_model, fold_estimator
+
 logger = logging.getLogger(__name__)
 
-def _unwrap_estimator(model):
+TOP_K = 5
+
+def _unwrap_estimators(model) -> list:
     """
-    Try to unwrap common wrappers so we can read coefficients/importances.
+    Unwrap common wrappers so we can read coefficients/importances.
+    - CalibratedClassifierCV -> the fitted estimator of every calibrated fold
     - Pipeline -> use last step
-    - CalibratedClassifierCV -> use base_estimator of first calibrated classifier
     """
-    est = model
-    # Pipeline
-    if hasattr(est, "named_steps"):
-        try:
-            est = list(est.named_steps.values())[-1]
-        except Exception:
-            pass
-    # CalibratedClassifierCV
-    if hasattr(est, "calibrated_classifiers_") and est.calibrated_classifiers_:
-        try:
-            est = est.calibrated_classifiers_[0].base_estimator
-        except Exception:
-            pass
-    return est
-
-def compute_contributions(model, X: pd.DataFrame, feature_names: List[str], use_shap: bool) -> List[dict]:
+    if hasattr(model, "calibrated_classifiers_") and model.calibrated_classifiers_:
+        ests = [fold_estimator(c) for c in model.calibrated_classifiers_]
+    else:
+        ests = [model]
+    return [e.steps[-1][1] if hasattr(e, "steps") else e for e in ests]
+
+
+class ExplanationPlan:
     """
-    Best-effort feature contribution computation.
-    Never raise; return [] on failure.
-    Strategies (in order):
-    1) SHAP if requested and available
-    2) Linear models: coef_ * value
-    3) Tree models: feature_importances_ * value
-    4) Fallback: all zeros
+    Precomputed per-model explanation: contributions = X * weights - offsets.
+
+    For linear models the row of contributions is each feature's term in the
+    calibrated log-odds, i.e. per fold k: -a_k * coef_kj * (x_j - mean_kj) / scale_kj,
+    averaged across all calibrated folds. For tree models the weights are the
+    fold-averaged feature_importances_ and offsets are zero.
+    """
+
+    def __init__(self, kind: str, weights: np.ndarray, offsets: np.ndarray):
+        self.kind = kind
+        self.weights = np.ascontiguousarray(weights, dtype=np.float64)
+        self.offsets = np.ascontiguousarray(offsets, dtype=np.float64)
+
+    def contributions(self, X: np.ndarray) -> np.ndarray:
+        """Contribution matrix, shape (n_samples, n_features)."""
+        return np.asarray(X, dtype=np.float64) * self.weights - self.offsets
+
+
+def build_explanation_plan(
+    model, feature_names: List[str], compiled: Optional[CompiledLinearModel] = None
+) -> ExplanationPlan:
+    """
+    Build the explanation plan for a loaded model once, at load time.
+    Never raise; fall back to an all-zero plan.
+    """
+    n_features = len(feature_names)
+    try:
+        if compiled is None:
+            try:
+                compiled = compile_model(model, feature_names)
+            except ValueError:
+                compiled = None
+
+        if compiled is not None:
+            # Log-odds slope of each fold after calibration is -a_k
+            slopes = -compiled.a[:, None] * compiled.weights
+            return ExplanationPlan(
+                "linear",
+                slopes.mean(axis=0),
+                (slopes * compiled.means).mean(axis=0),
+            )
+
+        ests = _unwrap_estimators(model)
+        if all(hasattr(e, "feature_importances_") for e in ests):
+            importances = np.mean([e.feature_importances_ for e in ests], axis=0)
+            return ExplanationPlan("importance", importances, np.zeros(n_features))
+    except Exception as e:
+        logger.warning(
+            f"Could not build explanation plan; contributions will be zero. Reason: {e}"
+        )
+
+    return ExplanationPlan("none", np.zeros(n_features), np.zeros(n_features))
+
+
+def build_shap_explainer(model, background: np.ndarray, feature_names: List[str],
+                         plan: Optional[ExplanationPlan] = None):
+    """
+    Build a reusable SHAP explainer against a fixed background sample.
+    Linear models get the closed-form LinearExplainer over the plan's
+    calibrated log-odds weights; anything else gets a model-agnostic
+    explainer on predict_proba. Raises if shap is not installed.
+    """
+    import shap  # optional
+
+    background = np.asarray(background, dtype=np.float64)
+    if plan is not None and plan.kind == "linear":
+        return shap.LinearExplainer((plan.weights, 0.0), background)
+
+    def predict_malignant(X):
+        return model.predict_proba(pd.DataFrame(X, columns=feature_names))[:, 1]
+
+    return shap.Explainer(
+        predict_malignant,
+        shap.maskers.Independent(background, max_samples=len(background)),
+        feature_names=feature_names,
+    )
+
+
+def top_contributions(
+    vals: np.ndarray, feature_names: List[str], k: int = TOP_K
+) -> List[List[dict]]:
+    """
+    The k largest-magnitude contributions of every row of vals, as dicts,
+    sorted by decreasing magnitude.
+    """
+    vals = np.asarray(vals, dtype=np.float64)
+    k = min(k, vals.shape[1])
+    if k == 0:
+        return [[] for _ in range(len(vals))]
+    mags = np.abs(vals)
+    idx = np.argpartition(-mags, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(mags, idx, axis=1), axis=1, kind="stable")
+    idx = np.take_along_axis(idx, order, axis=1)
+    top = np.take_along_axis(vals, idx, axis=1).tolist()
+    return [
+        [
+            {"feature": feature_names[j], "contribution": v}
+            for j, v in zip(row_idx, row_vals)
+        ]
+        for row_idx, row_vals in zip(idx.tolist(), top)
+    ]
+
+
+def compute_contributions_batch(model, X, feature_names: List[str], use_shap: bool,
+                                plan: Optional[ExplanationPlan] = None,
+                                shap_explainer=None) -> List[List[dict]]:
+    """
+    Batch variant of compute_contributions: one list of top contributions per row of X.
+    X may be a DataFrame or an (N, n_features) array in feature_names order.
+    Pass the model's precomputed plan and SHAP explainer to avoid rebuilding
+    them on every call.
+    Never raise; return [] for every row on failure.
     """
     try:
         if use_shap:
             try:
-                import shap  # optional
-                # Generic explainer; works for many sklearn pipelines
-                explainer = shap.Explainer(model, X, feature_names=feature_names)
-                sv = explainer(X)
+                if shap_explainer is None:
+                    # No stored background: explain against the batch itself
+                    shap_explainer = build_shap_explainer(
+                        model, np.asarray(X, dtype=float), feature_names, plan
+                    )
+                sv = shap_explainer(np.asarray(X, dtype=float))
                 vals = sv.values
                 if hasattr(vals, "shape") and len(vals.shape) == 3:
                     # some explainers return (n, m, k); take class-1 column
                     vals = vals[:, :, 1]
-                vals = np.array(vals)[0].tolist()
+                vals = np.asarray(vals, dtype=float)
             except Exception as e:
                 logger.warning(f"SHAP unavailable/failing, falling back. Reason: {e}")
                 vals = None
@@ -55,19 +158,39 @@ def compute_contributions(model, X: pd.DataFrame, feature_names: List[str], use_
             vals = None
 
         if vals is None:
-            est = _unwrap_estimator(model)
-            row = X.iloc[0].values
-
-            if hasattr(est, "coef_"):
-                vals = (row * est.coef_[0]).tolist()
-            elif hasattr(est, "feature_importances_"):
-                vals = (row * est.feature_importances_).tolist()
-            else:
-                vals = [0.0] * len(feature_names)
-
-        contribs = [{"feature": n, "contribution": float(v)} for n, v in zip(feature_names, vals)]
-        contribs.sort(key=lambda d: abs(d["contribution"]), reverse=True)
-        return contribs[:5]
+            if plan is None:
+                plan = build_explanation_plan(model, feature_names)
+            vals = plan.contributions(X)
+
+        return top_contributions(vals, feature_names)
+    except Exception as e:
+        logger.warning(
+            f"compute_contributions_batch failed; returning empty lists. Reason: {e}"
+        )
+        return [[] for _ in range(len(X))]
+
+
+def compute_contributions(
+    model,
+    X: pd.DataFrame,
+    feature_names: List[str],
+    use_shap: bool,
+    plan: Optional[ExplanationPlan] = None,
+    shap_explainer=None,
+) -> List[dict]:
+    """
+    Best-effort feature contribution computation.
+    Never raise; return [] on failure.
+    Strategies (in order):
+    1) SHAP if requested and available
+    2) Linear models: fold-averaged calibrated log-odds terms
+    3) Tree models: feature_importances_ * value
+    4) Fallback: all zeros
+    """
+    try:
+        return compute_contributions_batch(
+            model, X.iloc[:1], feature_names, use_shap, plan, shap_explainer
+        )[0]
     except Exception as e:
         logger.warning(f"compute_contributions failed; returning empty list. Reason: {e}")
         return []
@@ -0,0 +1,253 @@
+"""
+Optional process-pool backend for CPU-heavy scoring.
+
+Batches are dispatched to a ProcessPoolExecutor so SHAP or non-compiled
+models don't hold the request thread's GIL. Workers are started with
+"forkserver" (or "spawn" where that is unavailable), never by forking the
+serving process: it already runs other threads (warmup, the micro-batcher,
+the write-behind writer), and a forked child can deadlock on a lock one of
+them held. With forkserver, the modules named in `preload` are imported by the
+fork server before it forks any worker, so a module that loads the model at
+import time (inference.pool_preload) gives every worker the same copy, shared
+copy-on-write, rather than one load per worker. Under spawn each worker loads
+its own copy.
+Any pool failure (broken worker, timeout) degrades to in-process scoring for
+that call. A timed-out or broken pool is torn down, its workers terminated,
+and it is restarted after a cooldown.
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.context import BaseContext
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+START_METHODS = ("forkserver", "spawn")
+
+
+class PoolUnavailable(RuntimeError):
+    """The pool could not score this batch; the caller should score in-process."""
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def default_start_method() -> str:
+    return (
+        "forkserver"
+        if "forkserver" in multiprocessing.get_all_start_methods()
+        else "spawn"
+    )
+
+
+def mp_context(
+    start_method: Optional[str] = None, preload: Sequence[str] = ()
+) -> BaseContext:
+    """
+    Multiprocessing context for worker pools: forkserver (or spawn), never fork.
+    `preload` modules are imported by the fork server before its first fork; it
+    only takes effect if this is the first forkserver use in the process.
+    """
+    start_method = start_method or default_start_method()
+    context = multiprocessing.get_context(start_method)
+    if start_method == "forkserver" and preload:
+        context.set_forkserver_preload(list(preload))
+    return context
+
+
+def _terminate(executor: ProcessPoolExecutor) -> None:
+    # shutdown() leaves a job that is already running alone; stop its worker too
+    processes = list((getattr(executor, "_processes", None) or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+
+
+class ProcessPoolBackend:
+    """
+    Runs `score_fn(records, version)` in worker processes.
+    `init_fn` runs once in each worker (e.g. to load and warm the model).
+    Both must be importable module-level functions. `preload` names modules the
+    fork server imports before forking workers.
+    """
+
+    def __init__(
+        self,
+        score_fn: Callable[[List[Dict[str, float]], Optional[str]], List[Any]],
+        init_fn: Callable[[], None],
+        size: int = 2,
+        timeout: float = 10.0,
+        min_batch: int = 1,
+        start_method: Optional[str] = None,
+        restart_cooldown: float = 30.0,
+        preload: Sequence[str] = (),
+    ):
+        start_method = start_method or default_start_method()
+        if start_method not in START_METHODS:
+            raise ValueError(
+                f"Unsupported pool start method {start_method!r}; use "
+                f"one of {START_METHODS}"
+            )
+        self.score_fn = score_fn
+        self.init_fn = init_fn
+        self.size = size
+        self.timeout = timeout
+        self.min_batch = min_batch
+        self.start_method = start_method
+        self.restart_cooldown = restart_cooldown
+        self.preload = tuple(preload)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._failed_at: Optional[float] = None
+        self.batches = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.fallbacks = 0
+
+    @classmethod
+    def from_environ(
+        cls, score_fn, init_fn, preload: Sequence[str] = ()
+    ) -> Optional["ProcessPoolBackend"]:
+        """
+        Build a pool from INFERENCE_POOL_* settings, or None if
+        INFERENCE_POOL_SIZE is 0.
+        """
+        size = int(os.getenv("INFERENCE_POOL_SIZE", "0"))
+        if size <= 0:
+            return None
+        start_method = (
+            os.getenv("INFERENCE_POOL_START_METHOD") or default_start_method()
+        )
+        if start_method not in START_METHODS:
+            logger.warning(
+                f"INFERENCE_POOL_START_METHOD={start_method} is not supported; "
+                f"using {default_start_method()}"
+            )
+            start_method = default_start_method()
+        return cls(
+            score_fn,
+            init_fn,
+            size=size,
+            timeout=float(os.getenv("INFERENCE_POOL_TIMEOUT", "10")),
+            min_batch=int(os.getenv("INFERENCE_POOL_MIN_BATCH", "1")),
+            start_method=start_method,
+            preload=preload,
+        )
+
+    def start(self) -> ProcessPoolExecutor:
+        """Create the pool and start every worker now rather than on first use."""
+        with self._lock:
+            if self._executor is not None:
+                return self._executor
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.size,
+                mp_context=mp_context(self.start_method, self.preload),
+                initializer=self.init_fn,
+            )
+            pids = {
+                f.result(timeout=max(self.timeout, 60.0))
+                for f in [self._executor.submit(_ping) for _ in range(self.size)]
+            }
+            self._failed_at = None
+            logger.info(
+                f"Inference pool started ({self.start_method}, "
+                f"{len(pids)} worker(s) up)"
+            )
+            return self._executor
+
+    def _mark_broken(self, reason: str) -> None:
+        """
+        Tear the pool down, terminating its workers; it restarts after the cooldown.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._failed_at = time.monotonic()
+        if executor is not None:
+            _terminate(executor)
+            logger.error(f"Inference pool marked broken: {reason}")
+
+    def run(
+        self, records: List[Dict[str, float]], version: Optional[str] = None
+    ) -> List[Any]:
+        """
+        Score records in a worker process.
+        Raises PoolUnavailable if the pool is down, broken or times out.
+        Errors raised by score_fn itself (e.g. unknown version) propagate.
+        """
+        try:
+            return self._run(records, version)
+        except PoolUnavailable:
+            self.fallbacks += 1
+            raise
+
+    def _run(
+        self, records: List[Dict[str, float]], version: Optional[str]
+    ) -> List[Any]:
+        # _mark_broken may clear self._executor from another thread at any point;
+        # submit on the executor read here, which then just refuses new work
+        with self._lock:
+            executor = self._executor
+        if executor is None:
+            if (
+                self._failed_at is not None
+                and time.monotonic() - self._failed_at < self.restart_cooldown
+            ):
+                raise PoolUnavailable("pool is restarting")
+            try:
+                executor = self.start()
+            except Exception as e:
+                self._mark_broken(str(e))
+                raise PoolUnavailable(str(e))
+
+        try:
+            future = executor.submit(self.score_fn, records, version)
+        except (BrokenProcessPool, RuntimeError) as e:
+            self.failures += 1
+            self._mark_broken(str(e))
+            raise PoolUnavailable(str(e))
+
+        try:
+            results = future.result(timeout=self.timeout)
+        except FuturesTimeoutError:
+            # The worker is still busy with this batch; replace it rather than lose it
+            self.timeouts += 1
+            self._mark_broken(f"batch timed out after {self.timeout}s")
+            raise PoolUnavailable(f"timed out after {self.timeout}s")
+        except CancelledError:
+            # Queued behind a batch that broke or timed out the pool
+            raise PoolUnavailable("pool was restarted")
+        except BrokenProcessPool as e:
+            self.failures += 1
+            self._mark_broken(str(e))
+            raise PoolUnavailable(str(e))
+        self.batches += 1
+        return results
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "start_method": self.start_method,
+            "running": self._executor is not None,
+            "timeout_seconds": self.timeout,
+            "min_batch": self.min_batch,
+            "batches": self.batches,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+            "fallbacks": self.fallbacks,
+        }
@@ -0,0 +1,23 @@
+"""
+Imported by the inference pool's fork server before it forks any worker
+(see pool.py). Loading and warming the active model here means every worker
+starts with it already in memory, its arrays shared copy-on-write with the
+fork server, instead of each worker loading a copy of its own.
+"""
+
+import logging
+import os
+
+from . import predictor
+
+logger = logging.getLogger(__name__)
+
+# Process the model was loaded in; workers see the fork server's pid here
+loaded_in_pid = None
+
+try:
+    predictor._init_pool_worker()
+    loaded_in_pid = os.getpid()
+except Exception as e:
+    # Workers then load the model themselves in _init_pool_worker
+    logger.warning(f"Inference pool preload failed; workers will load the model: {e}")
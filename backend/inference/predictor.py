@@ -1,112 +1,146 @@
 """
 Model prediction module with dummy mode fallback.
 """
-import os
-import json
+import asyncio
 import logging
+import threading
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional, Any
 import numpy as np
 import pandas as pd
-from sklearn.pipeline import Pipeline
 
-from .explainer import compute_contributions
+from .cache import PredictionCache
+from .compiled import CompiledLinearModel
+from .config import RuntimeConfig
+from .drift import DriftMonitor
+from .explainer import ExplanationPlan
+from .pool import PoolUnavailable, ProcessPoolBackend
+from .registry import ModelBundle, ModelNotFoundError, ModelRegistry, is_version_name
+from .scheduler import MicroBatcher
+from .telemetry import telemetry
+from .validation import SchemaValidator, ValidatedBatch
 
 logger = logging.getLogger(__name__)
 
-# Global model cache
-_model_cache: Optional[Pipeline] = None
-_schema_cache: Optional[Dict] = None
+MODEL_DIR = Path(__file__).parent / "model"
+SCHEMA_PATH = Path(__file__).parent / "schema.json"
 
+# Global model registry (holds the active bundle and any pinned versions)
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
 
-def load_model() -> Optional[Pipeline]:
+# Optional micro-batching scheduler (INFERENCE_BATCHING=True)
+_scheduler: Optional[MicroBatcher] = None
+_scheduler_checked = False
+
+# Optional process-pool scoring backend (INFERENCE_POOL_SIZE > 0)
+_pool: Optional[ProcessPoolBackend] = None
+_pool_checked = False
+
+# Startup readiness, set by warmup()
+_ready = threading.Event()
+_warmup_report: Dict[str, Any] = {"status": "cold"}
+
+
+def get_registry() -> ModelRegistry:
+    """
+    Get the process-wide model registry (memoized singleton).
+    Uses MODEL_REGISTRY_DIR if set, else the single model in inference/model/.
+    """
+    global _registry
+
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry.from_environ(MODEL_DIR, SCHEMA_PATH)
+    return _registry
+
+
+def get_bundle(version: Optional[str] = None) -> ModelBundle:
+    """
+    The active model bundle, or a pinned version.
+    Raises ModelNotFoundError if the pinned version does not exist.
+    """
+    return get_registry().get(version)
+
+
+def resolve_model(spec: str) -> ModelBundle:
+    """
+    A standalone bundle for a model directory or a registry version name,
+    for offline tools. Raises ModelNotFoundError if it is neither.
     """
-    Load the trained model pipeline (memoized singleton).
+    registry = get_registry()
+    path = Path(spec)
+    if not path.is_dir() and registry.root is not None and is_version_name(spec):
+        path = registry.root / spec
+    if not path.is_dir():
+        raise ModelNotFoundError(
+            f"Model not found: {spec} is neither a directory nor a registry version"
+        )
+    return ModelBundle.from_directory(path, SCHEMA_PATH)
+
+
+def load_model():
+    """
+    Load the active trained model pipeline (memoized per bundle).
     Returns None if model files are not available.
     """
-    global _model_cache
+    return get_bundle().load_model()
 
-    if _model_cache is not None:
-        return _model_cache
 
-    model_path = Path(__file__).parent / "model" / "model_pipeline.pkl"
+def get_compiled_model() -> Optional[CompiledLinearModel]:
+    """The active model in compiled NumPy form, or None to use sklearn."""
+    return get_bundle().compiled_model()
 
-    if not model_path.exists():
-        logger.info(f"Model file not found at {model_path}. Running in dummy mode.")
-        return None
 
-    try:
-        import pickle
-        with open(model_path, 'rb') as f:
-            obj = pickle.load(f)
-
-        if isinstance(obj, dict):
-            pipeline = obj.get("pipeline")
-            if pipeline is None:
-                raise RuntimeError("model_pipeline.pkl did not contain 'pipeline'")
-            _model_cache = pipeline
-        else:
-            _model_cache = obj
+def get_explanation_plan() -> Optional[ExplanationPlan]:
+    """The active model's explanation plan, or None if no model is available."""
+    return get_bundle().explanation_plan()
 
-        logger.info("Model loaded successfully")
-        return _model_cache
 
-    except Exception as e:
-        logger.error(f"Failed to load model: {e}")
-        return None
+def get_shap_explainer() -> Optional[Any]:
+    """
+    The active model's SHAP explainer, or None if shap or the model is unavailable.
+    """
+    return get_bundle().shap_explainer()
 
 
-def get_schema() -> Dict:
+def get_schema(version: Optional[str] = None) -> Dict:
     """
-    Load the feature schema from JSON file.
-    Returns a default schema if file is not found.
+    The feature schema of the active (or pinned) model version.
+    Returns a default schema if schema.json is not found.
     """
-    global _schema_cache
-    
-    if _schema_cache is not None:
-        return _schema_cache
-    
-    schema_path = Path(__file__).parent / "schema.json"
-    
-    try:
-        with open(schema_path, 'r') as f:
-            _schema_cache = json.load(f)
-        logger.info("Schema loaded successfully")
-        return _schema_cache
-    except Exception as e:
-        logger.warning(f"Failed to load schema from {schema_path}: {e}")
-        # Return minimal default schema
-        _schema_cache = {
-            "features": [
-                {
-                    "name": "radius_mean",
-                    "label": "Radius (mean)",
-                    "type": "number",
-                    "placeholder": "e.g., 14.1",
-                    "min": 0,
-                    "max": 50,
-                    "step": 0.1,
-                    "required": True
-                }
-            ]
-        }
-        return _schema_cache
+    return get_bundle(version).schema
+
+
+def get_validator(version: Optional[str] = None) -> SchemaValidator:
+    """The payload validator compiled from the active (or pinned) model's schema."""
+    return get_bundle(version).validator
+
+
+def get_prediction_cache() -> PredictionCache:
+    """
+    The active bundle's prediction cache, configured from its runtime config.
+    PREDICTION_CACHE_SIZE=0 disables caching. A new bundle starts with an
+    empty cache, so swapping model or schema drops cached predictions.
+    """
+    return get_bundle().cache
 
 
 def get_version() -> str:
     """
-    Get the model version from version.txt file.
-    Returns 'dummy-1.0' if file is not found.
+    The active model version.
+    Returns 'dummy-1.0' if version.txt is not found.
     """
-    version_path = Path(__file__).parent / "model" / "version.txt"
-    
-    try:
-        with open(version_path, 'r') as f:
-            version = f.read().strip()
-        return version
-    except Exception as e:
-        logger.warning(f"Failed to load version from {version_path}: {e}")
-        return "dummy-1.0"
+    return get_bundle().version
+
+
+def get_runtime_config() -> RuntimeConfig:
+    """
+    The active bundle's immutable runtime config snapshot.
+    Environment flags are read once per bundle, not on every prediction.
+    """
+    return get_bundle().config
 
 
 def predict_dummy(input_dict: Dict[str, float]) -> Tuple[str, float, List[Dict[str, float]]]:
@@ -143,55 +177,293 @@ def predict_dummy(input_dict: Dict[str, float]) -> Tuple[str, float, List[Dict[s
     return prediction_label, float(probability_malignant), contributions[:5]
 
 
-def predict(input_dict: Dict[str, float]) -> Tuple[str, float, List[Dict[str, float]], str]:
+def _score_matrix(model, X: np.ndarray, config: RuntimeConfig) -> List[float]:
     """
-    Make a prediction using the loaded model or dummy mode.
-    Returns: (prediction_label, probability_malignant, top_contributions, model_version)
+    Malignant probability of every row of an (N, n_features) schema-ordered matrix.
     """
-    dummy_mode = os.getenv('DUMMY_MODE', 'True').lower() == 'true'
-    model = load_model()
+    if isinstance(model, CompiledLinearModel):
+        probas = model.predict_proba(X)
+    else:
+        probas = model.predict_proba(
+            pd.DataFrame(X, columns=list(config.feature_names))
+        )[:, 1]
+    return [float(p) for p in probas]
 
-    # If dummy OR model couldn't load, use dummy entirely
-    if dummy_mode or model is None:
-        logger.info("Using dummy mode for prediction")
-        label, prob, contributions = predict_dummy(input_dict)
-        return label, prob, contributions, "dummy-1.0"
 
-    # ---- (A) PREDICTION (do not fall back unless this part fails) ----
+def _init_pool_worker() -> None:
+    """
+    Runs once in each pool worker process, and in the fork server before it
+    forks them (inference.pool_preload), so workers usually find it warm.
+    """
+    global _pool, _pool_checked, _scheduler, _scheduler_checked
+
+    # Workers always score in-process; never re-dispatch to a pool or queue
+    _pool, _pool_checked = None, True
+    _scheduler, _scheduler_checked = None, True
+    get_bundle().warm()
+
+
+def _observe_drift(input_dicts: List[Dict[str, float]], version: Optional[str]) -> None:
+    try:
+        monitor = get_bundle(version).drift_monitor()
+    except ModelNotFoundError:
+        return
+    if monitor is None:
+        return
     try:
-        schema = get_schema()
-        feature_names = [f["name"] for f in schema["features"]]
+        monitor.observe(input_dicts)
+    except Exception as e:
+        logger.warning(f"Drift monitor update failed: {e}")
 
-        missing_features = set(feature_names) - set(input_dict.keys())
-        if missing_features:
-            raise ValueError(f"Missing required features: {missing_features}")
 
-        # Build 2D row in schema order
-        X = pd.DataFrame(
-            [{name: float(input_dict[name]) for name in feature_names}],
-            columns=feature_names,
+def get_drift_monitor(version: Optional[str] = None) -> Optional[DriftMonitor]:
+    """
+    Drift monitor of the active (or pinned) model, or None if drift monitoring
+    is unavailable.
+    """
+    return get_bundle(version).drift_monitor()
+
+
+def get_pool() -> Optional[ProcessPoolBackend]:
+    """
+    The process-pool scoring backend, or None if INFERENCE_POOL_SIZE is 0.
+    """
+    global _pool, _pool_checked
+
+    if not _pool_checked:
+        with _registry_lock:
+            if not _pool_checked:
+                _pool = ProcessPoolBackend.from_environ(
+                    _predict_batch_local,
+                    _init_pool_worker,
+                    preload=("inference.pool_preload",),
+                )
+                _pool_checked = True
+    return _pool
+
+
+def predict_batch(
+    input_dicts: List[Dict[str, float]],
+    version: Optional[str] = None,
+    validated: Optional[ValidatedBatch] = None,
+) -> List[Tuple[str, float, List[Dict[str, float]], str]]:
+    """
+    Make predictions for many records at once using the loaded model or dummy mode.
+    The records are scored with a single predict_proba call on an (N, n_features) frame,
+    in a pool worker process when INFERENCE_POOL_SIZE > 0 (falling back to
+    in-process scoring if the pool is unavailable).
+    Pass `version` to pin a registry version instead of the active one
+    (raises ModelNotFoundError if it does not exist). Pass the SchemaValidator
+    result the records came from as `validated` to score its matrix directly.
+    Returns one (prediction_label, probability_malignant, top_contributions,
+    model_version) tuple per input record, in input order.
+    """
+    if not input_dicts:
+        return []
+
+    # Track inputs here rather than in _predict_batch_local so pool workers don't
+    # split the window
+    _observe_drift(input_dicts, version)
+
+    pool = get_pool()
+    if pool is not None and len(input_dicts) >= pool.min_batch:
+        try:
+            return pool.run(input_dicts, version)
+        except PoolUnavailable as e:
+            logger.warning(
+                f"Inference pool unavailable; scoring in-process. Reason: {e}"
+            )
+    return _predict_batch_local(input_dicts, version, validated)
+
+
+def _predict_batch_local(
+    input_dicts: List[Dict[str, float]],
+    version: Optional[str] = None,
+    validated: Optional[ValidatedBatch] = None,
+) -> List[Tuple[str, float, List[Dict[str, float]], str]]:
+    """predict_batch in this process."""
+    if not input_dicts:
+        return []
+
+    # Resolve the bundle once so a concurrent swap cannot split a batch
+    bundle = get_bundle(version)
+    config = bundle.config
+    model = None if config.dummy_mode else bundle.scoring_model()
+
+    # If dummy OR model couldn't load, use dummy entirely
+    if config.dummy_mode or model is None:
+        logger.info(f"Using dummy mode for prediction (batch of {len(input_dicts)})")
+        telemetry.increment(
+            "inference_results_total",
+            "dummy_mode" if config.dummy_mode else "model_unavailable",
+            len(input_dicts),
         )
+        return [(*predict_dummy(d), "dummy-1.0") for d in input_dicts]
 
+    # ---- (A) PREDICTION (do not fall back unless this part fails) ----
+    try:
+        # Reuse the validated matrix unless the schema changed in between (model swap)
+        if validated is not None and validated.feature_names == config.feature_names:
+            X = validated.X
+        else:
+            X = bundle.validator.matrix(input_dicts)
 
-        proba = model.predict_proba(X)[0, 1]   # calibrated pipeline supports this
-        probability_malignant = float(proba)
-        threshold = float(os.getenv("PREDICTION_THRESHOLD", "0.50"))
-        prediction_label = "malignant" if probability_malignant >= threshold else "benign"
+        model_version = config.model_version
+
+        # Serve repeats from the cache; only score the misses
+        with telemetry.timed("inference.cache_lookup"):
+            cache = bundle.cache
+            keys = cache.keys_for(X, (config.threshold, config.explain_with_shap))
+            results: List[Optional[Tuple]] = [cache.get(key) for key in keys]
+            miss_indices = [i for i, result in enumerate(results) if result is None]
+            X_miss = X[miss_indices]
+
+        if miss_indices:
+            with telemetry.timed("inference.score"):
+                probabilities = _score_matrix(model, X_miss, config)
+        else:
+            probabilities = []
+        labels = [
+            "malignant" if p >= config.threshold else "benign" for p in probabilities
+        ]
 
     except Exception as e:
         logger.error(f"Prediction failed: {e}")
         # Only if prediction itself fails, fall back to dummy
-        label, prob, contributions = predict_dummy(input_dict)
-        return label, prob, contributions, "error-fallback-1.0"
+        telemetry.increment(
+            "inference_results_total", "error_fallback", len(input_dicts)
+        )
+        return [(*predict_dummy(d), "error-fallback-1.0") for d in input_dicts]
 
     # ---- (B) CONTRIBUTIONS (best-effort; never crash the whole endpoint) ----
+    if miss_indices:
+        try:
+            with telemetry.timed("inference.explain"):
+                contributions = bundle.explain(X_miss)
+        except Exception as e:
+            logger.warning(
+                "Contribution computation failed; returning empty "
+                f"contributions. Reason: {e}"
+            )
+            contributions = [[] for _ in miss_indices]  # safe default
+
+        for i, label, prob, contribs in zip(
+            miss_indices, labels, probabilities, contributions
+        ):
+            results[i] = (label, prob, contribs)
+            cache.put(keys[i], results[i])
+
+    logger.info(
+        f"Batch prediction made: {len(input_dicts)} records, "
+        f"{len(input_dicts) - len(miss_indices)} cached, {labels.count('malignant')} "
+        "newly scored malignant"
+    )
+    telemetry.increment("inference_results_total", "model", len(input_dicts))
+    return [
+        (label, prob, [dict(c) for c in contribs], model_version)
+        for label, prob, contribs in results
+    ]
+
+
+def get_scheduler() -> Optional[MicroBatcher]:
+    """
+    The process-wide micro-batching scheduler, or None if INFERENCE_BATCHING is off.
+    """
+    global _scheduler, _scheduler_checked
+
+    if not _scheduler_checked:
+        with _registry_lock:
+            if not _scheduler_checked:
+                _scheduler = MicroBatcher.from_environ(predict_batch)
+                _scheduler_checked = True
+    return _scheduler
+
+
+def predict(
+    input_dict: Dict[str, float],
+    version: Optional[str] = None,
+    validated: Optional[ValidatedBatch] = None,
+) -> Tuple[str, float, List[Dict[str, float]], str]:
+    """
+    Make a prediction using the loaded model or dummy mode.
+    With INFERENCE_BATCHING on, the record is coalesced with concurrent
+    requests into one micro-batch.
+    Returns: (prediction_label, probability_malignant, top_contributions, model_version)
+    """
+    with telemetry.timed("inference.predict"):
+        scheduler = get_scheduler()
+        if scheduler is not None:
+            return scheduler.submit(input_dict, version).result()
+        return predict_batch([input_dict], version, validated)[0]
+
+
+async def predict_async(
+    input_dict: Dict[str, float],
+    version: Optional[str] = None,
+    validated: Optional[ValidatedBatch] = None,
+) -> Tuple[str, float, List[Dict[str, float]], str]:
+    """
+    Async counterpart of predict() for ASGI views. Awaits the micro-batch
+    result without blocking the event loop.
+    """
+    scheduler = get_scheduler()
+    if scheduler is not None:
+        return await asyncio.wrap_future(scheduler.submit(input_dict, version))
+    return (await asyncio.to_thread(predict_batch, [input_dict], version, validated))[0]
+
+
+def warmup(n_rows: int = 3) -> Dict[str, Any]:
+    """
+    Eagerly load the active model bundle (model, schema, version, explainers
+    and runtime config) and score a few probe rows so the first real request
+    does not pay any of those costs. Marks the process ready on success.
+    Returns a report of what was loaded and how long it took.
+    """
+    global _warmup_report
+
+    _warmup_report = {"status": "warming"}
     try:
-        use_shap = os.getenv('EXPLAIN_WITH_SHAP', 'False').lower() == 'true'
-        contributions = compute_contributions(model, X, feature_names, use_shap)
+        _warmup_report = get_bundle().warm(n_rows)
+        # Start pool workers once this process is known to load the model
+        pool = get_pool()
+        if pool is not None:
+            try:
+                pool.start()
+            except Exception as e:
+                logger.error(
+                    f"Inference pool failed to start; scoring in-process. Reason: {e}"
+                )
+            _warmup_report["pool"] = pool.stats()
+        _ready.set()
+        logger.info(f"Inference warmup complete in {_warmup_report['warmup_ms']} ms")
     except Exception as e:
-        logger.warning(f"Contribution computation failed; returning empty contributions. Reason: {e}")
-        contributions = []  # safe default
+        _warmup_report = {"status": "failed", "error": str(e)}
+        logger.error(f"Inference warmup failed: {e}")
+    return _warmup_report
+
+
+def mark_ready_lazily() -> None:
+    """
+    With EAGER_WARMUP=False nothing warms this process up front, and no
+    request would arrive to do it while /api/ready/ says 503. Report ready
+    now; the first request loads the model.
+    """
+    global _warmup_report
+
+    _warmup_report = {"status": "lazy"}
+    _ready.set()
+
+
+def is_ready() -> bool:
+    """
+    True once warmup() has completed successfully (or was skipped) in this process.
+    """
+    return _ready.is_set()
+
 
-    model_version = get_version()
-    logger.info(f"Prediction made: {prediction_label} (prob={probability_malignant:.3f})")
-    return prediction_label, probability_malignant, contributions, model_version
\ No newline at end of file
+def get_warmup_report() -> Dict[str, Any]:
+    """The most recent warmup report for this process, plus the active version."""
+    report = dict(_warmup_report)
+    if _ready.is_set():
+        report["active_version"] = get_version()
+    return report
@@ -0,0 +1,602 @@
+"""
+Versioned model registry with atomic hot-swap of fully loaded bundles.
+
+Registry layout (MODEL_REGISTRY_DIR):
+
+    registry/
+      ACTIVE                      # name of the active version
+      wdbc-calibrated-1.0/
+        model_pipeline.pkl        # and/or model_arrays.npz + manifest.json
+        schema.json               # optional; defaults to inference/schema.json
+        background.npy            # optional SHAP background
+        reference_histograms.json # optional training histograms for drift monitoring
+      wdbc-calibrated-1.1/
+        ...
+
+Without a registry directory the single model in inference/model/ is served,
+exactly as before.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .cache import PredictionCache
+from .compiled import CompiledLinearModel, load_artifact, probe_matrix, try_compile
+from .config import RuntimeConfig
+from .drift import REFERENCE_FILENAME, DriftMonitor
+from .explainer import (
+    ExplanationPlan,
+    build_explanation_plan,
+    build_shap_explainer,
+    compute_contributions_batch,
+)
+from .validation import SchemaValidator
+
+logger = logging.getLogger(__name__)
+
+POINTER_FILENAME = "ACTIVE"
+
+# Longest wait before retrying a version that failed to load
+MAX_RETRY_SECONDS = 600.0
+
+# Used when schema.json cannot be read
+DEFAULT_SCHEMA = {
+    "features": [
+        {
+            "name": "radius_mean",
+            "label": "Radius (mean)",
+            "type": "number",
+            "placeholder": "e.g., 14.1",
+            "min": 0,
+            "max": 50,
+            "step": 0.1,
+            "required": True,
+        }
+    ]
+}
+
+
+class ModelNotFoundError(LookupError):
+    """Raised when a requested model version is not in the registry."""
+
+
+def is_version_name(name: str) -> bool:
+    """
+    Whether `name` can name a registry version: a plain directory name, never
+    a path (versions come from the X-Model-Version request header).
+    """
+    return (
+        bool(name) and "/" not in name and "\\" not in name and not name.startswith(".")
+    )
+
+
+def load_schema(schema_path: Path) -> Dict:
+    """
+    Load the feature schema from JSON file.
+    Returns a default schema if file is not found.
+    """
+    try:
+        with open(schema_path, "r") as f:
+            schema = json.load(f)
+        logger.info(f"Schema loaded successfully from {schema_path}")
+        return schema
+    except Exception as e:
+        logger.warning(f"Failed to load schema from {schema_path}: {e}")
+        return json.loads(json.dumps(DEFAULT_SCHEMA))
+
+
+class ModelBundle:
+    """
+    Everything needed to serve one model version: schema, payload validator,
+    runtime config, pickled pipeline (loaded lazily, only if needed), compiled
+    arrays, explanation plan, SHAP explainer and a private prediction cache.
+    A bundle is fully loaded and warmed before it is made active.
+    """
+
+    def __init__(self, version: str, model_dir: Path, schema_path: Path):
+        self.version = version
+        self.model_dir = Path(model_dir)
+        self.schema = load_schema(schema_path)
+        self.feature_names = [f["name"] for f in self.schema["features"]]
+        self.config = RuntimeConfig.from_environ(version, self.schema)
+        self.validator = SchemaValidator.from_schema(
+            self.schema, enforce_bounds=self.config.enforce_schema_bounds
+        )
+        self.cache = PredictionCache(
+            max_size=self.config.cache_size,
+            ttl_seconds=self.config.cache_ttl_seconds,
+            precision=self.config.cache_precision,
+        )
+        self._lock = threading.RLock()
+        self._model: Any = None
+        self._model_checked = False
+        self._compiled: Optional[CompiledLinearModel] = None
+        self._compiled_checked = False
+        self._plan: Optional[ExplanationPlan] = None
+        self._shap: Any = None
+        self._shap_checked = False
+        self._drift: Optional[DriftMonitor] = None
+        self._drift_checked = False
+
+    @classmethod
+    def from_directory(
+        cls, model_dir: Path, fallback_schema_path: Path, version: Optional[str] = None
+    ) -> "ModelBundle":
+        """
+        Build a bundle for a model directory. The version is `version` if given,
+        else the contents of version.txt, else 'dummy-1.0'.
+        """
+        model_dir = Path(model_dir)
+        if version is None:
+            version_path = model_dir / "version.txt"
+            try:
+                version = version_path.read_text().strip()
+            except Exception as e:
+                logger.warning(f"Failed to load version from {version_path}: {e}")
+                version = "dummy-1.0"
+        schema_path = model_dir / "schema.json"
+        if not schema_path.exists():
+            schema_path = fallback_schema_path
+        return cls(version, model_dir, schema_path)
+
+    def load_model(self):
+        """
+        Load the trained model pipeline (memoized).
+        Returns None if model files are not available.
+        """
+        with self._lock:
+            if self._model_checked:
+                return self._model
+
+            model_path = self.model_dir / "model_pipeline.pkl"
+            self._model_checked = True
+            if not model_path.exists():
+                logger.info(f"Model file not found at {model_path}.")
+                return None
+
+            try:
+                import pickle
+
+                with open(model_path, "rb") as f:
+                    obj = pickle.load(f)
+
+                if isinstance(obj, dict):
+                    pipeline = obj.get("pipeline")
+                    if pipeline is None:
+                        raise RuntimeError(
+                            "model_pipeline.pkl did not contain 'pipeline'"
+                        )
+                    self._model = pipeline
+                else:
+                    self._model = obj
+
+                logger.info(f"Model {self.version} loaded successfully")
+            except Exception as e:
+                logger.error(f"Failed to load model {self.version}: {e}")
+            return self._model
+
+    def load_compiled_artifact(self) -> Optional[CompiledLinearModel]:
+        """
+        Load the compact non-pickle artifact (model_arrays.npz + manifest.json)
+        written by ml/train_model.py. This does not import sklearn.
+        Returns None if the artifact is missing, corrupt, or does not match
+        this bundle's schema and version.
+        """
+        if not (self.model_dir / "manifest.json").exists():
+            return None
+
+        try:
+            compiled, manifest = load_artifact(self.model_dir)
+            if compiled.feature_names != self.feature_names:
+                raise ValueError("artifact feature order does not match schema.json")
+            if manifest["version"] != self.version:
+                raise ValueError(
+                    f"artifact version {manifest['version']} does not "
+                    f"match {self.version}"
+                )
+            logger.info(
+                f"Compiled artifact loaded ({manifest['version']}, "
+                f"{compiled.n_folds} fold(s))"
+            )
+            return compiled
+        except Exception as e:
+            logger.warning(f"Ignoring compiled artifact in {self.model_dir}: {e}")
+            return None
+
+    def compiled_model(self) -> Optional[CompiledLinearModel]:
+        """
+        The model in compiled NumPy form (memoized).
+        Prefers the non-pickle artifact; otherwise compiles the unpickled pipeline.
+        Returns None when compilation is disabled, no model is available, or the
+        estimator cannot be compiled; callers then fall back to sklearn.
+        """
+        with self._lock:
+            if self._compiled_checked:
+                return self._compiled
+
+            if self.config.compiled_inference:
+                compiled = self.load_compiled_artifact()
+                if compiled is None:
+                    model = self.load_model()
+                    if model is not None:
+                        compiled = try_compile(model, self.schema)
+                self._compiled = compiled
+
+            self._compiled_checked = True
+            return self._compiled
+
+    def scoring_model(self):
+        """
+        The object predictions are computed from: the compiled model when
+        available (no pickle load needed), else the sklearn pipeline.
+        None if neither loads.
+        """
+        return self.compiled_model() or self.load_model()
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        Malignant probability of every row of a schema-ordered (N, n_features)
+        matrix. Ignores DUMMY_MODE, for offline scoring.
+        Raises RuntimeError if no model can be loaded.
+        """
+        model = self.scoring_model()
+        if model is None:
+            raise RuntimeError(f"Model {self.version} failed to load")
+        if isinstance(model, CompiledLinearModel):
+            return model.predict_proba(X)
+        import pandas as pd
+
+        return model.predict_proba(pd.DataFrame(X, columns=self.feature_names))[:, 1]
+
+    def explain(self, X: np.ndarray) -> List[List[Dict[str, float]]]:
+        """
+        Top contributions of every row of a schema-ordered (N, n_features) matrix,
+        with SHAP when EXPLAIN_WITH_SHAP is on, else the explanation plan.
+        Never raises; rows get [] if explanation fails.
+        """
+        shap_explainer = (
+            self.shap_explainer() if self.config.explain_with_shap else None
+        )
+        return compute_contributions_batch(
+            self.scoring_model(),
+            X,
+            self.feature_names,
+            shap_explainer is not None,
+            plan=self.explanation_plan(),
+            shap_explainer=shap_explainer,
+        )
+
+    def explanation_plan(self) -> Optional[ExplanationPlan]:
+        """
+        Build the explanation plan for this model (memoized).
+        Returns None if no model is available.
+        """
+        with self._lock:
+            if self._plan is not None:
+                return self._plan
+
+            compiled = self.compiled_model()
+            model = self.load_model() if compiled is None else None
+            if compiled is None and model is None:
+                return None
+
+            self._plan = build_explanation_plan(model, self.feature_names, compiled)
+            logger.info(f"Explanation plan built ({self._plan.kind})")
+            return self._plan
+
+    def load_background(self) -> Optional[np.ndarray]:
+        """
+        Load the stored SHAP background sample (k-means centroids of the training
+        features, written by ml/train_model.py). Returns None if unavailable.
+        """
+        background_path = self.model_dir / "background.npy"
+        n_features = len(self.feature_names)
+
+        try:
+            background = np.load(background_path)
+            if background.ndim != 2 or background.shape[1] != n_features:
+                raise ValueError(
+                    f"expected shape (k, {n_features}), got {background.shape}"
+                )
+            return background
+        except Exception as e:
+            logger.warning(
+                f"Failed to load SHAP background from {background_path}: {e}"
+            )
+            return None
+
+    def shap_explainer(self) -> Optional[Any]:
+        """
+        Build the SHAP explainer for this model (memoized).
+        Falls back to the compiled scaler means as a one-row background when no
+        background sample is stored. Returns None if shap or the model is unavailable.
+        """
+        with self._lock:
+            if self._shap_checked:
+                return self._shap
+
+            plan = self.explanation_plan()
+            if plan is None:
+                return None
+            # The closed-form linear explainer only needs the plan, not the pipeline
+            model = self.load_model() if plan.kind != "linear" else None
+
+            background = self.load_background()
+            compiled = self.compiled_model()
+            if background is None and compiled is not None:
+                background = compiled.means.mean(axis=0, keepdims=True)
+
+            self._shap_checked = True
+            if background is None:
+                return None
+
+            try:
+                self._shap = build_shap_explainer(
+                    model, background, self.feature_names, plan
+                )
+                logger.info(
+                    f"SHAP explainer built ({type(self._shap).__name__}, "
+                    f"{len(background)} background rows)"
+                )
+            except Exception as e:
+                logger.warning(
+                    "SHAP explainer unavailable; using the "
+                    f"explanation plan. Reason: {e}"
+                )
+            return self._shap
+
+    def drift_monitor(self) -> Optional[DriftMonitor]:
+        """
+        Rolling-window drift monitor against this model's training histograms
+        (memoized). Returns None if DRIFT_MONITORING is off or no reference is stored.
+        """
+        if self._drift_checked:
+            return self._drift
+        with self._lock:
+            if not self._drift_checked:
+                if self.config.drift_monitoring:
+                    self._drift = DriftMonitor.from_file(
+                        self.model_dir / REFERENCE_FILENAME,
+                        self.config.drift_window_size,
+                    )
+                self._drift_checked = True
+            return self._drift
+
+    def warm(self, n_rows: int = 3) -> Dict[str, Any]:
+        """
+        Load everything this bundle serves with and score a few probe rows so
+        the first real request does not pay any of those costs.
+        Raises if the model cannot be loaded outside dummy mode.
+        """
+        start = time.perf_counter()
+        config = self.config
+        self.drift_monitor()
+        if not config.dummy_mode:
+            model = self.scoring_model()
+            if model is None:
+                raise RuntimeError(
+                    f"Model {self.version} failed to load and DUMMY_MODE is off"
+                )
+            plan = self.explanation_plan()
+            shap_explainer = self.shap_explainer() if config.explain_with_shap else None
+            X = probe_matrix(self.schema, n_rows)
+            self.predict_proba(X)
+            plan.contributions(X)
+            if shap_explainer is not None:
+                shap_explainer(X)
+
+        return {
+            "status": "ready",
+            "model_version": "dummy-1.0" if config.dummy_mode else self.version,
+            "dummy_mode": config.dummy_mode,
+            "compiled": (
+                False if config.dummy_mode else self.compiled_model() is not None
+            ),
+            "warmup_ms": round((time.perf_counter() - start) * 1000, 1),
+        }
+
+
+class ModelRegistry:
+    """
+    Serves the active ModelBundle and swaps in a new one when the ACTIVE
+    pointer changes. The new bundle is loaded and warmed on a background
+    thread while the old one keeps serving; the swap is a single reference
+    assignment. Other versions can be pinned per request and are kept in a
+    small LRU of loaded bundles. A version that fails to load is retried
+    after retry_seconds, doubling on each further failure.
+    """
+
+    def __init__(
+        self,
+        root: Optional[Path],
+        legacy_model_dir: Path,
+        schema_path: Path,
+        poll_seconds: float = 5.0,
+        max_pinned: int = 2,
+        retry_seconds: float = 30.0,
+    ):
+        self.root = Path(root) if root else None
+        self.legacy_model_dir = Path(legacy_model_dir)
+        self.schema_path = Path(schema_path)
+        self.poll_seconds = poll_seconds
+        self.max_pinned = max_pinned
+        self.retry_seconds = retry_seconds
+        self._lock = threading.RLock()
+        self._active: Optional[ModelBundle] = None
+        self._bundles: "OrderedDict[str, ModelBundle]" = OrderedDict()
+        # One lock per version being built for a pinned request
+        self._building: Dict[str, threading.Lock] = {}
+        self._next_poll = 0.0
+        self._loading: Optional[str] = None
+        self._failed: Optional[str] = None
+        self._failures = 0
+        self._retry_at = 0.0
+
+    @classmethod
+    def from_environ(cls, legacy_model_dir: Path, schema_path: Path) -> "ModelRegistry":
+        return cls(
+            os.getenv("MODEL_REGISTRY_DIR") or None,
+            legacy_model_dir,
+            schema_path,
+            poll_seconds=float(os.getenv("MODEL_REGISTRY_POLL_SECONDS", "5")),
+            max_pinned=int(os.getenv("MODEL_REGISTRY_MAX_PINNED", "2")),
+            retry_seconds=float(os.getenv("MODEL_REGISTRY_RETRY_SECONDS", "30")),
+        )
+
+    def versions(self) -> List[str]:
+        """Versions available in the registry directory."""
+        if self.root is None:
+            return [self.active().version]
+        return sorted(
+            p.name
+            for p in self.root.iterdir()
+            if p.is_dir() and is_version_name(p.name)
+        )
+
+    def _check_version(self, version: str) -> None:
+        if not is_version_name(version) or version not in self.versions():
+            raise ModelNotFoundError(f"Unknown model version: {version}")
+
+    def read_pointer(self) -> Optional[str]:
+        if self.root is None:
+            return None
+        try:
+            return (self.root / POINTER_FILENAME).read_text().strip() or None
+        except OSError:
+            return None
+
+    def activate(self, version: str) -> None:
+        """
+        Atomically point ACTIVE at `version`; workers pick it up on their next poll.
+        """
+        if self.root is None:
+            raise RuntimeError("MODEL_REGISTRY_DIR is not configured")
+        self._check_version(version)
+        tmp_path = self.root / f".{POINTER_FILENAME}.{os.getpid()}.tmp"
+        tmp_path.write_text(version + "\n")
+        os.replace(tmp_path, self.root / POINTER_FILENAME)
+
+    def _build(self, version: Optional[str]) -> ModelBundle:
+        if self.root is None or version is None:
+            return ModelBundle.from_directory(self.legacy_model_dir, self.schema_path)
+        self._check_version(version)
+        return ModelBundle.from_directory(
+            self.root / version, self.schema_path, version=version
+        )
+
+    def _remember(self, bundle: ModelBundle) -> None:
+        with self._lock:
+            self._bundles[bundle.version] = bundle
+            self._bundles.move_to_end(bundle.version)
+            active_version = self._active.version if self._active else None
+            while len(self._bundles) > self.max_pinned + 1:
+                oldest = next(v for v in self._bundles if v != active_version)
+                del self._bundles[oldest]
+
+    def active(self) -> ModelBundle:
+        """The bundle new requests should be served by."""
+        if self._active is None:
+            with self._lock:
+                if self._active is None:
+                    pointer = self.read_pointer()
+                    if self.root is not None and pointer is None:
+                        logger.warning(
+                            f"No {POINTER_FILENAME} pointer in {self.root}; serving "
+                            f"{self.legacy_model_dir}"
+                        )
+                    self._active = self._build(pointer)
+                    self._remember(self._active)
+                    self._next_poll = time.monotonic() + self.poll_seconds
+        elif self.root is not None and time.monotonic() >= self._next_poll:
+            self._next_poll = time.monotonic() + self.poll_seconds
+            self._check_pointer()
+        return self._active
+
+    def get(self, version: Optional[str] = None) -> ModelBundle:
+        """
+        The bundle for a pinned version, loading and warming it on first use,
+        or the active bundle if version is None.
+        Raises ModelNotFoundError for unknown versions.
+        """
+        active = self.active()
+        if version is None or version == active.version:
+            return active
+        if self.root is None:
+            raise ModelNotFoundError(f"Unknown model version: {version}")
+
+        with self._lock:
+            bundle = self._bundles.get(version)
+            if bundle is not None:
+                self._remember(bundle)
+                return bundle
+        self._check_version(version)
+
+        # Build and warm outside the registry lock so one cold pin doesn't stall
+        # every request; concurrent requests for the same version wait for one build
+        with self._lock:
+            building = self._building.setdefault(version, threading.Lock())
+        with building:
+            try:
+                bundle = self._bundles.get(version)
+                if bundle is None:
+                    bundle = self._build(version)
+                    bundle.warm()
+                self._remember(bundle)
+            finally:
+                with self._lock:
+                    self._building.pop(version, None)
+        return bundle
+
+    def _check_pointer(self) -> None:
+        pointer = self.read_pointer()
+        with self._lock:
+            if pointer is None or pointer in (self._active.version, self._loading):
+                return
+            if pointer == self._failed and time.monotonic() < self._retry_at:
+                return
+            self._loading = pointer
+        threading.Thread(
+            target=self._load_and_swap,
+            args=(pointer,),
+            name=f"model-swap-{pointer}",
+            daemon=True,
+        ).start()
+
+    def _load_and_swap(self, version: str) -> None:
+        try:
+            bundle = self._bundles.get(version) or self._build(version)
+            report = bundle.warm()
+            with self._lock:
+                previous = self._active
+                self._active = bundle
+                self._remember(bundle)
+                self._failed = None
+                self._failures = 0
+            logger.info(
+                f"Active model swapped {previous.version} -> {version} "
+                f"({report['warmup_ms']} ms warmup)"
+            )
+        except Exception as e:
+            # The pointer may have been flipped before the copy finished:
+            # retry with backoff
+            with self._lock:
+                self._failures = self._failures + 1 if version == self._failed else 1
+                self._failed = version
+                delay = min(
+                    self.retry_seconds * 2 ** (self._failures - 1), MAX_RETRY_SECONDS
+                )
+                self._retry_at = time.monotonic() + delay
+            logger.error(
+                f"Failed to activate model {version}; keeping {self._active.version}, "
+                f"retrying in {delay:g} s: {e}"
+            )
+        finally:
+            self._loading = None
@@ -0,0 +1,159 @@
+"""
+Dynamic micro-batching for concurrent single-record predictions.
+
+Callers enqueue one record each; a worker thread coalesces whatever is
+waiting (up to max_batch_size, or until max_wait_ms after the first record
+arrived) into a single predict_batch call and hands each caller its result.
+Usable from sync code via Future.result() and from async code via
+asyncio.wrap_future().
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the batch-size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class MicroBatcher:
+    """
+    Queue + single worker thread that scores records in micro-batches.
+    `predict_fn(records, version)` must return one result per record.
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[List[Dict[str, float]], Optional[str]], List[Any]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 2.0,
+    ):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue: (
+            "queue.Queue[Tuple[Dict[str, float], Optional[str], Future, float]]"
+        ) = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._records = 0
+        self._max_queue_depth = 0
+        self._wait_seconds_total = 0.0
+        self._batch_size_counts = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+
+    @classmethod
+    def from_environ(cls, predict_fn) -> Optional["MicroBatcher"]:
+        """
+        Build a batcher from INFERENCE_BATCHING / BATCH_MAX_SIZE / BATCH_MAX_WAIT_MS, or
+        None if disabled.
+        """
+        if os.getenv("INFERENCE_BATCHING", "False").lower() != "true":
+            return None
+        return cls(
+            predict_fn,
+            max_batch_size=int(os.getenv("BATCH_MAX_SIZE", "32")),
+            max_wait_ms=float(os.getenv("BATCH_MAX_WAIT_MS", "2")),
+        )
+
+    def _ensure_started(self) -> None:
+        # Started lazily so each forked worker process gets its own thread
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name="inference-batcher", daemon=True
+                )
+                self._worker.start()
+
+    def submit(self, record: Dict[str, float], version: Optional[str] = None) -> Future:
+        """Enqueue one record; the returned future resolves to its prediction."""
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((record, version, future, time.monotonic()))
+        depth = self._queue.qsize()
+        if depth > self._max_queue_depth:
+            self._max_queue_depth = depth
+        return future
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            started = time.monotonic()
+
+            # A batch may mix pinned versions; score each version's records together
+            groups: Dict[Optional[str], list] = {}
+            for item in batch:
+                groups.setdefault(item[1], []).append(item)
+
+            for version, items in groups.items():
+                try:
+                    results = self.predict_fn(
+                        [record for record, _, _, _ in items], version
+                    )
+                    for (_, _, future, _), result in zip(items, results):
+                        future.set_result(result)
+                except Exception as e:
+                    logger.error(f"Micro-batch of {len(items)} failed: {e}")
+                    for _, _, future, _ in items:
+                        future.set_exception(e)
+
+            self._record_batch(
+                len(batch), sum(started - enqueued for _, _, _, enqueued in batch)
+            )
+
+    def _record_batch(self, size: int, wait_seconds: float) -> None:
+        bucket = next(
+            (i for i, bound in enumerate(BATCH_SIZE_BUCKETS) if size <= bound),
+            len(BATCH_SIZE_BUCKETS),
+        )
+        with self._stats_lock:
+            self._batches += 1
+            self._records += size
+            self._wait_seconds_total += wait_seconds
+            self._batch_size_counts[bucket] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            labels = [f"<={bound}" for bound in BATCH_SIZE_BUCKETS] + [
+                f">{BATCH_SIZE_BUCKETS[-1]}"
+            ]
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_ms,
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self._max_queue_depth,
+                "batches": self._batches,
+                "records": self._records,
+                "mean_batch_size": (
+                    self._records / self._batches if self._batches else 0.0
+                ),
+                "mean_queue_wait_ms": (
+                    1000 * self._wait_seconds_total / self._records
+                    if self._records
+                    else 0.0
+                ),
+                "batch_size_histogram": dict(zip(labels, self._batch_size_counts)),
+            }
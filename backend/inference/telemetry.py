@@ -0,0 +1,218 @@
+"""
+Per-stage latency histograms and result counters, exported in Prometheus
+text format.
+
+Each process records into its own in-memory registry (a bisect and a few
+increments per observation). With METRICS_MULTIPROC_DIR set, every process
+also writes a snapshot there every METRICS_FLUSH_SECONDS, and the /metrics
+view sums all snapshots so a scrape of any worker covers the whole
+deployment. Point the directory at a fresh (e.g. tmpfs) path on each deploy.
+"""
+
+import atexit
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "detector"
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implicit
+LATENCY_BUCKETS = (
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+COUNTER_HELP = {
+    "inference_results_total": "Predictions by how they were produced "
+    "(model, dummy_mode, model_unavailable, error_fallback)",
+}
+
+
+class Telemetry:
+    """Per-process stage histograms and labelled counters."""
+
+    def __init__(
+        self, multiproc_dir: Optional[Path] = None, flush_seconds: float = 5.0
+    ):
+        self.multiproc_dir = Path(multiproc_dir) if multiproc_dir else None
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        # stage -> [bucket counts (len(LATENCY_BUCKETS) + 1), sum of seconds]
+        self._histograms: Dict[str, List] = {}
+        # (name, label value) -> count
+        self._counters: Dict[Tuple[str, str], int] = {}
+        self._flusher: Optional[threading.Thread] = None
+        self._flusher_pid: Optional[int] = None
+        self._snapshot_name: Optional[str] = None
+
+    @classmethod
+    def from_environ(cls) -> "Telemetry":
+        return cls(
+            multiproc_dir=os.getenv("METRICS_MULTIPROC_DIR") or None,
+            flush_seconds=float(os.getenv("METRICS_FLUSH_SECONDS", "5")),
+        )
+
+    def observe(self, stage: str, seconds: float) -> None:
+        self._ensure_flusher()
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = [
+                    [0] * (len(LATENCY_BUCKETS) + 1),
+                    0.0,
+                ]
+            histogram[0][bucket] += 1
+            histogram[1] += seconds
+
+    @contextmanager
+    def timed(self, stage: str) -> Iterator[None]:
+        """Record the duration of the block under `stage` (also when it raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def increment(self, name: str, label: str, amount: int = 1) -> None:
+        self._ensure_flusher()
+        with self._lock:
+            self._counters[(name, label)] = (
+                self._counters.get((name, label), 0) + amount
+            )
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "histograms": {
+                    stage: [list(counts), total]
+                    for stage, (counts, total) in self._histograms.items()
+                },
+                "counters": [
+                    [name, label, value]
+                    for (name, label), value in self._counters.items()
+                ],
+            }
+
+    # ---- multi-process aggregation ----
+
+    def _ensure_flusher(self) -> None:
+        # One flusher per process; a forked child starts its own under its own pid
+        if self.multiproc_dir is None or self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+            self._snapshot_name = f"{os.getpid()}-{time.time_ns()}.json"
+            # Counts inherited from the parent belong to the parent's snapshot
+            self._histograms.clear()
+            self._counters.clear()
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name="metrics-flusher", daemon=True
+            )
+            self._flusher.start()
+            atexit.register(self.flush)
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(self.flush_seconds)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"Failed to write metrics snapshot: {e}")
+
+    def flush(self) -> None:
+        """Write this process's snapshot to the multiproc directory."""
+        if self.multiproc_dir is None or self._snapshot_name is None:
+            return
+        self.multiproc_dir.mkdir(parents=True, exist_ok=True)
+        path = self.multiproc_dir / self._snapshot_name
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.snapshot()))
+        os.replace(tmp_path, path)
+
+    def _collect(self) -> Dict:
+        """This process's snapshot, or the sum of every process's when aggregating."""
+        if self.multiproc_dir is None:
+            return self.snapshot()
+        self._ensure_flusher()
+        self.flush()
+        merged = {"histograms": {}, "counters": {}}
+        for path in self.multiproc_dir.glob("*.json"):
+            try:
+                data = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            for stage, (counts, total) in data["histograms"].items():
+                current = merged["histograms"].setdefault(
+                    stage, [[0] * len(counts), 0.0]
+                )
+                current[0] = [a + b for a, b in zip(current[0], counts)]
+                current[1] += total
+            for name, label, value in data["counters"]:
+                merged["counters"][(name, label)] = (
+                    merged["counters"].get((name, label), 0) + value
+                )
+        merged["counters"] = [
+            [name, label, value] for (name, label), value in merged["counters"].items()
+        ]
+        return merged
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format (0.0.4)."""
+        data = self._collect()
+        name = f"{METRIC_PREFIX}_stage_duration_seconds"
+        lines = [
+            f"# HELP {name} Time spent in each request/inference stage.",
+            f"# TYPE {name} histogram",
+        ]
+        for stage in sorted(data["histograms"]):
+            counts, total = data["histograms"][stage]
+            cumulative = 0
+            for bound, count in zip(list(LATENCY_BUCKETS) + ["+Inf"], counts):
+                cumulative += count
+                lines.append(
+                    f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}'
+                )
+            lines.append(f'{name}_sum{{stage="{stage}"}} {total}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {cumulative}')
+
+        by_name: Dict[str, List] = {}
+        for counter_name, label, value in data["counters"]:
+            by_name.setdefault(counter_name, []).append((label, value))
+        for counter_name in sorted(by_name):
+            full_name = f"{METRIC_PREFIX}_{counter_name}"
+            lines.append(
+                f"# HELP {full_name} {COUNTER_HELP.get(counter_name, counter_name)}"
+            )
+            lines.append(f"# TYPE {full_name} counter")
+            for label, value in sorted(by_name[counter_name]):
+                lines.append(f'{full_name}{{kind="{label}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+telemetry = Telemetry.from_environ()
@@ -0,0 +1,82 @@
+"""
+LRU prediction cache: quantized keys, TTL, eviction, and its use by predict_batch.
+"""
+
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from api.tests.utils import model_mode, valid_record
+from inference import cache as cache_module, predictor
+from inference.cache import PredictionCache
+
+
+class PredictionCacheTests(SimpleTestCase):
+    def test_keys_are_quantized(self):
+        cache = PredictionCache(precision=3)
+        keys = cache.keys_for(
+            np.array([[1.0001, -0.0], [1.0004, 0.0], [1.002, 0.0]]), ("ctx",)
+        )
+        self.assertEqual(keys[0], keys[1])
+        self.assertNotEqual(keys[1], keys[2])
+        self.assertNotEqual(
+            keys[0], cache.keys_for(np.array([[1.0, 0.0]]), ("other",))[0]
+        )
+
+    def test_lru_eviction(self):
+        cache = PredictionCache(max_size=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.get("a"), cache.get("c")), (1, 3))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_ttl(self):
+        cache = PredictionCache(ttl_seconds=10)
+        with mock.patch.object(cache_module.time, "monotonic", return_value=100.0):
+            cache.put("a", 1)
+        with mock.patch.object(cache_module.time, "monotonic", return_value=109.0):
+            self.assertEqual(cache.get("a"), 1)
+        with mock.patch.object(cache_module.time, "monotonic", return_value=111.0):
+            self.assertIsNone(cache.get("a"))
+        stats = cache.stats()
+        self.assertEqual(
+            (stats["hits"], stats["misses"], stats["expirations"], stats["size"]),
+            (1, 1, 1, 0),
+        )
+
+    def test_disabled(self):
+        cache = PredictionCache(max_size=0)
+        cache.put("a", 1)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["misses"], 0)
+
+
+class PredictBatchCacheTests(SimpleTestCase):
+    def test_repeats_are_served_from_the_cache(self):
+        records = [valid_record(radius_mean=10.0), valid_record(radius_mean=20.0)]
+        with model_mode(PREDICTION_CACHE_SIZE="16"):
+            bundle = predictor.get_bundle()
+            with mock.patch.object(
+                predictor, "_score_matrix", wraps=predictor._score_matrix
+            ) as score:
+                first = predictor.predict_batch(records)
+                again = predictor.predict_batch(
+                    [records[1], valid_record(radius_mean=20.0000001)]
+                )
+            stats = bundle.cache.stats()
+        self.assertEqual(score.call_count, 1)
+        self.assertEqual(again, [first[1], first[1]])
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 2))
+
+    def test_cached_results_are_copies(self):
+        with model_mode(PREDICTION_CACHE_SIZE="16"):
+            first = predictor.predict_batch([valid_record()])[0]
+            first[2][0]["contribution"] = "changed"
+            self.assertNotEqual(
+                predictor.predict_batch([valid_record()])[0][2][0]["contribution"],
+                "changed",
+            )
@@ -0,0 +1,157 @@
+"""
+Compiled NumPy scoring, the non-pickle artifact, and its export by ml/train_model.py.
+"""
+
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.ensemble import GradientBoostingClassifier
+
+from inference.compiled import (
+    ARRAYS_FILENAME,
+    MANIFEST_FILENAME,
+    CompiledLinearModel,
+    compile_model,
+    load_artifact,
+    probe_matrix,
+    save_artifact,
+    try_compile,
+)
+from inference.registry import ModelBundle, load_schema
+
+INFERENCE_DIR = Path(__file__).resolve().parent.parent
+MODEL_DIR = INFERENCE_DIR / "model"
+ML_DIR = INFERENCE_DIR.parent.parent / "ml"
+
+
+def load_pipeline():
+    with open(MODEL_DIR / "model_pipeline.pkl", "rb") as f:
+        return pickle.load(f)["pipeline"]
+
+
+class CompiledModelTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.schema = load_schema(INFERENCE_DIR / "schema.json")
+        cls.feature_names = [f["name"] for f in cls.schema["features"]]
+        cls.pipeline = load_pipeline()
+        cls.X = probe_matrix(cls.schema, n_rows=500)
+
+    def sklearn_proba(self, X):
+        return self.pipeline.predict_proba(pd.DataFrame(X, columns=self.feature_names))[
+            :, 1
+        ]
+
+    def test_matches_sklearn(self):
+        compiled = compile_model(self.pipeline, self.feature_names)
+        np.testing.assert_allclose(
+            compiled.predict_proba(self.X), self.sklearn_proba(self.X), atol=1e-9
+        )
+
+    def test_artifact_round_trip(self):
+        compiled = compile_model(self.pipeline, self.feature_names)
+        with tempfile.TemporaryDirectory() as tmp:
+            save_artifact(compiled, Path(tmp), "test-1.0")
+            loaded, manifest = load_artifact(Path(tmp))
+        self.assertEqual(manifest["version"], "test-1.0")
+        self.assertEqual(loaded.feature_names, self.feature_names)
+        np.testing.assert_array_equal(
+            loaded.predict_proba(self.X), compiled.predict_proba(self.X)
+        )
+
+    def test_non_linear_model_is_rejected(self):
+        rng = np.random.default_rng(0)
+        X = pd.DataFrame(
+            rng.normal(size=(60, len(self.feature_names))), columns=self.feature_names
+        )
+        model = CalibratedClassifierCV(GradientBoostingClassifier(n_estimators=5), cv=2)
+        model.fit(X, np.arange(60) % 2)
+        with self.assertRaises(ValueError):
+            compile_model(model, self.feature_names)
+        self.assertIsNone(try_compile(model, self.schema))
+
+
+class BundleCompilationTests(SimpleTestCase):
+    """The bundle compiles its model at load time and scores with it."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.model_dir = Path(tmp.name) / "model"
+        shutil.copytree(MODEL_DIR, self.model_dir)
+        self.X = probe_matrix(
+            load_schema(INFERENCE_DIR / "schema.json"), n_rows=200, seed=1
+        )
+
+    def bundle(self, compiled="True"):
+        with mock.patch.dict(os.environ, {"COMPILED_INFERENCE": compiled}):
+            return ModelBundle.from_directory(
+                self.model_dir, INFERENCE_DIR / "schema.json"
+            )
+
+    def test_scores_with_the_compiled_model(self):
+        compiled, plain = self.bundle(), self.bundle(compiled="False")
+        self.assertIsInstance(compiled.scoring_model(), CompiledLinearModel)
+        self.assertNotIsInstance(plain.scoring_model(), CompiledLinearModel)
+        np.testing.assert_allclose(
+            compiled.predict_proba(self.X), plain.predict_proba(self.X), atol=1e-9
+        )
+
+    def test_compiles_the_pipeline_without_an_artifact(self):
+        (self.model_dir / ARRAYS_FILENAME).unlink()
+        (self.model_dir / MANIFEST_FILENAME).unlink()
+        bundle = self.bundle()
+        self.assertIsInstance(bundle.scoring_model(), CompiledLinearModel)
+        np.testing.assert_allclose(
+            bundle.predict_proba(self.X),
+            self.bundle("False").predict_proba(self.X),
+            atol=1e-9,
+        )
+
+    def test_ignores_an_artifact_for_another_version(self):
+        (self.model_dir / "version.txt").write_text("other-2.0\n")
+        bundle = self.bundle()
+        self.assertIsNone(bundle.load_compiled_artifact())
+        self.assertIsInstance(bundle.scoring_model(), CompiledLinearModel)
+
+
+class ExportArtifactsTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        sys.path.insert(0, str(ML_DIR))
+        import train_model
+
+        cls.train_model = train_model
+
+    @classmethod
+    def tearDownClass(cls):
+        sys.path.remove(str(ML_DIR))
+        super().tearDownClass()
+
+    def test_stale_artifact_removed_when_model_does_not_compile(self):
+        schema = load_schema(INFERENCE_DIR / "schema.json")
+        feature_names = [f["name"] for f in schema["features"]]
+        X = pd.DataFrame(probe_matrix(schema, n_rows=60), columns=feature_names)
+        model = CalibratedClassifierCV(GradientBoostingClassifier(n_estimators=5), cv=2)
+        model.fit(X, np.arange(60) % 2)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            out = Path(tmp)
+            save_artifact(compile_model(load_pipeline(), feature_names), out, "old-1.0")
+            saved = self.train_model.export_artifacts(
+                model, X, X, feature_names, out, "new-1.0", 0, schema
+            )
+            self.assertFalse((out / ARRAYS_FILENAME).exists())
+            self.assertFalse((out / MANIFEST_FILENAME).exists())
+            self.assertIn(out / "model_pipeline.pkl", saved)
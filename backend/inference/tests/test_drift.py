@@ -0,0 +1,131 @@
+"""
+Input drift: reference histograms, the rolling window, PSI and binned KS.
+"""
+
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from api.tests.utils import model_mode, valid_record
+from inference import predictor
+from inference.drift import EPSILON, DriftMonitor, build_reference, save_reference
+
+NAMES = ["a", "b"]
+
+
+def records(X):
+    return [dict(zip(NAMES, row)) for row in X.tolist()]
+
+
+def reference_scores(reference, X):
+    """PSI and binned KS per feature, computed directly from the reference file."""
+    scores = {}
+    for j, name in enumerate(NAMES):
+        spec = reference["features"][name]
+        expected = np.asarray(spec["counts"], dtype=float) / sum(spec["counts"])
+        bins = np.searchsorted(spec["edges"], X[:, j], side="right")
+        actual = np.bincount(bins, minlength=len(expected)) / len(X)
+        psi = np.sum(
+            (actual - expected) * np.log((actual + EPSILON) / (expected + EPSILON))
+        )
+        ks = np.max(np.abs(np.cumsum(actual) - np.cumsum(expected)))
+        scores[name] = (psi, ks)
+    return scores
+
+
+class DriftMonitorTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        rng = np.random.default_rng(0)
+        cls.train = np.column_stack([rng.normal(10, 2, 5000), rng.integers(0, 3, 5000)])
+        cls.reference = build_reference(cls.train, NAMES, "v1")
+        cls.rng = rng
+
+    def test_reference_bins(self):
+        a, b = self.reference["features"]["a"], self.reference["features"]["b"]
+        self.assertEqual(len(a["counts"]), 20)
+        self.assertEqual(sum(a["counts"]), 5000)
+        # Duplicate quantile edges collapse for a three-valued feature
+        self.assertEqual(b["edges"], [0.0, 1.0, 2.0])
+
+    def test_scores_match_direct_computation(self):
+        monitor = DriftMonitor(self.reference, window_size=1000)
+        X = np.column_stack(
+            [self.rng.normal(11, 2, 1000), self.rng.integers(0, 3, 1000)]
+        )
+        monitor.observe(records(X))
+        scores = monitor.scores()
+        for name, (psi, ks) in reference_scores(self.reference, X).items():
+            self.assertAlmostEqual(scores["features"][name]["psi"], psi, places=12)
+            self.assertAlmostEqual(scores["features"][name]["ks"], ks, places=12)
+        self.assertEqual(scores["window_count"], 1000)
+
+    def test_stable_and_shifted_inputs(self):
+        stable = DriftMonitor(self.reference, window_size=2000)
+        stable.observe(
+            records(
+                np.column_stack(
+                    [self.rng.normal(10, 2, 2000), self.rng.integers(0, 3, 2000)]
+                )
+            )
+        )
+        self.assertEqual(stable.scores()["drifted_features"], [])
+        self.assertEqual(stable.scores()["features"]["a"]["status"], "stable")
+
+        shifted = DriftMonitor(self.reference, window_size=2000)
+        shifted.observe(
+            records(
+                np.column_stack(
+                    [self.rng.normal(14, 2, 2000), self.rng.integers(0, 3, 2000)]
+                )
+            )
+        )
+        scores = shifted.scores()
+        self.assertEqual(scores["drifted_features"], ["a"])
+        self.assertGreater(scores["features"]["a"]["ks"], 0.5)
+
+    def test_window_evicts_the_oldest_records(self):
+        old = np.column_stack([self.rng.normal(20, 1, 300), np.zeros(300)])
+        recent = np.column_stack(
+            [self.rng.normal(10, 2, 500), self.rng.integers(0, 3, 500)]
+        )
+        rolled = DriftMonitor(self.reference, window_size=500)
+        rolled.observe(records(old))
+        for start in range(0, 500, 70):
+            rolled.observe(records(recent[start : start + 70]))
+        fresh = DriftMonitor(self.reference, window_size=500)
+        fresh.observe(records(recent))
+        self.assertEqual(rolled.scores()["features"], fresh.scores()["features"])
+        self.assertEqual(rolled.scores()["observed"], 800)
+
+    def test_empty_window(self):
+        scores = DriftMonitor(self.reference).scores()
+        self.assertIsNone(scores["max_psi"])
+        self.assertIsNone(scores["features"]["a"]["status"])
+
+    def test_from_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = save_reference(self.reference, Path(tmp))
+            self.assertEqual(DriftMonitor.from_file(path).feature_names, NAMES)
+            path.write_text("{}")
+            self.assertIsNone(DriftMonitor.from_file(path))
+            self.assertIsNone(DriftMonitor.from_file(Path(tmp) / "missing.json"))
+
+
+class DriftEndpointTests(SimpleTestCase):
+    def test_reports_observed_predictions(self):
+        with model_mode(DRIFT_WINDOW_SIZE="50"):
+            predictor.predict_batch([valid_record()] * 3)
+            body = self.client.get("/api/metrics/drift/").json()
+        self.assertTrue(body["enabled"])
+        self.assertEqual((body["window_size"], body["window_count"]), (50, 3))
+        self.assertEqual(len(body["features"]), len(valid_record()))
+
+    def test_disabled(self):
+        with model_mode(DRIFT_MONITORING="False"):
+            self.assertEqual(
+                self.client.get("/api/metrics/drift/").json(), {"enabled": False}
+            )
@@ -0,0 +1,195 @@
+"""
+Explanation plans, vectorized top-k contributions and the cached SHAP explainer.
+"""
+
+import importlib.util
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.svm import SVC
+
+from inference import registry
+from inference.compiled import compile_model, probe_matrix
+from inference.explainer import (
+    TOP_K,
+    build_explanation_plan,
+    compute_contributions,
+    compute_contributions_batch,
+    top_contributions,
+)
+from inference.registry import ModelBundle, load_schema
+
+INFERENCE_DIR = Path(__file__).resolve().parent.parent
+MODEL_DIR = INFERENCE_DIR / "model"
+
+
+def reference_top_k(row, feature_names, k=TOP_K):
+    """The obvious per-row version: sort every feature by |value|."""
+    order = sorted(range(len(row)), key=lambda j: -abs(row[j]))[:k]
+    return [{"feature": feature_names[j], "contribution": float(row[j])} for j in order]
+
+
+class ExplanationPlanTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.schema = load_schema(INFERENCE_DIR / "schema.json")
+        cls.feature_names = [f["name"] for f in cls.schema["features"]]
+        with open(MODEL_DIR / "model_pipeline.pkl", "rb") as f:
+            cls.pipeline = pickle.load(f)["pipeline"]
+        cls.X = probe_matrix(cls.schema, n_rows=100, seed=2)
+
+    def test_linear_plan_sums_to_the_log_odds(self):
+        compiled = compile_model(self.pipeline, self.feature_names)
+        plan = build_explanation_plan(self.pipeline, self.feature_names, compiled)
+        self.assertEqual(plan.kind, "linear")
+
+        # Fold-averaged calibrated log-odds = sum of contributions + a
+        # per-model constant
+        log_odds = (
+            -(compiled.a * compiled.decision_function(self.X) + compiled.b)
+        ).mean(axis=1)
+        constant = (-(compiled.a * compiled.intercepts + compiled.b)).mean()
+        np.testing.assert_allclose(
+            plan.contributions(self.X).sum(axis=1) + constant, log_odds, atol=1e-9
+        )
+
+    def test_plan_without_compiled_model_is_the_same(self):
+        compiled = compile_model(self.pipeline, self.feature_names)
+        given = build_explanation_plan(self.pipeline, self.feature_names, compiled)
+        built = build_explanation_plan(self.pipeline, self.feature_names)
+        np.testing.assert_array_equal(built.weights, given.weights)
+        np.testing.assert_array_equal(built.offsets, given.offsets)
+
+    def test_tree_and_unsupported_models(self):
+        frame = pd.DataFrame(self.X[:60], columns=self.feature_names)
+        y = np.arange(60) % 2
+        trees = CalibratedClassifierCV(
+            GradientBoostingClassifier(n_estimators=5), cv=2
+        ).fit(frame, y)
+        plan = build_explanation_plan(trees, self.feature_names)
+        self.assertEqual(plan.kind, "importance")
+        np.testing.assert_allclose(
+            plan.contributions(self.X[:1])[0], self.X[0] * plan.weights
+        )
+
+        plan = build_explanation_plan(SVC().fit(frame, y), self.feature_names)
+        self.assertEqual(plan.kind, "none")
+        self.assertFalse(plan.contributions(self.X).any())
+
+    def test_batch_matches_single_row(self):
+        plan = build_explanation_plan(self.pipeline, self.feature_names)
+        batch = compute_contributions_batch(
+            self.pipeline, self.X[:10], self.feature_names, False, plan
+        )
+        for i, row in enumerate(batch):
+            frame = pd.DataFrame(self.X[i : i + 1], columns=self.feature_names)
+            self.assertEqual(
+                row,
+                compute_contributions(
+                    self.pipeline, frame, self.feature_names, False, plan
+                ),
+            )
+            self.assertEqual(
+                row,
+                reference_top_k(
+                    plan.contributions(self.X[i : i + 1])[0], self.feature_names
+                ),
+            )
+
+
+class TopContributionsTests(SimpleTestCase):
+    def test_matches_full_sort(self):
+        rng = np.random.default_rng(0)
+        vals = rng.normal(size=(50, 30))
+        names = [f"f{j}" for j in range(30)]
+        self.assertEqual(
+            top_contributions(vals, names),
+            [reference_top_k(row, names) for row in vals],
+        )
+
+    def test_fewer_features_than_k(self):
+        vals = np.array([[0.5, -2.0, 1.0]])
+        self.assertEqual(
+            [c["feature"] for c in top_contributions(vals, ["a", "b", "c"])[0]],
+            ["b", "c", "a"],
+        )
+        self.assertEqual(top_contributions(np.zeros((2, 0)), []), [[], []])
+
+
+@unittest.skipUnless(importlib.util.find_spec("shap"), "shap is not installed")
+class ShapExplainerTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.model_dir = Path(tmp.name) / "model"
+        shutil.copytree(MODEL_DIR, self.model_dir)
+        self.X = probe_matrix(
+            load_schema(INFERENCE_DIR / "schema.json"), n_rows=20, seed=3
+        )
+
+    def bundle(self):
+        with mock.patch.dict(os.environ, {"EXPLAIN_WITH_SHAP": "True"}):
+            return ModelBundle.from_directory(
+                self.model_dir, INFERENCE_DIR / "schema.json"
+            )
+
+    def test_built_once_per_bundle(self):
+        bundle = self.bundle()
+        with mock.patch.object(
+            registry, "build_shap_explainer", wraps=registry.build_shap_explainer
+        ) as build:
+            first = bundle.explain(self.X[:2])
+            second = bundle.explain(self.X[:2])
+        self.assertEqual(build.call_count, 1)
+        self.assertIs(bundle.shap_explainer(), bundle.shap_explainer())
+        self.assertEqual(first, second)
+
+    def test_explains_against_the_stored_background(self):
+        bundle = self.bundle()
+        background = np.load(self.model_dir / "background.npy")
+        # Closed-form linear SHAP: weight * (x - background mean) on the plan's
+        # log-odds weights
+        expected = bundle.explanation_plan().weights * (
+            self.X - background.mean(axis=0)
+        )
+        for got, want in zip(
+            bundle.explain(self.X), top_contributions(expected, bundle.feature_names)
+        ):
+            self.assertEqual([c["feature"] for c in got], [c["feature"] for c in want])
+            np.testing.assert_allclose(
+                [c["contribution"] for c in got],
+                [c["contribution"] for c in want],
+                rtol=1e-6,
+                atol=1e-9,
+            )
+
+    def test_without_a_stored_background(self):
+        (self.model_dir / "background.npy").unlink()
+        bundle = self.bundle()
+        self.assertIsNotNone(bundle.shap_explainer())
+        self.assertEqual(len(bundle.explain(self.X[:3])), 3)
+
+    def test_falls_back_to_the_plan_without_shap(self):
+        bundle = self.bundle()
+        with mock.patch.dict(sys.modules, {"shap": None}):
+            self.assertIsNone(bundle.shap_explainer())
+            got = bundle.explain(self.X[:3])
+        self.assertEqual(
+            got,
+            top_contributions(
+                bundle.explanation_plan().contributions(self.X[:3]),
+                bundle.feature_names,
+            ),
+        )
@@ -0,0 +1,109 @@
+"""
+The columnar training-data cache in ml/ingest.py.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+
+ML_DIR = Path(__file__).resolve().parents[3] / "ml"
+DATA = ML_DIR / "data.csv"
+
+
+class IngestTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        sys.path.insert(0, str(ML_DIR))
+        import ingest
+
+        cls.ingest = ingest
+
+    @classmethod
+    def tearDownClass(cls):
+        sys.path.remove(str(ML_DIR))
+        super().tearDownClass()
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        self.cache = self.tmp / "cache"
+
+    def write_csv(self, text):
+        path = self.tmp / "cases.csv"
+        path.write_text(text)
+        return path
+
+    def test_round_trips_the_training_csv_exactly(self):
+        directory, manifest = self.ingest.ensure(
+            DATA, self.cache, drop_cols=["id", "Unnamed: 32"]
+        )
+        expected = pd.read_csv(DATA).drop(
+            columns=["id", "Unnamed: 32"], errors="ignore"
+        )
+        floats = [name for name in expected.columns if name != "diagnosis"]
+        pd.testing.assert_frame_equal(
+            self.ingest.load_frame(directory, manifest, floats), expected[floats]
+        )
+        self.assertEqual(manifest["rows"], len(expected))
+        self.assertEqual(manifest["columns"]["radius_mean"]["dtype"], "float32")
+
+        codes = self.ingest.load_columns(directory, manifest, ["diagnosis"])[
+            "diagnosis"
+        ]
+        categories = manifest["columns"]["diagnosis"]["categories"]
+        self.assertEqual([categories[c] for c in codes], expected["diagnosis"].tolist())
+
+    def test_types_across_chunks(self):
+        path = self.write_csv(
+            "count,late_float,label,precise\n"
+            "1,1,a,0.1234567890123\n"
+            "2,2,b,1.5\n"
+            "300,2.5,a,2\n"
+            "4,,c,3\n"
+        )
+        # Built in 2-row chunks, so late_float turns from int to float after
+        # the first chunk
+        manifest = self.ingest.build(path, self.cache, chunk_rows=2)
+        directory = self.ingest.dataset_dir(path, self.cache)
+        columns = manifest["columns"]
+        self.assertEqual(columns["count"]["dtype"], "uint16")
+        self.assertEqual(columns["precise"]["dtype"], "float64")
+        self.assertEqual(columns["label"]["categories"], ["a", "b", "c"])
+        frame = self.ingest.load_frame(
+            directory, manifest, ["count", "late_float", "precise"]
+        )
+        expected = pd.read_csv(path)[["count", "late_float", "precise"]].astype(
+            np.float64
+        )
+        pd.testing.assert_frame_equal(frame, expected)
+
+    def test_rebuilds_only_when_the_source_changes(self):
+        path = self.write_csv("a,b\n1.5,2\n2.5,3\n")
+        directory, manifest = self.ingest.ensure(path, self.cache)
+        built_at = manifest["built_at"]
+
+        # Touched but identical: still fresh, the new mtime is recorded
+        os.utime(path, ns=(0, 10**9))
+        _, manifest = self.ingest.ensure(path, self.cache)
+        self.assertEqual(manifest["built_at"], built_at)
+        self.assertEqual(manifest["source"]["mtime_ns"], 10**9)
+
+        # Same size, different bytes: rebuilt
+        path.write_text("a,b\n1.5,2\n2.5,4\n")
+        _, manifest = self.ingest.ensure(path, self.cache)
+        self.assertNotEqual(manifest["built_at"], built_at)
+        self.assertEqual(
+            self.ingest.load_frame(directory, manifest, ["b"])["b"].tolist(), [2.0, 4.0]
+        )
+
+    def test_unknown_columns(self):
+        directory, manifest = self.ingest.ensure(self.write_csv("a\n1\n"), self.cache)
+        with self.assertRaises(KeyError):
+            self.ingest.load_columns(directory, manifest, ["a", "b"])
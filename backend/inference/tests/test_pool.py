@@ -0,0 +1,190 @@
+"""
+Process-pool scoring backend: worker start method, timeouts and recovery.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from django.test import SimpleTestCase
+
+from inference import predictor
+from inference.pool import (
+    PoolUnavailable,
+    ProcessPoolBackend,
+    _terminate,
+    default_start_method,
+)
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+# Run in a fresh interpreter: the fork server's preload list only applies if
+# it is set before the process first starts a fork server
+PRELOAD_SCRIPT = """
+import json
+import os
+
+from inference import predictor
+
+
+def worker_state(records, version):
+    from inference import pool_preload
+    return [pool_preload.loaded_in_pid, os.getppid(), os.getpid()]
+
+
+if __name__ == "__main__":
+    pool = predictor.get_pool()
+    executor = pool.start()
+    try:
+        states = [executor.submit(worker_state, [], None).result() for _ in range(4)]
+    finally:
+        pool.shutdown()
+    print(json.dumps({"pid": os.getpid(), "workers": states}))
+"""
+
+
+def _noop_init() -> None:
+    pass
+
+
+def _score_pids(records, version):
+    """Worker pid per record; sleeps first if a record asks it to."""
+    time.sleep(max(record.get("sleep", 0) for record in records))
+    return [os.getpid() for _ in records]
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    # A terminated child stays a zombie until reaped; treat that as gone
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().split()[2] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+class TornDownAfterRead(ProcessPoolBackend):
+    """
+    Simulates _mark_broken finishing on another thread right after _executor is read.
+    """
+
+    tear_down = False
+
+    @property
+    def _executor(self):
+        executor = self.__dict__["_executor"]
+        if executor is not None and self.tear_down:
+            self.tear_down = False
+            self.__dict__["_executor"] = None
+            _terminate(executor)
+        return executor
+
+    @_executor.setter
+    def _executor(self, executor):
+        self.__dict__["_executor"] = executor
+
+
+class ProcessPoolBackendTests(SimpleTestCase):
+    def make_pool(self, **kwargs):
+        pool = ProcessPoolBackend(_score_pids, _noop_init, **{"size": 1, **kwargs})
+        self.addCleanup(pool.shutdown)
+        return pool
+
+    def test_never_forks_the_serving_process(self):
+        self.assertIn(default_start_method(), ("forkserver", "spawn"))
+        self.assertNotEqual(self.make_pool().start_method, "fork")
+        with self.assertRaises(ValueError):
+            ProcessPoolBackend(_score_pids, _noop_init, start_method="fork")
+
+    def test_scores_in_a_worker_process(self):
+        pool = self.make_pool()
+        pids = pool.run([{}, {}])
+        self.assertEqual(len(pids), 2)
+        self.assertNotEqual(pids[0], os.getpid())
+        self.assertEqual(pool.stats()["batches"], 1)
+
+    def test_timeout_terminates_the_busy_worker_and_restarts(self):
+        pool = self.make_pool(timeout=0.5, restart_cooldown=0)
+        worker_pid = pool.run([{}])[0]
+        with self.assertRaises(PoolUnavailable):
+            pool.run([{"sleep": 30}])
+        self.assertEqual(pool.stats()["timeouts"], 1)
+        self.assertFalse(pool.stats()["running"])
+
+        deadline = time.monotonic() + 5
+        while _pid_alive(worker_pid):
+            self.assertLess(
+                time.monotonic(), deadline, "timed-out worker was left running"
+            )
+            time.sleep(0.05)
+        # A fresh pool with a fresh worker serves the next batch
+        self.assertNotEqual(pool.run([{}])[0], worker_pid)
+
+    def test_unavailable_during_cooldown(self):
+        pool = self.make_pool(timeout=0.5, restart_cooldown=60)
+        with self.assertRaises(PoolUnavailable):
+            pool.run([{"sleep": 30}])
+        with self.assertRaisesMessage(PoolUnavailable, "restarting"):
+            pool.run([{}])
+        self.assertEqual(pool.stats()["fallbacks"], 2)
+
+    def test_pool_torn_down_before_submit_falls_back(self):
+        pool = TornDownAfterRead(_score_pids, _noop_init, size=1, restart_cooldown=60)
+        self.addCleanup(pool.shutdown)
+        pool.start()
+        pool.tear_down = True
+        with self.assertRaises(PoolUnavailable):
+            pool.run([{}])
+        self.assertEqual((pool.stats()["failures"], pool.stats()["fallbacks"]), (1, 1))
+
+
+class PredictorPoolTests(SimpleTestCase):
+    def test_pool_results_match_in_process(self):
+        records = [
+            {
+                f["name"]: (f["min"] + f["max"]) / 2
+                for f in predictor.get_schema()["features"]
+            }
+        ]
+        pool = ProcessPoolBackend(
+            predictor._predict_batch_local,
+            predictor._init_pool_worker,
+            size=1,
+            timeout=60,
+        )
+        self.addCleanup(pool.shutdown)
+        self.assertEqual(pool.run(records), predictor._predict_batch_local(records))
+
+    def test_workers_inherit_the_model_preloaded_by_the_fork_server(self):
+        if default_start_method() != "forkserver":
+            self.skipTest("forkserver is not available")
+        with tempfile.TemporaryDirectory() as tmp:
+            script = Path(tmp) / "preload_check.py"
+            script.write_text(PRELOAD_SCRIPT)
+            env = {
+                **os.environ,
+                "DUMMY_MODE": "False",
+                "INFERENCE_POOL_SIZE": "2",
+                "PYTHONPATH": str(BACKEND_DIR),
+            }
+            output = subprocess.run(
+                [sys.executable, str(script)],
+                cwd=BACKEND_DIR,
+                env=env,
+                capture_output=True,
+                text=True,
+                timeout=120,
+                check=True,
+            ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        for loaded_in_pid, parent_pid, pid in result["workers"]:
+            # Loaded once in the fork server, before the worker was forked from it
+            self.assertEqual(loaded_in_pid, parent_pid)
+            self.assertNotIn(loaded_in_pid, (pid, result["pid"]))
@@ -0,0 +1,135 @@
+"""
+Model registry: version names, pinned versions and hot-swap of the active model.
+"""
+
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from inference import predictor
+from inference.registry import ModelBundle, ModelNotFoundError, ModelRegistry
+
+INFERENCE_DIR = Path(__file__).resolve().parent.parent
+MODEL_DIR = INFERENCE_DIR / "model"
+SCHEMA_PATH = INFERENCE_DIR / "schema.json"
+
+
+class RegistryTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.base = Path(tmp.name)
+        self.root = self.base / "registry"
+        for version in ("v1", "v2"):
+            shutil.copytree(MODEL_DIR, self.root / version)
+        shutil.copytree(MODEL_DIR, self.base / "outside" / "evil")
+        (self.root / "ACTIVE").write_text("v1\n")
+        self.registry = ModelRegistry(self.root, MODEL_DIR, SCHEMA_PATH, poll_seconds=0)
+
+    def wait_for_active(self, version, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while self.registry.active().version != version:
+            self.assertLess(
+                time.monotonic(), deadline, f"{version} was never activated"
+            )
+            time.sleep(0.01)
+
+    def test_versions(self):
+        (self.root / ".staging").mkdir()
+        self.assertEqual(self.registry.versions(), ["v1", "v2"])
+
+    def test_pinned_version(self):
+        self.assertEqual(self.registry.get().version, "v1")
+        self.assertEqual(self.registry.get("v2").version, "v2")
+        self.assertIs(self.registry.get("v2"), self.registry.get("v2"))
+        self.assertEqual(self.registry.get().version, "v1")
+
+    def test_rejects_paths_outside_the_registry(self):
+        for version in (
+            "../outside/evil",
+            "..",
+            ".",
+            ".ACTIVE",
+            "v1/../v2",
+            "..\\outside",
+            "missing",
+        ):
+            with self.subTest(version=version), self.assertRaises(ModelNotFoundError):
+                self.registry.get(version)
+        with self.assertRaises(ModelNotFoundError):
+            self.registry.activate("../outside/evil")
+
+    def test_pinned_version_header_cannot_escape_the_registry(self):
+        with mock.patch.object(predictor, "_registry", self.registry):
+            response = self.client.post(
+                "/api/predict/",
+                {"radius_mean": 14.1},
+                content_type="application/json",
+                headers={"X-Model-Version": "../outside/evil"},
+            )
+        self.assertEqual(response.status_code, 404)
+
+    def test_hot_swap(self):
+        old = self.registry.active()
+        self.registry.activate("v2")
+        self.assertEqual((self.root / "ACTIVE").read_text().strip(), "v2")
+        self.wait_for_active("v2")
+        self.assertIsNot(self.registry.active(), old)
+
+    def test_failed_swap_keeps_serving_the_old_version(self):
+        self.registry.active()
+        (self.root / "ACTIVE").write_text("missing\n")
+        self.registry.active()
+        deadline = time.monotonic() + 10
+        while self.registry._failed != "missing":
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+        self.assertEqual(self.registry.active().version, "v1")
+
+    def test_failed_swap_is_retried_after_a_backoff(self):
+        self.registry.retry_seconds = 3600
+        self.registry.active()
+        # Pointer flipped before the version directory was in place
+        (self.root / "ACTIVE").write_text("v3\n")
+        self.registry.active()
+        deadline = time.monotonic() + 10
+        while self.registry._failed != "v3" or self.registry._loading:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+        shutil.copytree(MODEL_DIR, self.root / "v3")
+        self.registry.active()
+        self.assertIsNone(self.registry._loading)
+        self.assertEqual(self.registry.active().version, "v1")
+
+        self.registry._retry_at = 0.0
+        self.wait_for_active("v3")
+        self.assertIsNone(self.registry._failed)
+
+    def test_cold_pin_does_not_block_other_requests(self):
+        self.registry.active()
+        building, release = threading.Event(), threading.Event()
+        warm = ModelBundle.warm
+
+        def slow_warm(bundle, *args, **kwargs):
+            if bundle.version == "v2":
+                building.set()
+                release.wait(10)
+            return warm(bundle, *args, **kwargs)
+
+        with mock.patch.object(ModelBundle, "warm", slow_warm):
+            pinned = threading.Thread(target=self.registry.get, args=("v2",))
+            pinned.start()
+            self.assertTrue(building.wait(10))
+            try:
+                # Served while v2 is still warming
+                self.assertEqual(self.registry.get().version, "v1")
+                self.assertEqual(self.registry.versions(), ["v1", "v2"])
+            finally:
+                release.set()
+                pinned.join(10)
+        self.assertIn("v2", self.registry._bundles)
@@ -0,0 +1,105 @@
+"""
+Micro-batching scheduler: coalescing, per-version grouping and error fan-out.
+"""
+
+import asyncio
+import os
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from inference import predictor
+from inference.scheduler import MicroBatcher
+
+
+class RecordingPredictor:
+    """predict_fn that records its batches; the first call blocks until released."""
+
+    def __init__(self, fail_version="never"):
+        self.batches = []
+        self.first_call = threading.Event()
+        self.release = threading.Event()
+        self.fail_version = fail_version
+
+    def __call__(self, records, version):
+        self.batches.append((version, [r["x"] for r in records]))
+        self.first_call.set()
+        self.release.wait(5)
+        if version == self.fail_version:
+            raise RuntimeError("model failed")
+        return [(version, r["x"] * 2) for r in records]
+
+
+class MicroBatcherTests(SimpleTestCase):
+    def test_coalesces_waiting_records(self):
+        predict_fn = RecordingPredictor()
+        batcher = MicroBatcher(predict_fn, max_batch_size=4, max_wait_ms=50)
+        first = batcher.submit({"x": 0})
+        self.assertTrue(predict_fn.first_call.wait(5))
+        # Queued while the worker is busy with the first record
+        futures = [batcher.submit({"x": i}) for i in range(1, 7)]
+        predict_fn.release.set()
+
+        self.assertEqual(first.result(5), (None, 0))
+        self.assertEqual(
+            [f.result(5) for f in futures], [(None, 2 * i) for i in range(1, 7)]
+        )
+        self.assertEqual([len(records) for _, records in predict_fn.batches], [1, 4, 2])
+        stats = batcher.stats()
+        self.assertEqual(
+            (stats["batches"], stats["records"], stats["max_queue_depth"]), (3, 7, 6)
+        )
+        self.assertEqual(stats["batch_size_histogram"]["<=4"], 1)
+
+    def test_groups_by_version_and_fails_only_that_group(self):
+        predict_fn = RecordingPredictor(fail_version="v2")
+        batcher = MicroBatcher(predict_fn, max_batch_size=8, max_wait_ms=50)
+        batcher.submit({"x": 0})
+        self.assertTrue(predict_fn.first_call.wait(5))
+        v1 = [batcher.submit({"x": 1}, "v1"), batcher.submit({"x": 3}, "v1")]
+        v2 = batcher.submit({"x": 2}, "v2")
+        predict_fn.release.set()
+
+        self.assertEqual([f.result(5) for f in v1], [("v1", 2), ("v1", 6)])
+        with self.assertRaisesMessage(RuntimeError, "model failed"):
+            v2.result(5)
+        self.assertIn(("v1", [1, 3]), predict_fn.batches)
+        self.assertIn(("v2", [2]), predict_fn.batches)
+
+    def test_awaitable(self):
+        predict_fn = RecordingPredictor()
+        predict_fn.release.set()
+        batcher = MicroBatcher(predict_fn)
+
+        async def predict():
+            return await asyncio.wrap_future(batcher.submit({"x": 5}))
+
+        self.assertEqual(asyncio.run(predict()), (None, 10))
+
+    def test_from_environ(self):
+        with mock.patch.dict(os.environ, {"INFERENCE_BATCHING": "False"}):
+            self.assertIsNone(MicroBatcher.from_environ(lambda records, version: []))
+        with mock.patch.dict(
+            os.environ,
+            {
+                "INFERENCE_BATCHING": "True",
+                "BATCH_MAX_SIZE": "8",
+                "BATCH_MAX_WAIT_MS": "1.5",
+            },
+        ):
+            batcher = MicroBatcher.from_environ(lambda records, version: [])
+        self.assertEqual((batcher.max_batch_size, batcher.max_wait_ms), (8, 1.5))
+
+    def test_predict_goes_through_the_scheduler(self):
+        record = {
+            f["name"]: (f["min"] + f["max"]) / 2
+            for f in predictor.get_schema()["features"]
+        }
+        batcher = MicroBatcher(predictor.predict_batch, max_wait_ms=1)
+        with mock.patch.multiple(
+            predictor, _scheduler=batcher, _scheduler_checked=True
+        ):
+            result = predictor.predict(record)
+        self.assertEqual(result, predictor.predict_batch([record])[0])
+        self.assertEqual(batcher.stats()["records"], 1)
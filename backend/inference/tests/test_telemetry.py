@@ -0,0 +1,99 @@
+"""
+Stage latency histograms, counters and the Prometheus /metrics endpoint.
+"""
+
+import re
+import tempfile
+from unittest import mock
+
+from django.test import TestCase
+
+from api.tests.utils import staff_user, valid_record
+from inference import telemetry as telemetry_module
+from inference.telemetry import LATENCY_BUCKETS, Telemetry
+
+
+def samples(text):
+    """
+    {metric line without value: value} for every sample in a Prometheus exposition.
+    """
+    return {
+        line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+        for line in text.splitlines()
+        if line and not line.startswith("#")
+    }
+
+
+class TelemetryTests(TestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        t = Telemetry()
+        for seconds in (0.00005, 0.0003, 0.0003, 20.0):
+            t.observe("score", seconds)
+        metrics = samples(t.render_prometheus())
+        bucket = 'detector_stage_duration_seconds_bucket{stage="score",le="%s"}'
+        # Upper bounds are inclusive, as Prometheus "le" requires
+        self.assertEqual(metrics[bucket % LATENCY_BUCKETS[0]], 1)
+        self.assertEqual(metrics[bucket % 0.00025], 1)
+        self.assertEqual(metrics[bucket % 0.0005], 3)
+        self.assertEqual(metrics[bucket % 10.0], 3)
+        self.assertEqual(metrics[bucket % "+Inf"], 4)
+        self.assertEqual(
+            metrics['detector_stage_duration_seconds_count{stage="score"}'], 4
+        )
+        self.assertAlmostEqual(
+            metrics['detector_stage_duration_seconds_sum{stage="score"}'], 20.00065
+        )
+
+    def test_timed_records_when_the_block_raises(self):
+        t = Telemetry()
+        with self.assertRaises(ValueError), t.timed("parse"):
+            raise ValueError
+        self.assertEqual(sum(t.snapshot()["histograms"]["parse"][0]), 1)
+
+    def test_counters(self):
+        t = Telemetry()
+        t.increment("inference_results_total", "model", 3)
+        t.increment("inference_results_total", "dummy_mode")
+        t.increment("inference_results_total", "model")
+        text = t.render_prometheus()
+        self.assertIn("# TYPE detector_inference_results_total counter", text)
+        metrics = samples(text)
+        self.assertEqual(metrics['detector_inference_results_total{kind="model"}'], 4)
+        self.assertEqual(
+            metrics['detector_inference_results_total{kind="dummy_mode"}'], 1
+        )
+
+    def test_snapshots_of_all_processes_are_summed(self):
+        with (
+            tempfile.TemporaryDirectory() as tmp,
+            mock.patch.object(telemetry_module.atexit, "register"),
+        ):
+            first, second = Telemetry(tmp, flush_seconds=3600), Telemetry(
+                tmp, flush_seconds=3600
+            )
+            first.observe("score", 0.001)
+            first.increment("inference_results_total", "model", 2)
+            second.observe("score", 0.002)
+            second.increment("inference_results_total", "model", 5)
+            second.flush()
+            metrics = samples(first.render_prometheus())
+        self.assertEqual(
+            metrics['detector_stage_duration_seconds_count{stage="score"}'], 2
+        )
+        self.assertEqual(metrics['detector_inference_results_total{kind="model"}'], 7)
+
+    def test_metrics_endpoint(self):
+        with mock.patch("api.views.telemetry", Telemetry()):
+            self.client.post(
+                "/api/predict/", valid_record(), content_type="application/json"
+            )
+            self.client.force_login(staff_user())
+            response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(
+            response["Content-Type"].startswith("text/plain; version=0.0.4")
+        )
+        stages = set(re.findall(r'stage="([^"]+)"', response.content.decode()))
+        self.assertTrue(
+            {"request.total", "request.validate", "request.persist"} <= stages
+        )
@@ -0,0 +1,114 @@
+"""
+The model-selection CLI in ml/train_model.py, end to end on the bundled WDBC data.
+"""
+
+import io
+import sys
+import tempfile
+from contextlib import redirect_stdout
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+
+from inference.compiled import ARRAYS_FILENAME, CompiledLinearModel, probe_matrix
+from inference.registry import ModelBundle
+
+INFERENCE_DIR = Path(__file__).resolve().parent.parent
+ML_DIR = INFERENCE_DIR.parent.parent / "ml"
+DATA = ML_DIR / "data.csv"
+
+
+class TrainModelTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        sys.path.insert(0, str(ML_DIR))
+        import train_model
+
+        cls.train_model = train_model
+
+    @classmethod
+    def tearDownClass(cls):
+        sys.path.remove(str(ML_DIR))
+        super().tearDownClass()
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+
+    def run_main(self, *argv):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.train_model.main(
+                [
+                    "--data",
+                    str(DATA),
+                    "--out",
+                    str(self.tmp / "out"),
+                    "--cache-dir",
+                    str(self.tmp / "cache"),
+                    "--jobs",
+                    "1",
+                    "--cv-folds",
+                    "3",
+                    "--version",
+                    "test-1.0",
+                    *argv,
+                ]
+            )
+        return output.getvalue()
+
+    def test_parse_args_defaults(self):
+        args = self.train_model.parse_args([])
+        self.assertEqual(
+            (args.search, args.halving, args.cv_folds, args.jobs),
+            ("default", False, 5, -1),
+        )
+        self.assertEqual(args.version, self.train_model.MODEL_VERSION)
+
+    def test_candidate_grids(self):
+        default = self.train_model.candidate_grid("default", 0)
+        self.assertIsInstance(default[0]["clf"][0], LogisticRegression)
+        self.assertIsInstance(default[1]["clf"][0], GradientBoostingClassifier)
+        wide = self.train_model.candidate_grid("wide", 0)
+        self.assertEqual(len(wide), 3)
+        self.assertIn("clf__C", wide[0])
+
+    def test_cached_and_direct_loading_agree(self):
+        X, y, columns = self.train_model.load_data(DATA)
+        X_cached, y_cached, columns_cached = self.train_model.load_data(
+            DATA, self.tmp / "cache"
+        )
+        self.assertEqual(columns, self.train_model.HYBRID_16)
+        self.assertEqual(columns_cached, columns)
+        np.testing.assert_array_equal(X_cached.to_numpy(), X.to_numpy())
+        np.testing.assert_array_equal(y_cached, y)
+        self.assertEqual(int(y.sum()), 212)
+
+    def test_trains_and_exports_a_loadable_model(self):
+        output = self.run_main()
+        self.assertIn("Selected: LogisticRegression", output)
+        self.assertIn("Wall time per stage", output)
+        out = self.tmp / "out"
+        self.assertTrue((out / ARRAYS_FILENAME).exists())
+        # The preprocessing cache is filled on the first run
+        self.assertTrue(any((self.tmp / "cache").rglob("*.pkl")))
+
+        bundle = ModelBundle.from_directory(out, INFERENCE_DIR / "schema.json")
+        self.assertEqual(bundle.version, "test-1.0")
+        self.assertIsInstance(bundle.scoring_model(), CompiledLinearModel)
+        X = probe_matrix(bundle.schema, n_rows=50)
+        expected = bundle.load_model().predict_proba(
+            pd.DataFrame(X, columns=bundle.feature_names)
+        )[:, 1]
+        np.testing.assert_allclose(bundle.predict_proba(X), expected, atol=1e-9)
+
+    def test_halving_search(self):
+        output = self.run_main("--halving", "--no-cache")
+        self.assertIn("Selected:", output)
+        self.assertFalse((self.tmp / "cache").exists())
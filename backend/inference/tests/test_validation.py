@@ -0,0 +1,186 @@
+"""
+Payload validation against the feature schema (inference/validation.py).
+"""
+
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+
+from api import fastjson
+from api.tests.utils import model_mode, valid_record
+from inference.validation import MAX_VALUE_REPR, SchemaValidator, error_message
+
+NAMES = ["a", "b", "c"]
+
+
+def codes(errors):
+    return [(e["field"], e["code"]) for e in errors]
+
+
+class SchemaValidatorTests(SimpleTestCase):
+    def setUp(self):
+        schema = {
+            "features": [
+                {"name": "a", "min": 0, "max": 10},
+                {"name": "b", "min": 1},
+                {"name": "c", "max": 5},
+            ]
+        }
+        self.validator = SchemaValidator.from_schema(schema)
+
+    def test_valid_batch_in_schema_order(self):
+        batch = self.validator.validate_many(
+            [
+                {"c": 3, "b": "2.5", "a": 1, "extra": "ignored"},
+                {"a": 0, "b": 1, "c": -1e9},
+            ]
+        )
+        self.assertEqual(batch.errors, {})
+        self.assertEqual(batch.indices, [0, 1])
+        np.testing.assert_array_equal(batch.X, [[1, 2.5, 3], [0, 1, -1e9]])
+        self.assertEqual(batch.records[0], {"a": 1.0, "b": 2.5, "c": 3.0})
+        self.assertEqual(batch.feature_names, tuple(NAMES))
+
+    def test_error_codes(self):
+        batch = self.validator.validate_many(
+            [
+                None,
+                {"a": 1, "c": 1},
+                {"a": "x", "b": [1], "c": 1},
+                {"a": float("nan"), "b": None, "c": float("inf")},
+                {"a": 11, "b": 0, "c": 6},
+            ]
+        )
+        self.assertEqual(batch.indices, [])
+        self.assertEqual(codes(batch.errors[0]), [(None, "not_object")])
+        self.assertEqual(codes(batch.errors[1]), [("b", "missing")])
+        self.assertEqual(
+            codes(batch.errors[2]), [("a", "not_numeric"), ("b", "not_numeric")]
+        )
+        self.assertEqual(
+            codes(batch.errors[3]),
+            [("a", "not_finite"), ("b", "not_numeric"), ("c", "not_finite")],
+        )
+        self.assertEqual(
+            codes(batch.errors[4]),
+            [("a", "out_of_range"), ("b", "out_of_range"), ("c", "out_of_range")],
+        )
+
+    def test_messages(self):
+        errors = self.validator.validate_many([{"a": 11, "b": 0, "c": 6}]).errors[0]
+        self.assertEqual(
+            [e["message"] for e in errors],
+            [
+                "a must be between 0 and 10 (got 11)",
+                "b must be at least 1 (got 0)",
+                "c must be at most 5 (got 6)",
+            ],
+        )
+        self.assertEqual(error_message(errors), "; ".join(e["message"] for e in errors))
+
+        long_value = "x" * 100
+        [error] = self.validator.validate_many(
+            [{"a": long_value, "b": 1, "c": 1}]
+        ).errors[0]
+        self.assertEqual(
+            error["message"],
+            f"a must be a number (got {repr(long_value)[:MAX_VALUE_REPR]}...)",
+        )
+
+    def test_mixed_batch_keeps_input_positions(self):
+        good = {"a": 1, "b": 2, "c": 3}
+        batch = self.validator.validate_many(
+            [good, {"a": 20, "b": 2, "c": 3}, dict(good, a=4), "nope"]
+        )
+        self.assertEqual(batch.indices, [0, 2])
+        self.assertEqual(sorted(batch.errors), [1, 3])
+        self.assertEqual([r["a"] for r in batch.records], [1.0, 4.0])
+        self.assertEqual(batch.X.shape, (2, 3))
+
+    def test_integers_too_large_for_a_float_are_not_numeric(self):
+        huge = 10**400
+        batch = self.validator.validate_many(
+            [{"a": huge, "b": 2, "c": 3}, {"a": 1, "b": 2, "c": 3}]
+        )
+        self.assertEqual(batch.indices, [1])
+        self.assertEqual(codes(batch.errors[0]), [("a", "not_numeric")])
+        with self.assertRaisesMessage(ValueError, "a must be a number"):
+            self.validator.matrix([{"a": huge, "b": 2, "c": 3}])
+
+    def test_bounds_can_be_disabled(self):
+        record = {"a": 11, "b": 0, "c": 6}
+        self.assertEqual(
+            self.validator.validate_many([record], enforce_bounds=False).errors, {}
+        )
+        unbounded = SchemaValidator(
+            NAMES, self.validator.lower, self.validator.upper, enforce_bounds=False
+        )
+        self.assertEqual(unbounded.validate_many([record]).errors, {})
+        # Types and NaN/inf are still checked
+        self.assertEqual(
+            codes(unbounded.validate_many([dict(record, a=float("nan"))]).errors[0]),
+            [("a", "not_finite")],
+        )
+
+    def test_matrix(self):
+        np.testing.assert_array_equal(
+            self.validator.matrix([{"a": 1, "b": 2, "c": 30}]), [[1, 2, 30]]
+        )
+        with self.assertRaisesMessage(ValueError, "b is required"):
+            self.validator.matrix([{"a": 1, "c": 3}])
+        with self.assertRaisesMessage(ValueError, "a must be a finite number"):
+            self.validator.matrix([{"a": float("inf"), "b": 2, "c": 3}])
+
+
+class PredictValidationTests(TestCase):
+    def test_predict_returns_field_errors(self):
+        name = next(iter(valid_record()))
+        response = self.client.post(
+            "/api/predict/",
+            valid_record(**{name: "abc"}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        body = response.json()
+        self.assertEqual(codes(body["errors"]), [(name, "not_numeric")])
+        self.assertEqual(body["error"], error_message(body["errors"]))
+
+    def test_predict_rejects_huge_integers(self):
+        name = next(iter(valid_record()))
+        body = (
+            fastjson.dumps(valid_record(**{name: 0}))
+            .decode()
+            .replace(f'"{name}":0', f'"{name}":{"9" * 400}')
+        )
+        # The stdlib parser reads it as an int that doesn't fit a float; orjson
+        # refuses to parse it
+        with mock.patch.object(fastjson, "orjson", None):
+            response = self.client.post(
+                "/api/predict/", body, content_type="application/json"
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(codes(response.json()["errors"]), [(name, "not_numeric")])
+        response = self.client.post(
+            "/api/predict/", body, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("JSON parse error", response.json()["error"])
+        batch = self.client.post(
+            "/api/predict/batch/", f"[{body}]", content_type="application/json"
+        )
+        self.assertEqual(batch.status_code, 400)
+
+    def test_bounds_follow_the_runtime_config(self):
+        name = next(iter(valid_record()))
+        record = valid_record(**{name: 1e6})
+        with model_mode():
+            response = self.client.post(
+                "/api/predict/", record, content_type="application/json"
+            )
+            self.assertEqual(codes(response.json()["errors"]), [(name, "out_of_range")])
+        with model_mode(ENFORCE_SCHEMA_BOUNDS="False"):
+            response = self.client.post(
+                "/api/predict/", record, content_type="application/json"
+            )
+            self.assertEqual(response.status_code, 201)
@@ -0,0 +1,211 @@
+"""
+Compiled validation of prediction payloads against the feature schema.
+
+SchemaValidator is built once per model bundle from schema.json. It holds the
+feature order, a name -> column map and the min/max bounds as arrays. It turns
+one payload or a batch of payloads straight into a schema-ordered float matrix,
+with type, NaN/inf and range checks run over the whole matrix at once.
+Problems are reported per field:
+
+    {"field": "radius_mean", "code": "out_of_range",
+     "message": "radius_mean must be between 6.2829 and 29.5155 (got 99)"}
+
+Codes: not_object (field is None), missing, not_numeric, not_finite, out_of_range.
+Every schema feature is needed to score, so every one must be present; keys
+that are not schema features are ignored.
+"""
+
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+FieldError = Dict[str, Optional[str]]
+
+# Longest input value quoted back in a not_numeric message
+MAX_VALUE_REPR = 40
+
+
+class ValidatedBatch(NamedTuple):
+    """Result of SchemaValidator.validate_many."""
+
+    X: np.ndarray  # (n_valid, n_features), schema order
+    records: List[Dict[str, float]]  # the same rows as {feature: value}
+    indices: List[int]  # input position of each valid row
+    # input position -> errors, for each invalid row
+    errors: Dict[int, List[FieldError]]
+    feature_names: Tuple[str, ...]
+
+
+def _field_error(field: Optional[str], code: str, message: str) -> FieldError:
+    return {"field": field, "code": code, "message": message}
+
+
+def error_message(errors: List[FieldError]) -> str:
+    """One-line summary of a record's errors."""
+    return "; ".join(e["message"] for e in errors)
+
+
+class SchemaValidator:
+    """
+    Validates payloads for one schema. Bounds missing from the schema are
+    open (+/-inf); with enforce_bounds=False only types and NaN/inf are checked.
+    """
+
+    def __init__(
+        self,
+        feature_names: Sequence[str],
+        lower: np.ndarray,
+        upper: np.ndarray,
+        enforce_bounds: bool = True,
+    ):
+        self.feature_names = tuple(feature_names)
+        self.index = {name: j for j, name in enumerate(self.feature_names)}
+        self.lower = np.asarray(lower, dtype=np.float64)
+        self.upper = np.asarray(upper, dtype=np.float64)
+        self.enforce_bounds = enforce_bounds
+
+    @classmethod
+    def from_schema(
+        cls, schema: Dict, enforce_bounds: bool = True
+    ) -> "SchemaValidator":
+        features = schema["features"]
+        lower = [
+            float(f["min"]) if f.get("min") is not None else -np.inf for f in features
+        ]
+        upper = [
+            float(f["max"]) if f.get("max") is not None else np.inf for f in features
+        ]
+        return cls([f["name"] for f in features], lower, upper, enforce_bounds)
+
+    def _convert_row(
+        self, payload: Any, out: np.ndarray
+    ) -> List[Tuple[int, FieldError]]:
+        """
+        Fill out with one payload's values; (column, error) for every
+        field that has none.
+        """
+        if not isinstance(payload, dict):
+            return [
+                (-1, _field_error(None, "not_object", "Input must be a JSON object"))
+            ]
+        errors = []
+        for j, name in enumerate(self.feature_names):
+            if name not in payload:
+                errors.append((j, _field_error(name, "missing", f"{name} is required")))
+                continue
+            value = payload[name]
+            try:
+                out[j] = float(value)
+            except (TypeError, ValueError, OverflowError):
+                shown = repr(value)
+                if len(shown) > MAX_VALUE_REPR:
+                    shown = shown[:MAX_VALUE_REPR] + "..."
+                errors.append(
+                    (
+                        j,
+                        _field_error(
+                            name,
+                            "not_numeric",
+                            f"{name} must be a number (got {shown})",
+                        ),
+                    )
+                )
+        return errors
+
+    def _range_message(self, j: int, value: float) -> str:
+        name, lo, hi = self.feature_names[j], self.lower[j], self.upper[j]
+        if np.isfinite(lo) and np.isfinite(hi):
+            return f"{name} must be between {lo:g} and {hi:g} (got {value:g})"
+        if np.isfinite(lo):
+            return f"{name} must be at least {lo:g} (got {value:g})"
+        return f"{name} must be at most {hi:g} (got {value:g})"
+
+    def validate_many(
+        self, payloads: List[Any], enforce_bounds: Optional[bool] = None
+    ) -> ValidatedBatch:
+        """
+        Convert and check a batch of payloads in one pass (a single payload is
+        a batch of one).
+        """
+        if enforce_bounds is None:
+            enforce_bounds = self.enforce_bounds
+        n, m = len(payloads), len(self.feature_names)
+        names = self.feature_names
+        try:
+            X = np.array(
+                [[p[name] for name in names] for p in payloads], dtype=np.float64
+            )
+            if X.shape != (n, m):
+                raise ValueError("nested values")
+        except (KeyError, TypeError, ValueError, IndexError, OverflowError):
+            X = np.full((n, m), np.nan)
+            suspect = np.ones(n, dtype=bool)
+        else:
+            # None and NaN both arrive as NaN; rows with any non-finite value are
+            # re-read field by field
+            suspect = ~np.isfinite(X).all(axis=1)
+
+        row_errors: Dict[int, List[Tuple[int, FieldError]]] = {}
+        unreadable = np.zeros((n, m), dtype=bool)
+        for i in np.flatnonzero(suspect):
+            errors = self._convert_row(payloads[i], X[i])
+            if errors:
+                row_errors[int(i)] = errors
+                if errors[0][0] == -1:
+                    unreadable[i] = True
+                else:
+                    unreadable[i, [j for j, _ in errors]] = True
+
+        not_finite = ~np.isfinite(X) & ~unreadable
+        out_of_range = (
+            (X < self.lower) | (X > self.upper)
+            if enforce_bounds
+            else np.zeros((n, m), dtype=bool)
+        )
+        for i, j in np.argwhere(not_finite | out_of_range):
+            name = names[j]
+            if not_finite[i, j]:
+                error = _field_error(
+                    name, "not_finite", f"{name} must be a finite number"
+                )
+            else:
+                error = _field_error(
+                    name, "out_of_range", self._range_message(j, X[i, j])
+                )
+            row_errors.setdefault(int(i), []).append((int(j), error))
+
+        errors = {
+            i: [e for _, e in sorted(pairs, key=lambda pair: pair[0])]
+            for i, pairs in sorted(row_errors.items())
+        }
+        if errors:
+            valid = np.ones(n, dtype=bool)
+            valid[list(errors)] = False
+            indices = np.flatnonzero(valid).tolist()
+            X = X[valid]
+        else:
+            indices = list(range(n))
+        records = [dict(zip(names, row)) for row in X.tolist()]
+        return ValidatedBatch(X, records, indices, errors, names)
+
+    def matrix(self, records: List[Dict[str, float]]) -> np.ndarray:
+        """
+        Schema-ordered matrix of records that should already be valid (types only,
+        no bounds). Raises ValueError naming the first problem otherwise.
+        """
+        try:
+            X = np.array(
+                [[d[name] for name in self.feature_names] for d in records],
+                dtype=np.float64,
+            )
+            if (
+                X.shape == (len(records), len(self.feature_names))
+                and np.isfinite(X).all()
+            ):
+                return X
+        except (KeyError, TypeError, ValueError, IndexError, OverflowError):
+            pass
+        batch = self.validate_many(records, enforce_bounds=False)
+        if batch.errors:
+            raise ValueError(error_message(next(iter(batch.errors.values()))))
+        return batch.X
@@ -0,0 +1,331 @@
+# ingest.py
+#
+# Convert a training CSV once into a typed columnar cache, then memory-map the
+# columns a training run needs instead of re-parsing the CSV every time.
+#
+#   python ingest.py data.csv          # build or validate the cache, print its manifest
+#   python ingest.py data.csv --force   # rebuild even if the source is unchanged
+#
+# Layout: <cache_dir>/<csv stem>/manifest.json plus one .npy file per column.
+# Float columns are stored as float32 when that is lossless for the source's
+# decimal precision (e.g. 0.07871 at 5 decimals); load_frame() rounds them back
+# to exactly the float64 values pandas would have parsed. Other floats stay
+# float64. Integers use the smallest integer type that holds their range, and
+# text columns are stored as integer codes with the category list in the
+# manifest. The manifest records the source's SHA-256; when the file changes
+# (size, mtime, then hash), the cache is rebuilt on the next load.
+import argparse, hashlib, json, os, pathlib, shutil, time
+import numpy as np
+import pandas as pd
+
+FORMAT = "columnar-npy-1"
+CHUNK_ROWS = 100_000
+# Rows copied per block when finalizing a column, to bound memory
+COPY_BLOCK = 1_000_000
+# Most decimals looked for in a float column before keeping it as float64
+MAX_DECIMALS = 15
+# float32 holds integers below 2**24; 2**23 leaves room to round back exactly
+FLOAT32_EXACT = 2**23
+
+
+def content_hash(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def dataset_dir(csv_path, cache_dir):
+    return pathlib.Path(cache_dir) / "datasets" / pathlib.Path(csv_path).stem
+
+
+def _read_manifest(directory):
+    try:
+        return json.loads((directory / "manifest.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def is_fresh(csv_path, directory, manifest=None):
+    """
+    True if the cache in `directory` was built from the current contents of csv_path.
+    Size and mtime are checked first; the file is only hashed when they differ,
+    and a touched-but-identical file just refreshes the recorded mtime.
+    """
+    manifest = manifest if manifest is not None else _read_manifest(directory)
+    if not manifest or manifest.get("format") != FORMAT:
+        return False
+    stat = os.stat(csv_path)
+    source = manifest["source"]
+    if stat.st_size != source["size"]:
+        return False
+    if stat.st_mtime_ns == source["mtime_ns"]:
+        return True
+    if content_hash(csv_path) != source["sha256"]:
+        return False
+    source["mtime_ns"] = stat.st_mtime_ns
+    _write_manifest(directory, manifest)
+    return True
+
+
+def _write_manifest(directory, manifest):
+    tmp = directory / "manifest.json.tmp"
+    tmp.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    os.replace(tmp, directory / "manifest.json")
+
+
+def _decimals(values):
+    """
+    Fewest decimals that represent every finite value exactly, or None
+    past MAX_DECIMALS.
+    """
+    values = values[np.isfinite(values)]
+    for d in range(MAX_DECIMALS + 1):
+        if np.array_equal(np.round(values, d), values):
+            return d
+    return None
+
+
+def _storage_dtype(col):
+    """Smallest dtype that holds a column without losing the source values."""
+    if col["kind"] == "f":
+        d = col["decimals"]
+        if d is not None and col["absmax"] * 10**d < FLOAT32_EXACT:
+            return np.dtype(np.float32)
+        return np.dtype(np.float64)
+    if col["kind"] == "category":
+        return np.min_scalar_type(max(len(col["categories"]) - 1, 0))
+    if col["lo"] is None:
+        return np.dtype(np.int8)
+    return np.result_type(np.min_scalar_type(col["lo"]), np.min_scalar_type(col["hi"]))
+
+
+def _column_kind(series):
+    """
+    'f' for float columns, 'i' for integer/bool columns, 'category' for
+    anything else (text).
+    """
+    if pd.api.types.is_float_dtype(series.dtype):
+        return "f"
+    if pd.api.types.is_integer_dtype(series.dtype) or pd.api.types.is_bool_dtype(
+        series.dtype
+    ):
+        return "i"
+    return "category"
+
+
+def _promote_to_float(col, raw_path):
+    """
+    Rewrite a column's int64 raw file as float64 once a chunk turns out to hold floats.
+    """
+    col["raw"].close()
+    values = np.fromfile(raw_path, dtype=np.int64).astype(np.float64)
+    values.tofile(raw_path)
+    col["raw"] = open(raw_path, "ab")
+    col["kind"] = "f"
+    if col["lo"] is not None:
+        col["decimals"], col["absmax"] = 0, float(max(abs(col["lo"]), abs(col["hi"])))
+
+
+def build(csv_path, cache_dir, drop_cols=(), chunk_rows=CHUNK_ROWS):
+    """
+    Convert csv_path into the columnar cache and return the manifest.
+    The CSV is read in chunks of chunk_rows, so memory stays bounded by the
+    chunk size rather than the file size.
+    """
+    csv_path = pathlib.Path(csv_path)
+    directory = dataset_dir(csv_path, cache_dir)
+    staging = directory.with_name(directory.name + ".building")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+
+    stat = os.stat(csv_path)
+    sha256 = content_hash(csv_path)
+
+    # Pass 1: append each chunk to a wide raw file per column, tracking
+    # ranges and categories
+    columns = {}
+    rows = 0
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+        chunk = chunk.drop(columns=[c for c in drop_cols if c in chunk.columns])
+        for name in chunk.columns:
+            series = chunk[name]
+            col = columns.get(name)
+            if col is None:
+                kind = _column_kind(series)
+                col = columns[name] = {
+                    "index": len(columns),
+                    "kind": kind,
+                    "categories": {} if kind == "category" else None,
+                    "lo": None,
+                    "hi": None,
+                    "decimals": 0,
+                    "absmax": 0.0,
+                    "raw": open(staging / f"{len(columns):04d}.raw", "wb"),
+                }
+            if col["kind"] == "category":
+                codes = np.array(
+                    [
+                        col["categories"].setdefault(v, len(col["categories"]))
+                        for v in series.astype(str)
+                    ],
+                    dtype=np.int64,
+                )
+                values = codes
+            else:
+                if _column_kind(series) == "f" and col["kind"] == "i":
+                    # A later chunk has NaNs or decimals; the whole column becomes float
+                    _promote_to_float(col, staging / f"{col['index']:04d}.raw")
+                values = series.to_numpy(
+                    dtype=np.float64 if col["kind"] == "f" else np.int64
+                )
+            if col["kind"] == "i" and len(values):
+                lo, hi = int(values.min()), int(values.max())
+                col["lo"] = lo if col["lo"] is None else min(col["lo"], lo)
+                col["hi"] = hi if col["hi"] is None else max(col["hi"], hi)
+            elif col["kind"] == "f" and col["decimals"] is not None:
+                d = _decimals(values)
+                finite = values[np.isfinite(values)]
+                col["decimals"] = None if d is None else max(col["decimals"], d)
+                col["absmax"] = max(
+                    col["absmax"], float(np.abs(finite).max()) if len(finite) else 0.0
+                )
+            values.astype(np.float64 if col["kind"] == "f" else np.int64).tofile(
+                col["raw"]
+            )
+        rows += len(chunk)
+
+    # Pass 2: downcast each raw column into its final .npy, a block at a time
+    manifest_columns = {}
+    for name, col in columns.items():
+        col["raw"].close()
+        raw_path = staging / f"{col['index']:04d}.raw"
+        wide = np.float64 if col["kind"] == "f" else np.int64
+        raw = (
+            np.memmap(raw_path, dtype=wide, mode="r", shape=(rows,))
+            if rows
+            else np.zeros(0, wide)
+        )
+        dtype = _storage_dtype(col)
+        filename = f"{col['index']:04d}.npy"
+        out = np.lib.format.open_memmap(
+            staging / filename, mode="w+", dtype=dtype, shape=(rows,)
+        )
+        for start in range(0, rows, COPY_BLOCK):
+            out[start : start + COPY_BLOCK] = raw[start : start + COPY_BLOCK]
+        out.flush()
+        del out, raw
+        raw_path.unlink()
+        manifest_columns[name] = {"file": filename, "dtype": np.dtype(dtype).name}
+        if col["kind"] == "category":
+            manifest_columns[name]["categories"] = list(col["categories"])
+        elif dtype == np.float32:
+            manifest_columns[name]["decimals"] = col["decimals"]
+
+    manifest = {
+        "format": FORMAT,
+        "source": {
+            "path": str(csv_path.resolve()),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": sha256,
+        },
+        "rows": rows,
+        "dropped": list(drop_cols),
+        "built_at": time.time(),
+        "columns": manifest_columns,
+    }
+    _write_manifest(staging, manifest)
+    # Swap the finished cache in; a concurrent reader sees either the old or the new one
+    if directory.exists():
+        old = directory.with_name(directory.name + ".old")
+        shutil.rmtree(old, ignore_errors=True)
+        os.replace(directory, old)
+        os.replace(staging, directory)
+        shutil.rmtree(old, ignore_errors=True)
+    else:
+        os.replace(staging, directory)
+    return manifest
+
+
+def ensure(csv_path, cache_dir, drop_cols=(), force=False):
+    """
+    The cache directory and manifest for csv_path, rebuilt first if it is
+    missing or stale.
+    """
+    directory = dataset_dir(csv_path, cache_dir)
+    manifest = _read_manifest(directory)
+    if force or not is_fresh(csv_path, directory, manifest):
+        manifest = build(csv_path, cache_dir, drop_cols=drop_cols)
+    return directory, manifest
+
+
+def load_columns(directory, manifest, names):
+    """
+    Memory-map the requested columns (read-only). Text columns come back
+    as integer codes.
+    """
+    missing = [n for n in names if n not in manifest["columns"]]
+    if missing:
+        raise KeyError(f"columns not in the dataset cache: {missing}")
+    return {
+        name: np.load(directory / manifest["columns"][name]["file"], mmap_mode="r")
+        for name in names
+    }
+
+
+def load_frame(directory, manifest, names):
+    """
+    The requested columns as a float64 DataFrame with the source's exact values.
+    Only these columns are read from disk; float32 columns are rounded back to
+    their recorded decimals.
+    """
+    arrays = load_columns(directory, manifest, names)
+    data = {}
+    for name in names:
+        values = np.asarray(arrays[name], dtype=np.float64)
+        decimals = manifest["columns"][name].get("decimals")
+        data[name] = np.round(values, decimals) if decimals is not None else values
+    return pd.DataFrame(data)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(
+        description="Build the columnar cache for a training CSV."
+    )
+    p.add_argument("csv", help="source CSV file")
+    p.add_argument(
+        "--cache-dir", default=".train_cache", help="cache root (default: %(default)s)"
+    )
+    p.add_argument(
+        "--drop", nargs="*", default=["id", "Unnamed: 32"], help="columns to leave out"
+    )
+    p.add_argument(
+        "--force", action="store_true", help="rebuild even if the source is unchanged"
+    )
+    args = p.parse_args(argv)
+
+    start = time.perf_counter()
+    directory, manifest = ensure(
+        args.csv, args.cache_dir, drop_cols=args.drop, force=args.force
+    )
+    elapsed = time.perf_counter() - start
+    size = sum(f.stat().st_size for f in directory.glob("*.npy"))
+    print(
+        f"{directory}: {manifest['rows']} rows, {len(manifest['columns'])} columns, "
+        f"{size / 1e6:.2f} MB ({elapsed:.2f}s)"
+    )
+    print(f"source sha256 {manifest['source']['sha256']}")
+    for name, col in manifest["columns"].items():
+        if "categories" in col:
+            extra = f" {col['categories']}"
+        elif "decimals" in col:
+            extra = f" ({col['decimals']} decimals)"
+        else:
+            extra = ""
+        print(f"  {name:<28} {col['dtype']}{extra}")
+
+
+if __name__ == "__main__":
+    main()
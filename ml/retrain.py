@@ -0,0 +1,467 @@
+# retrain.py
+#
+# Retrain from doctor confirmations without re-reading the whole database.
+#
+#   python retrain.py --base-model model_out      # -> retrained/<next version>/
+#   python retrain.py --base-model ../registry/wdbc-calibrated-1.0 \
+#       --version wdbc-calibrated-1.1
+#
+# 1. extract: confirmed submissions newer than the stored watermark are read
+#    from the backend database (via the confirmed_at index) and appended as a
+#    new segment to <cache-dir>/confirmations/. Only new confirmations are
+#    read; a re-confirmed submission is appended again and its latest label wins.
+# 2. load: the base CSV (columnar cache, see ingest.py) plus every segment.
+# 3. refit: the logistic regression starts from the previous model's
+#    coefficients (warm start), which saves iterations when the new
+#    confirmations agree with what the model already learned, and is then
+#    recalibrated (sigmoid) on a held-out calibration split.
+#    Only extraction is incremental: the scaler and the regression are refit
+#    on the full history (base CSV + every confirmation) each run, so refit
+#    time and memory grow with the number of confirmations. That is cheap at
+#    this dataset's size; an update from only the new rows (partial_fit with
+#    running scaler statistics) would need its own drift safeguards.
+# 4. evaluate: previous vs new model on the base test split and on a fixed
+#    holdout of confirmed submissions (a fixed 1/HOLDOUT_MODULUS by hashed id).
+# 5. export: a new versioned model directory plus retrain_report.json.
+import argparse, json, os, pathlib, pickle, re, shutil, sys
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.linear_model import LogisticRegression
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.frozen import FrozenEstimator
+from sklearn.metrics import roc_auc_score, brier_score_loss, log_loss, accuracy_score
+
+# train_model puts backend/ on sys.path
+import train_model
+from train_model import (
+    stage,
+    load_data,
+    export_artifacts,
+    print_timings,
+    CACHE_DIR,
+    CSV_PATH,
+)
+from inference.compiled import compile_model, fold_estimator, load_artifact
+
+SEGMENT_FORMAT = 1
+# Rows per segment file while extracting, to bound memory
+SEGMENT_ROWS = 50_000
+# Re-scan this far behind the watermark for confirmations that committed late
+OVERLAP = timedelta(seconds=60)
+# One in HOLDOUT_MODULUS confirmed submissions (by hashed id) is only
+# used for evaluation
+HOLDOUT_MODULUS = 5
+# LogisticRegression settings carried over from the previous model
+LOGREG_PARAMS = (
+    "C",
+    "class_weight",
+    "fit_intercept",
+    "max_iter",
+    "random_state",
+    "solver",
+    "tol",
+)
+CALIBRATION_FRACTION = 0.2
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(
+        description="Incrementally retrain from confirmed submissions."
+    )
+    p.add_argument(
+        "--base-model",
+        default=train_model.OUT_DIR,
+        help="directory of the model to start from (default: %(default)s)",
+    )
+    p.add_argument(
+        "--version",
+        help="new model version "
+        "(default: previous version with its last number bumped)",
+    )
+    p.add_argument("--out", help="output directory (default: retrained/<version>)")
+    p.add_argument(
+        "--data", default=CSV_PATH, help="base training CSV (default: %(default)s)"
+    )
+    p.add_argument(
+        "--cache-dir",
+        default=CACHE_DIR,
+        help="dataset and confirmation cache (default: %(default)s)",
+    )
+    p.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="drop extracted confirmations and re-read them all",
+    )
+    p.add_argument(
+        "--force",
+        action="store_true",
+        help="retrain even if there are no new confirmations",
+    )
+    p.add_argument("--seed", type=int, default=42)
+    return p.parse_args(argv)
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+    import django
+
+    django.setup()
+
+
+def next_version(version):
+    """
+    'wdbc-calibrated-1.0' -> 'wdbc-calibrated-1.1'; versions without a number get '-r1'.
+    """
+    match = re.search(r"(\d+)(?!.*\d)", version)
+    if not match:
+        return f"{version}-r1"
+    return f"{version[:match.start()]}{int(match.group(1)) + 1}{version[match.end():]}"
+
+
+# ---- confirmation segments ----
+
+
+def _segments_dir(cache_dir):
+    return pathlib.Path(cache_dir) / "confirmations"
+
+
+def _read_segments_manifest(directory, feature_names):
+    try:
+        manifest = json.loads((directory / "manifest.json").read_text(encoding="utf-8"))
+        if (
+            manifest["format"] == SEGMENT_FORMAT
+            and manifest["feature_names"] == feature_names
+        ):
+            return manifest
+        print("Confirmation cache was built for a different schema; re-extracting")
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+
+def _write_segments_manifest(directory, manifest):
+    tmp = directory / "manifest.json.tmp"
+    tmp.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    os.replace(tmp, directory / "manifest.json")
+
+
+def extract_confirmations(cache_dir, feature_names, rebuild=False):
+    """
+    Append confirmations newer than the watermark as segment files. Returns the
+    number of rows appended. Rows whose payload doesn't fit the schema are skipped.
+    """
+    from django.utils import timezone
+    from api.models import Submission
+    from api.replay import payload_matrix
+
+    directory = _segments_dir(cache_dir)
+    manifest = None if rebuild else _read_segments_manifest(directory, feature_names)
+    if manifest is None:
+        shutil.rmtree(directory, ignore_errors=True)
+        manifest = {
+            "format": SEGMENT_FORMAT,
+            "feature_names": feature_names,
+            "segments": [],
+            "watermark": None,
+            "recent": [],
+        }
+    directory.mkdir(parents=True, exist_ok=True)
+
+    rows = Submission.objects.filter(
+        confirmed_at__isnull=False, confirmed_label__isnull=False
+    )
+    watermark = manifest["watermark"]
+    if watermark:
+        rows = rows.filter(
+            confirmed_at__gte=datetime.fromisoformat(watermark) - OVERLAP
+        )
+    rows = rows.order_by("confirmed_at", "id").values_list(
+        "id", "input_json", "confirmed_label", "confirmed_at"
+    )
+    # (id, confirmed_at) pairs already extracted inside the overlap window
+    seen = {tuple(pair) for pair in manifest["recent"]}
+
+    appended = skipped = 0
+    batch = []
+
+    def flush():
+        nonlocal appended, skipped
+        if not batch:
+            return
+        ids, payloads, labels, confirmed_at = zip(*batch)
+        X, valid = payload_matrix(list(payloads), feature_names)
+        skipped += int((~valid).sum())
+        name = f"segment-{len(manifest['segments']) + 1:06d}.npz"
+        np.savez(
+            directory / name,
+            ids=np.asarray(ids, dtype=np.int64)[valid],
+            X=X[valid],
+            y=np.asarray(labels, dtype=np.int8)[valid],
+            confirmed_at=np.asarray([t.timestamp() for t in confirmed_at])[valid],
+        )
+        appended += int(valid.sum())
+        last = confirmed_at[-1]
+        cutoff = last - OVERLAP
+        manifest["segments"].append({"file": name, "rows": int(valid.sum())})
+        manifest["watermark"] = last.isoformat()
+        manifest["recent"] = [
+            [i, t] for i, t in manifest["recent"] if datetime.fromisoformat(t) >= cutoff
+        ]
+        manifest["recent"] += [
+            [i, t.isoformat()] for i, t in zip(ids, confirmed_at) if t >= cutoff
+        ]
+        _write_segments_manifest(directory, manifest)
+        batch.clear()
+
+    for submission_id, payload, label, confirmed_at in rows.iterator(chunk_size=2000):
+        if timezone.is_naive(confirmed_at):
+            confirmed_at = timezone.make_aware(confirmed_at)
+        if (submission_id, confirmed_at.isoformat()) in seen:
+            continue
+        batch.append((submission_id, payload, label, confirmed_at))
+        if len(batch) >= SEGMENT_ROWS:
+            flush()
+    flush()
+    _write_segments_manifest(directory, manifest)
+    if skipped:
+        print(
+            f"Skipped {skipped} confirmed submissions with incomplete "
+            "or non-numeric input"
+        )
+    return appended
+
+
+def load_confirmations(cache_dir, feature_names):
+    """
+    (ids, X, y) of every extracted confirmation; the latest label of each
+    submission wins.
+    """
+    directory = _segments_dir(cache_dir)
+    manifest = _read_segments_manifest(directory, feature_names)
+    ids, X, y = (
+        [np.zeros(0, np.int64)],
+        [np.zeros((0, len(feature_names)))],
+        [np.zeros(0, np.int8)],
+    )
+    for segment in (manifest or {}).get("segments", []):
+        with np.load(directory / segment["file"]) as data:
+            ids.append(data["ids"])
+            X.append(data["X"])
+            y.append(data["y"])
+    ids, X, y = np.concatenate(ids), np.concatenate(X), np.concatenate(y)
+    # Segments are in confirmation order: keep each id's last occurrence
+    _, last = np.unique(ids[::-1], return_index=True)
+    keep = np.sort(len(ids) - 1 - last)
+    return ids[keep], X[keep], y[keep]
+
+
+def is_holdout(ids):
+    """Stable holdout membership: the same submission is held out on every run."""
+    # Knuth multiplicative hash, so id patterns (e.g. every 10th row
+    # confirmed) don't skew it
+    return (
+        ids.astype(np.uint64) * np.uint64(2654435761) % np.uint64(2**32)
+    ) % HOLDOUT_MODULUS == 0
+
+
+# ---- refit ----
+
+
+def load_previous(model_dir):
+    with open(pathlib.Path(model_dir) / "model_pipeline.pkl", "rb") as f:
+        obj = pickle.load(f)
+    return obj["pipeline"] if isinstance(obj, dict) else obj
+
+
+def previous_linear_model(model_dir, previous, feature_cols):
+    """
+    (raw-space weights, bias, LogisticRegression params) averaged over the previous
+    model's calibration folds, or None if it is not a linear model.
+    """
+    try:
+        compiled, _ = load_artifact(model_dir)
+    except (OSError, ValueError, KeyError):
+        try:
+            compiled = compile_model(previous, feature_cols)
+        except ValueError:
+            return None
+    if compiled.feature_names != list(feature_cols):
+        return None
+    folds = (
+        previous.calibrated_classifiers_
+        if hasattr(previous, "calibrated_classifiers_")
+        else []
+    )
+    est = fold_estimator(folds[0]) if folds else previous
+    clf = est.steps[-1][1] if hasattr(est, "steps") else est
+    params = (
+        {k: v for k, v in clf.get_params().items() if k in LOGREG_PARAMS}
+        if isinstance(clf, LogisticRegression)
+        else {}
+    )
+    return compiled.weights.mean(axis=0), float(compiled.biases.mean()), params
+
+
+def refit(X_train, y_train, feature_cols, warm, seed):
+    """
+    Warm-started (when possible) logistic regression, recalibrated on a held-out split.
+    """
+    X_fit, X_cal, y_fit, y_cal = train_test_split(
+        X_train,
+        y_train,
+        test_size=CALIBRATION_FRACTION,
+        random_state=seed,
+        stratify=y_train,
+    )
+    pre = ColumnTransformer(
+        [("num", StandardScaler(), feature_cols)], remainder="drop"
+    ).fit(X_fit)
+    if warm is not None:
+        weights, bias, params = warm
+        clf = (
+            LogisticRegression(**{**params, "warm_start": True})
+            if params
+            else LogisticRegression(
+                max_iter=500,
+                class_weight="balanced",
+                random_state=seed,
+                warm_start=True,
+            )
+        )
+        scaler = pre.named_transformers_["num"]
+        # Previous decision function in the new scaler's space: w.x + b =
+        # (w*s).z + (w.m + b)
+        clf.coef_ = (weights * scaler.scale_)[np.newaxis, :]
+        clf.intercept_ = np.array([bias + weights @ scaler.mean_])
+    else:
+        clf = LogisticRegression(
+            max_iter=500, class_weight="balanced", random_state=seed
+        )
+    clf.fit(pre.transform(X_fit), y_fit)
+    clf.set_params(warm_start=False)
+    pipeline = Pipeline([("pre", pre), ("clf", clf)])
+
+    calib = CalibratedClassifierCV(FrozenEstimator(pipeline), method="sigmoid")
+    calib.fit(X_cal, y_cal)
+    return calib, int(np.max(clf.n_iter_))
+
+
+def evaluate(model, X, y):
+    if len(y) == 0:
+        return None
+    proba = model.predict_proba(X)[:, 1]
+    return {
+        "n": int(len(y)),
+        "roc_auc": float(roc_auc_score(y, proba)) if len(set(y)) == 2 else None,
+        "brier": float(brier_score_loss(y, proba)),
+        "log_loss": float(log_loss(y, proba, labels=[0, 1])),
+        "accuracy": float(accuracy_score(y, (proba >= 0.5).astype(int))),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    base_dir = pathlib.Path(args.base_model)
+    previous_version = (base_dir / "version.txt").read_text(encoding="utf-8").strip()
+    version = args.version or next_version(previous_version)
+    out = pathlib.Path(args.out or pathlib.Path("retrained") / version)
+    schema = json.loads((base_dir / "schema.json").read_text(encoding="utf-8"))
+    feature_cols = [f["name"] for f in schema["features"]]
+
+    with stage("extract"):
+        setup_django()
+        new_rows = extract_confirmations(
+            args.cache_dir, feature_cols, rebuild=args.rebuild
+        )
+    print(f"{new_rows} new confirmations extracted")
+    if not new_rows and not args.force:
+        print("Nothing to retrain (use --force to retrain anyway)")
+        return
+
+    with stage("load"):
+        X_base, y_base, base_cols = load_data(args.data, args.cache_dir)
+        if base_cols != feature_cols:
+            sys.exit(f"{args.data} does not have the base model's schema features")
+        ids, X_conf, y_conf = load_confirmations(args.cache_dir, feature_cols)
+        X_conf = pd.DataFrame(X_conf, columns=feature_cols)
+        # Same split as train_model.py, so the base test rows stay unseen
+        X_train, X_test, y_train, y_test = train_test_split(
+            X_base, y_base, test_size=0.2, random_state=args.seed, stratify=y_base
+        )
+        holdout = is_holdout(ids)
+        X_train = pd.concat([X_train, X_conf[~holdout]], ignore_index=True)
+        y_train = np.concatenate([y_train, y_conf[~holdout]])
+    print(
+        f"Training rows: {len(y_train)} ({len(y_base)} base, {len(ids)} confirmed, "
+        f"{int(holdout.sum())} confirmed held out)"
+    )
+
+    with stage("refit"):
+        previous = load_previous(base_dir)
+        warm = previous_linear_model(base_dir, previous, feature_cols)
+        if warm is None:
+            print("Previous model is not linear; fitting from scratch")
+        calib, n_iter = refit(X_train, y_train, feature_cols, warm, args.seed)
+    print(
+        "Logistic regression "
+        f"{'warm-started' if warm else 'cold-started'}, {n_iter} iterations"
+    )
+
+    with stage("evaluate"):
+        X_holdout, y_holdout = X_conf[holdout], y_conf[holdout]
+        metrics = {
+            split: {"previous": evaluate(previous, X, y), "new": evaluate(calib, X, y)}
+            for split, (X, y) in {
+                "base_test": (X_test, y_test),
+                "confirmed_holdout": (X_holdout, y_holdout),
+            }.items()
+        }
+    print(f"\n{'':<20}{'':<10}{'AUC':>8}{'Brier':>8}{'LogLoss':>9}{'Acc':>7}")
+    for split, pair in metrics.items():
+        for name, m in pair.items():
+            if m is None:
+                continue
+            auc = f"{m['roc_auc']:.4f}" if m["roc_auc"] is not None else "-"
+            scores = f"{m['brier']:>8.4f}{m['log_loss']:>9.4f}{m['accuracy']:>7.3f}"
+            print(f"{split:<20}{name:<10}{auc:>8}{scores}")
+
+    with stage("export"):
+        out.mkdir(parents=True, exist_ok=True)
+        X_all = pd.concat([X_base, X_conf], ignore_index=True)
+        saved = export_artifacts(
+            calib, X_train, X_all, feature_cols, out, version, args.seed, schema=schema
+        )
+        report = {
+            "version": version,
+            "previous_version": previous_version,
+            "base_model": str(base_dir.resolve()),
+            "created_at": datetime.now().astimezone().isoformat(),
+            "rows": {
+                "base": int(len(y_base)),
+                "confirmed": int(len(ids)),
+                "new_confirmations": new_rows,
+                "confirmed_holdout": int(holdout.sum()),
+                "training": int(len(y_train)),
+            },
+            "warm_start": warm is not None,
+            "iterations": n_iter,
+            "metrics": metrics,
+        }
+        (out / "retrain_report.json").write_text(
+            json.dumps(report, indent=2), encoding="utf-8"
+        )
+
+    print("\nSaved:")
+    for path in saved + [out / "retrain_report.json"]:
+        print(" -", path)
+    print_timings()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,60 @@
 # train_model.py
-import json, pickle, pathlib, warnings
+#
+# Train, calibrate and export the WDBC classifier.
+#
+#   python train_model.py                          # original two-candidate comparison
+#   python train_model.py --search wide --halving  # wider grid with successive halving
+#   python train_model.py --jobs 8 --out model_out --version wdbc-calibrated-1.1
+#
+# The CSV is converted once into a columnar cache under --cache-dir (see
+# ingest.py) and later runs memory-map the feature columns from it; the cache
+# is rebuilt when the CSV changes. Candidates and CV folds are evaluated in
+# parallel (--jobs). The fitted scaler for each fold is cached on disk too, so
+# candidates after the first reuse it instead of refitting it.
+import argparse, json, pickle, pathlib, shutil, sys, time, warnings
+from contextlib import contextmanager
 import numpy as np
 import pandas as pd
 
-from sklearn.model_selection import train_test_split, StratifiedKFold, cross_val_score
+# Enables HalvingGridSearchCV
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import (
+    train_test_split,
+    StratifiedKFold,
+    GridSearchCV,
+    HalvingGridSearchCV,
+)
 from sklearn.preprocessing import StandardScaler
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 from sklearn.linear_model import LogisticRegression
-from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
 from sklearn.calibration import CalibratedClassifierCV
+from sklearn.cluster import KMeans
 from sklearn.metrics import roc_auc_score, classification_report, confusion_matrix
 
+# Reuse the backend's compiler so the exported arrays match what it loads
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "backend"))
+from inference.compiled import (
+    ARRAYS_FILENAME,
+    MANIFEST_FILENAME,
+    compile_model,
+    probe_matrix,
+    save_artifact,
+    verify_parity,
+)
+from inference.drift import build_reference, save_reference
+
+import ingest
+
 warnings.filterwarnings("ignore", category=UserWarning)
 
 CSV_PATH = "data.csv"         # Kaggle WDBC file you downloaded
 TARGET_COL = "diagnosis"      # 'M' or 'B'
 DROP_COLS = ["id", "Unnamed: 32"]  # harmless if missing
-
-# Load & clean
-df = pd.read_csv(CSV_PATH)
-for c in DROP_COLS:
-    if c in df.columns:
-        df = df.drop(columns=[c])
-
-# Encode labels: M=1 (malignant), B=0 (benign)
-df[TARGET_COL] = (df[TARGET_COL].astype(str).str.upper() == "M").astype(int)
+MODEL_VERSION = "wdbc-calibrated-1.0"
+OUT_DIR = "model_out"
+CACHE_DIR = ".train_cache"
 
 # Features/target  — compact hybrid: 10 means + 4 worst + 2 se = 16 features
 HYBRID_16 = [
@@ -38,79 +67,340 @@ HYBRID_16 = [
     "radius_se", "concavity_se",
 ]
 
-feature_cols = [c for c in HYBRID_16 if c in df.columns]
-missing = [c for c in HYBRID_16 if c not in df.columns]
-if missing:
-    print("Warning: missing columns in CSV:", missing)
+N_BACKGROUND = 20
 
-X = df[feature_cols].copy()
-y = df[TARGET_COL].values
+_timings = []
+
+
+@contextmanager
+def stage(name):
+    """Print the wall time of a training stage and keep it for the summary."""
+    start = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - start
+    _timings.append((name, elapsed))
+    print(f"[{name}] {elapsed:.2f}s")
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(
+        description="Train, calibrate and export the WDBC classifier."
+    )
+    p.add_argument(
+        "--data", default=CSV_PATH, help="WDBC CSV file (default: %(default)s)"
+    )
+    p.add_argument(
+        "--out", default=OUT_DIR, help="output directory (default: %(default)s)"
+    )
+    p.add_argument(
+        "--version",
+        default=MODEL_VERSION,
+        help="model version string (default: %(default)s)",
+    )
+    p.add_argument(
+        "--search",
+        choices=("default", "wide"),
+        default="default",
+        help="candidate set: 'default' compares LogReg and GBoost as shipped; "
+        "'wide' also searches hyperparameters and adds a random forest",
+    )
+    p.add_argument(
+        "--halving",
+        action="store_true",
+        help="successive halving: score all candidates on a subset, keep the best "
+        "1/factor on more rows, and so on",
+    )
+    p.add_argument(
+        "--halving-factor",
+        type=int,
+        default=3,
+        help="candidates kept per halving round: 1/N",
+    )
+    p.add_argument(
+        "--cv-folds",
+        type=int,
+        default=5,
+        help="folds for model selection and calibration",
+    )
+    p.add_argument(
+        "--jobs", type=int, default=-1, help="parallel workers (-1 = all cores)"
+    )
+    p.add_argument("--cache-dir", default=CACHE_DIR,
+                   help="dataset and fitted-preprocessing cache (default: %(default)s)")
+    p.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="read the CSV directly and don't cache preprocessing",
+    )
+    p.add_argument(
+        "--clear-cache", action="store_true", help="empty the cache directory first"
+    )
+    p.add_argument("--seed", type=int, default=42)
+    return p.parse_args(argv)
+
+
+def load_data(path, cache_dir=None):
+    """
+    Features (HYBRID_16 columns present in the file) and 0/1 target.
+    With a cache_dir the CSV is converted once into a columnar cache (see
+    ingest.py) and only the needed columns are memory-mapped from it.
+    """
+    if cache_dir is None:
+        df = pd.read_csv(path)
+        columns = [c for c in df.columns if c not in DROP_COLS]
+    else:
+        directory, manifest = ingest.ensure(path, cache_dir, drop_cols=DROP_COLS)
+        columns = list(manifest["columns"])
+
+    feature_cols = [c for c in HYBRID_16 if c in columns]
+    missing = [c for c in HYBRID_16 if c not in columns]
+    if missing:
+        print("Warning: missing columns in CSV:", missing)
+
+    # Encode labels: M=1 (malignant), B=0 (benign)
+    if cache_dir is None:
+        X = df[feature_cols].copy()
+        y = (df[TARGET_COL].astype(str).str.upper() == "M").astype(int).values
+    else:
+        X = ingest.load_frame(directory, manifest, feature_cols)
+        codes = ingest.load_columns(directory, manifest, [TARGET_COL])[TARGET_COL]
+        categories = manifest["columns"][TARGET_COL]["categories"]
+        y = np.array([str(c).upper() == "M" for c in categories])[codes].astype(int)
+    return X, y, feature_cols
+
+
+def candidate_grid(search, seed):
+    """
+    GridSearchCV param grid over the pipeline's 'clf' step, LogReg first (it wins ties).
+    """
+    logreg = LogisticRegression(
+        max_iter=500, class_weight="balanced", random_state=seed
+    )
+    gboost = GradientBoostingClassifier(random_state=seed)
+    if search == "default":
+        return [{"clf": [logreg]}, {"clf": [gboost]}]
+    return [
+        {"clf": [logreg], "clf__C": [0.01, 0.1, 1.0, 10.0, 100.0]},
+        {
+            "clf": [gboost],
+            "clf__n_estimators": [100, 300],
+            "clf__learning_rate": [0.05, 0.1],
+            "clf__max_depth": [2, 3],
+        },
+        {
+            "clf": [RandomForestClassifier(random_state=seed, class_weight="balanced")],
+            "clf__n_estimators": [200, 500],
+            "clf__max_depth": [None, 8],
+        },
+    ]
+
+
+def select_model(X_train, y_train, feature_cols, args, memory):
+    """
+    Pick the best candidate by CV ROC AUC. Returns the unfitted pipeline and the
+    search results.
+    """
+    pipeline = Pipeline(
+        [
+            (
+                "pre",
+                ColumnTransformer(
+                    [("num", StandardScaler(), feature_cols)], remainder="drop"
+                ),
+            ),
+            ("clf", LogisticRegression()),
+        ],
+        memory=memory,
+    )
+    grid = candidate_grid(args.search, args.seed)
+    cv = StratifiedKFold(n_splits=args.cv_folds, shuffle=True, random_state=args.seed)
+    # refit=False: calibration below fits its own clones, a refit here
+    # would be thrown away
+    if args.halving:
+        search = HalvingGridSearchCV(
+            pipeline,
+            grid,
+            cv=cv,
+            scoring="roc_auc",
+            factor=args.halving_factor,
+            n_jobs=args.jobs,
+            refit=False,
+            random_state=args.seed,
+        )
+    else:
+        search = GridSearchCV(
+            pipeline, grid, cv=cv, scoring="roc_auc", n_jobs=args.jobs, refit=False
+        )
+    search.fit(X_train, y_train)
+
+    results = pd.DataFrame(search.cv_results_)
+    if args.halving:
+        # Only the last round's scores are comparable across the survivors
+        results = results[results["iter"] == results["iter"].max()]
+    results = results.sort_values("rank_test_score")
+    print(
+        f"{len(search.cv_results_['params'])} candidate fits x {args.cv_folds} "
+        "folds; top by CV AUC:"
+    )
+    for _, row in results.head(5).iterrows():
+        print(
+            f"  {row['mean_test_score']:.4f} ± {row['std_test_score']:.4f}  "
+            f"{describe(row['params'])}"
+        )
+
+    best = pipeline.set_params(**search.best_params_)
+    return best, search
+
+
+def describe(params):
+    clf = params["clf"]
+    extra = ", ".join(
+        f"{k.split('__', 1)[1]}={v}" for k, v in params.items() if k != "clf"
+    )
+    return f"{type(clf).__name__}({extra})"
+
+
+def export_schema(X, feature_cols, out):
+    """Generate frontend schema from data stats."""
+    desc = X.describe(percentiles=[0.01, 0.5, 0.99]).T
+    schema = {"features": []}
+    for col in feature_cols:
+        stats = desc.loc[col]
+        step = (
+            float(np.round((stats["99%"] - stats["1%"]) / 200, 4))
+            if "99%" in desc.columns
+            else 0.1
+        )
+        schema["features"].append(
+            {
+                "name": col,
+                "label": col.replace("_", " ").title(),
+                "type": "number",
+                "placeholder": (
+                    f"e.g., {stats['50%']:.2f}" if "50%" in desc.columns else None
+                ),
+                "min": (
+                    float(max(0.0, stats["min"] - abs(float(stats["min"])) * 0.1))
+                    if "min" in desc.columns
+                    else 0.0
+                ),
+                "max": float(stats["max"] * 1.05) if "max" in desc.columns else None,
+                "step": step if step > 0 else 0.1,
+                "required": True,
+            }
+        )
+    with open(out / "schema.json", "w") as f:
+        json.dump(schema, f, indent=2)
+    return schema
+
+
+def export_artifacts(calib, X_train, X, feature_cols, out, version, seed, schema=None):
+    """
+    Write the model files the backend loads into `out` and return their paths.
+    The schema is generated from X unless one is passed in (e.g. to keep a
+    previous version's bounds).
+    """
+    with open(out / "model_pipeline.pkl", "wb") as f:
+        pickle.dump({"pipeline": calib, "feature_names": feature_cols,
+                     "label_map": {"0":"benign","1":"malignant"}}, f)
+    (out / "version.txt").write_text(version, encoding="utf-8")
+    saved = [out / "model_pipeline.pkl", out / "version.txt"]
+
+    # SHAP background sample: k-means centroids of the training features
+    kmeans = KMeans(
+        n_clusters=min(N_BACKGROUND, len(X_train)), n_init=10, random_state=seed
+    )
+    kmeans.fit(X_train[feature_cols].values)
+    np.save(out / "background.npy", kmeans.cluster_centers_)
+
+    # Reference histograms (quantile bins of the training features) for drift monitoring
+    save_reference(build_reference(X_train[feature_cols], feature_cols, version), out)
+    saved += [out / "background.npy", out / "reference_histograms.json"]
+
+    if schema is None:
+        schema = export_schema(X, feature_cols, out)
+    else:
+        with open(out / "schema.json", "w") as f:
+            json.dump(schema, f, indent=2)
+    saved.append(out / "schema.json")
+
+    # Compact non-pickle artifact: weights, scaler stats and calibration as
+    # .npz + manifest
+    try:
+        compiled = compile_model(calib, feature_cols)
+        verify_parity(compiled, calib, probe_matrix(schema, n_rows=256))
+        save_artifact(compiled, out, version)
+        saved += [out / ARRAYS_FILENAME, out / MANIFEST_FILENAME]
+    except ValueError as e:
+        # The backend prefers the arrays, so a previous export's must not
+        # outlive this pickle
+        for name in (ARRAYS_FILENAME, MANIFEST_FILENAME):
+            (out / name).unlink(missing_ok=True)
+        print("Compact artifact skipped (backend will use the pickle):", e)
+    return saved
+
+
+def print_timings():
+    print("\nWall time per stage:")
+    for name, elapsed in _timings:
+        print(f"  {name:<10} {elapsed:8.2f}s")
+    print(f"  {'total':<10} {sum(t for _, t in _timings):8.2f}s")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    out = pathlib.Path(args.out); out.mkdir(exist_ok=True)
+
+    memory = None
+    if not args.no_cache:
+        if args.clear_cache:
+            shutil.rmtree(args.cache_dir, ignore_errors=True)
+        memory = args.cache_dir
+
+    # Load & clean
+    with stage("load"):
+        X, y, feature_cols = load_data(
+            args.data, None if args.no_cache else args.cache_dir
+        )
+
+    # Split
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=args.seed, stratify=y
+    )
+
+    # Pick the best candidate by CV AUC
+    with stage("select"):
+        best, search = select_model(X_train, y_train, feature_cols, args, memory)
+    print("Selected:", describe(search.best_params_))
+
+    # Calibrate probabilities; the shipped pipeline must not reference the local cache
+    with stage("calibrate"):
+        best.set_params(memory=None)
+        calib = CalibratedClassifierCV(
+            best, method="sigmoid", cv=args.cv_folds, n_jobs=args.jobs
+        )
+        calib.fit(X_train, y_train)
+
+    # Test metrics
+    with stage("evaluate"):
+        proba = calib.predict_proba(X_test)[:, 1]
+        pred = (proba >= 0.5).astype(int)
+        print("Test ROC AUC:", roc_auc_score(y_test, proba))
+        print(classification_report(y_test, pred, target_names=["benign","malignant"]))
+        print("Confusion matrix:\n", confusion_matrix(y_test, pred))
+
+    # Save artifacts
+    with stage("export"):
+        saved = export_artifacts(
+            calib, X_train, X, feature_cols, out, args.version, args.seed
+        )
+
+    print("\nSaved:")
+    for path in saved:
+        print(" -", path)
+
+    print_timings()
 
-# Split
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42, stratify=y
-)
 
-# Pipelines
-pre = ColumnTransformer([("num", StandardScaler(), feature_cols)], remainder="drop")
-
-logreg = Pipeline([
-    ("pre", pre),
-    ("clf", LogisticRegression(max_iter=500, class_weight="balanced", random_state=42)),
-])
-
-gboost = Pipeline([
-    ("pre", pre),
-    ("clf", GradientBoostingClassifier(random_state=42)),
-])
-
-# Pick better by CV AUC
-cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=42)
-logreg_auc = cross_val_score(logreg, X_train, y_train, cv=cv, scoring="roc_auc").mean()
-gboost_auc = cross_val_score(gboost, X_train, y_train, cv=cv, scoring="roc_auc").mean()
-print(f"CV AUC - LogReg: {logreg_auc:.4f} | GBoost: {gboost_auc:.4f}")
-
-best = logreg if logreg_auc >= gboost_auc else gboost
-best.fit(X_train, y_train)
-
-# Calibrate probabilities
-calib = CalibratedClassifierCV(best, method="sigmoid", cv=5)
-calib.fit(X_train, y_train)
-
-# Test metrics
-proba = calib.predict_proba(X_test)[:, 1]
-pred = (proba >= 0.5).astype(int)
-print("Test ROC AUC:", roc_auc_score(y_test, proba))
-print(classification_report(y_test, pred, target_names=["benign","malignant"]))
-print("Confusion matrix:\n", confusion_matrix(y_test, pred))
-
-# Save artifacts
-out = pathlib.Path("model_out"); out.mkdir(exist_ok=True)
-with open(out / "model_pipeline.pkl", "wb") as f:
-    pickle.dump({"pipeline": calib, "feature_names": feature_cols,
-                 "label_map": {"0":"benign","1":"malignant"}}, f)
-(out / "version.txt").write_text("wdbc-calibrated-1.0", encoding="utf-8")
-
-# Generate frontend schema from data stats
-desc = X.describe(percentiles=[0.01, 0.5, 0.99]).T
-schema = {"features": []}
-for col in feature_cols:
-    stats = desc.loc[col]
-    step = float(np.round((stats["99%"] - stats["1%"]) / 200, 4)) if "99%" in desc.columns else 0.1
-    schema["features"].append({
-        "name": col,
-        "label": col.replace("_"," ").title(),
-        "type": "number",
-        "placeholder": f"e.g., {stats['50%']:.2f}" if "50%" in desc.columns else None,
-        "min": float(max(0.0, stats["min"] - abs(float(stats["min"])) * 0.1)) if "min" in desc.columns else 0.0,
-        "max": float(stats["max"] * 1.05) if "max" in desc.columns else None,
-        "step": step if step > 0 else 0.1,
-        "required": True
-    })
-with open(out / "schema.json", "w") as f:
-    json.dump(schema, f, indent=2)
-
-print("\nSaved:")
-print(" -", out / "model_pipeline.pkl")
-print(" -", out / "version.txt")
-print(" -", out / "schema.json")
\ No newline at end of file
+if __name__ == "__main__":
+    main()